@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import App, Deployment
+from .models import App, BulkOperation, Deployment, LogChunk, Route, TrafficBucket, TrafficCursor
 
 
 @admin.register(App)
@@ -16,3 +16,37 @@ class DeploymentAdmin(admin.ModelAdmin):
     list_filter = ['status', 'created_at']
     search_fields = ['app__name']
     readonly_fields = ['created_at']
+
+
+@admin.register(BulkOperation)
+class BulkOperationAdmin(admin.ModelAdmin):
+    list_display = ['id', 'action', 'status', 'total', 'succeeded', 'failed', 'created_at']
+    list_filter = ['action', 'status']
+    readonly_fields = ['created_at', 'finished_at']
+
+
+@admin.register(LogChunk)
+class LogChunkAdmin(admin.ModelAdmin):
+    list_display = ['id', 'app', 'source', 'deployment', 'started_at', 'ended_at']
+    list_filter = ['source', 'started_at']
+    search_fields = ['app__name']
+
+
+@admin.register(Route)
+class RouteAdmin(admin.ModelAdmin):
+    list_display = ['app', 'name', 'path_prefix', 'priority', 'updated_at']
+    search_fields = ['app__name', 'path_prefix']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(TrafficBucket)
+class TrafficBucketAdmin(admin.ModelAdmin):
+    list_display = ['app', 'router', 'minute', 'requests', 'status_5xx', 'duration_ms_max']
+    list_filter = ['minute']
+    search_fields = ['app__name', 'router']
+
+
+@admin.register(TrafficCursor)
+class TrafficCursorAdmin(admin.ModelAdmin):
+    list_display = ['path', 'inode', 'offset', 'updated_at']
+    readonly_fields = ['updated_at']
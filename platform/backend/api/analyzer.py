@@ -0,0 +1,225 @@
+"""
+Repository analyzer.
+
+One os.scandir() pass over the repo root and the candidate subdirectories
+produces a typed structure report (compose file, Dockerfiles, manage.py,
+package.json, requirements, lockfiles, exposed ports). Reports are cached
+by commit SHA, in memory and on disk, so re-preparing the same commit skips
+the analysis entirely.
+"""
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+
+import yaml
+
+from .compose import load_yaml
+from .runtime import CACHE_DIR_CONTAINER, atomic_write, run_cmd
+
+# Bump when the report format or detection rules change
+ANALYZER_VERSION = 1
+
+# Checked in order; the first directory with a Dockerfile/app wins
+CANDIDATE_SUBDIRS = ["", "backend", "app", "src", "api", "server"]
+COMPOSE_FILES = ["docker-compose.yml", "compose.yml"]
+LOCKFILES = {
+    "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "poetry.lock",
+    "Pipfile.lock", "uv.lock", "requirements.lock",
+}
+
+ANALYSIS_CACHE_DIR = CACHE_DIR_CONTAINER / "analysis"
+MEMORY_CACHE_SIZE = 256
+
+_EXPOSE_RE = re.compile(r"^\s*EXPOSE\s+(.+)$", re.IGNORECASE | re.MULTILINE)
+
+
+@dataclass
+class RepoReport:
+    """Structure of a repository at one commit. Paths are relative, "." is the root."""
+    commit_sha: str = ""
+    compose_file: Optional[str] = None
+    dockerfiles: List[str] = field(default_factory=list)
+    manage_py: List[str] = field(default_factory=list)
+    package_json: List[str] = field(default_factory=list)
+    requirements: List[str] = field(default_factory=list)
+    lockfiles: List[str] = field(default_factory=list)
+    exposed_ports: List[int] = field(default_factory=list)
+    # First match in CANDIDATE_SUBDIRS: "dockerfile", "django", "node" or "python"
+    app_type: Optional[str] = None
+    build_context: Optional[str] = None
+
+    def has_root(self, kind):
+        """True if the file kind (e.g. "dockerfiles") is present at the repo root."""
+        return "." in getattr(self, kind)
+
+    def as_dict(self):
+        return asdict(self)
+
+
+_memory_cache = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+def commit_sha(repo_dir):
+    """HEAD commit of a checkout, read from .git directly when possible."""
+    git_dir = repo_dir / ".git"
+    try:
+        head = (git_dir / "HEAD").read_text().strip()
+        if not head.startswith("ref: "):
+            return head
+        ref = head[len("ref: "):]
+        ref_path = git_dir / ref
+        if ref_path.is_file():
+            return ref_path.read_text().strip()
+        for line in (git_dir / "packed-refs").read_text().splitlines():
+            if line.endswith(" " + ref):
+                return line.split(" ", 1)[0]
+    except OSError:
+        pass
+    code, out, _ = run_cmd(["git", "-C", str(repo_dir), "rev-parse", "HEAD"], timeout=30)
+    return out.strip() if code == 0 else ""
+
+
+def _scan(directory):
+    """Names of regular files in a directory, plus names of subdirectories."""
+    files, dirs = set(), set()
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    files.add(entry.name)
+                elif entry.is_dir():
+                    dirs.add(entry.name)
+    except OSError:
+        pass
+    return files, dirs
+
+
+def _dockerfile_ports(path):
+    ports = []
+    try:
+        text = path.read_text()
+    except (OSError, UnicodeDecodeError):
+        return ports
+    for match in _EXPOSE_RE.finditer(text):
+        for token in match.group(1).split():
+            port = token.split("/")[0]
+            if port.isdigit():
+                ports.append(int(port))
+    return ports
+
+
+def _compose_ports(path):
+    ports = []
+    try:
+        data = load_yaml(path.read_text()) or {}
+    except (OSError, UnicodeDecodeError, yaml.YAMLError):
+        return ports
+    for service in (data.get("services") or {}).values():
+        for port in (service or {}).get("ports") or []:
+            if isinstance(port, dict):
+                target = str(port.get("target", ""))
+            else:
+                target = str(port).split(":")[-1].split("/")[0]
+            if target.isdigit():
+                ports.append(int(target))
+        for port in (service or {}).get("expose") or []:
+            port = str(port).split("/")[0]
+            if port.isdigit():
+                ports.append(int(port))
+    return ports
+
+
+def _analyze(repo_dir, sha):
+    report = RepoReport(commit_sha=sha)
+    root_files, root_dirs = _scan(repo_dir)
+
+    for name in COMPOSE_FILES:
+        if name in root_files:
+            report.compose_file = name
+            break
+
+    for subdir in CANDIDATE_SUBDIRS:
+        if subdir:
+            if subdir not in root_dirs:
+                continue
+            files, _ = _scan(repo_dir / subdir)
+        else:
+            files = root_files
+        rel = subdir or "."
+
+        if "Dockerfile" in files:
+            report.dockerfiles.append(rel)
+        if "manage.py" in files:
+            report.manage_py.append(rel)
+        if "package.json" in files:
+            report.package_json.append(rel)
+        if "requirements.txt" in files:
+            report.requirements.append(rel)
+        report.lockfiles.extend(
+            name if rel == "." else f"{rel}/{name}" for name in sorted(files & LOCKFILES)
+        )
+
+        if report.app_type is None:
+            # Same precedence prepare has always used
+            for kind, app_type in (("Dockerfile", "dockerfile"), ("manage.py", "django"),
+                                   ("package.json", "node"), ("requirements.txt", "python")):
+                if kind in files:
+                    report.app_type = app_type
+                    report.build_context = rel
+                    break
+
+    ports = []
+    if report.compose_file:
+        ports.extend(_compose_ports(repo_dir / report.compose_file))
+    for rel in report.dockerfiles:
+        ports.extend(_dockerfile_ports(repo_dir / rel / "Dockerfile"))
+    report.exposed_ports = sorted(set(ports))
+    return report
+
+
+def _cache_path(sha):
+    return ANALYSIS_CACHE_DIR / f"v{ANALYZER_VERSION}-{sha}.json"
+
+
+def analyze_repo(repo_dir, use_cache=True):
+    """
+    Analyze a clean checkout, reusing the cached report for its commit.
+    Must run before Keystone modifies the checkout (generated Dockerfiles etc.).
+    """
+    sha = commit_sha(repo_dir)
+    if use_cache and sha:
+        with _memory_lock:
+            report = _memory_cache.get(sha)
+            if report is not None:
+                _memory_cache.move_to_end(sha)
+                return report
+        try:
+            report = RepoReport(**json.loads(_cache_path(sha).read_text()))
+        except (OSError, ValueError, TypeError):
+            report = None
+        if report is not None:
+            _remember(sha, report)
+            return report
+
+    report = _analyze(repo_dir, sha)
+    if sha:
+        _remember(sha, report)
+        try:
+            ANALYSIS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            atomic_write(_cache_path(sha), json.dumps(report.as_dict()))
+        except OSError:
+            pass
+    return report
+
+
+def _remember(sha, report):
+    with _memory_lock:
+        _memory_cache[sha] = report
+        _memory_cache.move_to_end(sha)
+        while len(_memory_cache) > MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+from django.core import checks
+
+
+class ApiConfig(AppConfig):
+    name = "api"
+
+    def ready(self):
+        from .checks import check_async_middleware
+        checks.register(check_async_middleware)
@@ -0,0 +1,117 @@
+"""
+Keystone async API views (ASGI)
+
+Endpoints that mostly wait on Docker - logs, health, streams - are plain
+async Django views rather than DRF views (DRF has no async support). Under
+ASGI a slow `docker logs` then parks a coroutine instead of a worker thread,
+so log viewers can't starve deploy requests. DRF's configured authentication
+classes still decide who may call them.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .logs import LogQueryError, follow_lines, logs_cmd, logs_result, parse_query
+from .models import App
+from .runtime import run_cmd_async
+
+
+def _authenticate(request):
+    """
+    Run DRF's authentication classes against a plain Django request.
+    Returns: (user, None) or (None, error response)
+    """
+    authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    drf_request = Request(request, authenticators=authenticators)
+    try:
+        user = drf_request.user
+        if not user or not user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+    except exceptions.APIException as e:
+        status_code = e.status_code
+        # Same as DRF: 401 only when the first authenticator has a challenge header
+        if status_code == 401 and not (authenticators and authenticators[0].authenticate_header(drf_request)):
+            status_code = 403
+        return None, JsonResponse({"detail": str(e.detail)}, status=status_code)
+    return user, None
+
+
+def api_auth_required(view):
+    """
+    Async equivalent of DRF's IsAuthenticated permission for async views.
+    Like DRF views they're CSRF exempt - these are read-only (GET) endpoints.
+    """
+    @csrf_exempt
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user, error = await sync_to_async(_authenticate)(request)
+        if error is not None:
+            return error
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def _get_app(pk):
+    try:
+        return await App.objects.aget(pk=pk)
+    except App.DoesNotExist:
+        return None
+
+
+@api_auth_required
+@require_GET
+async def app_logs(request, pk):
+    """
+    GET /api/apps/{id}/logs/ - container logs.
+    - tail: number of lines (default KEYSTONE_LOGS_TAIL)
+    - since / until: exclusive cursors (timestamps from a previous response,
+      RFC3339, unix time or relative like "10m")
+    - service: compose service to include (repeatable)
+    - follow=true: stream lines as text/plain until the client disconnects
+      (ASGI only: a WSGI server buffers the stream in a worker)
+    """
+    app = await _get_app(pk)
+    if app is None:
+        return JsonResponse({"detail": "Not found."}, status=404)
+    try:
+        query = parse_query(request.GET)
+    except LogQueryError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    if query["follow"] and not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"error": "follow=true needs the ASGI server (KEYSTONE_SERVER_MODE=asgi); poll with since instead"},
+            status=400,
+        )
+
+    cmd, cwd = logs_cmd(
+        app,
+        tail=query["tail"],
+        since=query["since"],
+        until=query["until"],
+        services=query["services"],
+        follow=query["follow"],
+    )
+    if query["follow"]:
+        lines = follow_lines(cmd, cwd=cwd, since=query["since"], timeout=settings.KEYSTONE_LOGS_FOLLOW_SECONDS)
+        response = StreamingHttpResponse(lines, content_type="text/plain; charset=utf-8")
+        # Don't let proxies buffer the stream
+        response["X-Accel-Buffering"] = "no"
+        response["Cache-Control"] = "no-cache"
+        return response
+
+    code, out, err = await run_cmd_async(cmd, cwd=cwd)
+    return JsonResponse(logs_result(code, out, err, query))
+
+
+async def health(request):
+    """Health check endpoint."""
+    return JsonResponse({"status": "ok", "service": "keystone"})
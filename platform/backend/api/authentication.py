@@ -0,0 +1,124 @@
+"""
+Cached token authentication.
+
+DRF's TokenAuthentication joins Token and User on every request, and the
+dashboard polls constantly. CachedTokenAuthentication keeps validated tokens
+for KEYSTONE_AUTH_CACHE_SECONDS:
+- by default in a per-process LRU of KEYSTONE_AUTH_CACHE_SIZE entries
+- or, with KEYSTONE_AUTH_CACHE_BACKEND set to a Django cache alias, in that
+  cache, so every worker sees invalidations at once
+
+Entries are dropped as soon as a token is deleted (logout, admin) or its user
+is saved. With the per-process LRU other workers only notice after the TTL.
+Errors of the shared cache (e.g. an unwritable directory) count as misses.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "keystone-auth:"
+
+_memory_cache = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+def _cache_key(key):
+    # Don't keep raw tokens as keys in a shared cache
+    return CACHE_PREFIX + hashlib.sha256(key.encode()).hexdigest()
+
+
+def _shared_cache():
+    return caches[settings.KEYSTONE_AUTH_CACHE_BACKEND]
+
+
+def cache_get(key):
+    """Cached (user, token) for a token key, or None."""
+    if settings.KEYSTONE_AUTH_CACHE_BACKEND:
+        try:
+            return _shared_cache().get(_cache_key(key))
+        except OSError as e:
+            logger.warning("Auth cache unavailable: %s", e)
+            return None
+    with _memory_lock:
+        entry = _memory_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del _memory_cache[key]
+            return None
+        _memory_cache.move_to_end(key)
+        return entry[1]
+
+
+def cache_set(key, value):
+    ttl = settings.KEYSTONE_AUTH_CACHE_SECONDS
+    if settings.KEYSTONE_AUTH_CACHE_BACKEND:
+        try:
+            _shared_cache().set(_cache_key(key), value, ttl)
+        except OSError as e:
+            logger.warning("Auth cache unavailable: %s", e)
+        return
+    with _memory_lock:
+        _memory_cache[key] = (time.monotonic() + ttl, value)
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > settings.KEYSTONE_AUTH_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+
+
+def invalidate_token(key):
+    if settings.KEYSTONE_AUTH_CACHE_BACKEND:
+        try:
+            _shared_cache().delete(_cache_key(key))
+        except OSError as e:
+            logger.warning("Auth cache unavailable: %s", e)
+    with _memory_lock:
+        _memory_cache.pop(key, None)
+
+
+def invalidate_user(user_id):
+    """Drop every cached token of a user (deactivated, password changed...)."""
+    for key in Token.objects.filter(user_id=user_id).values_list("key", flat=True):
+        invalidate_token(key)
+    with _memory_lock:
+        for key, (_, (user, _)) in list(_memory_cache.items()):
+            if user.pk == user_id:
+                del _memory_cache[key]
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that skips the database for recently validated tokens."""
+
+    def authenticate_credentials(self, key):
+        if settings.KEYSTONE_AUTH_CACHE_SECONDS <= 0:
+            return super().authenticate_credentials(key)
+        cached = cache_get(key)
+        if cached is not None:
+            return cached
+        # Raises AuthenticationFailed for unknown tokens / inactive users - not cached
+        user, token = super().authenticate_credentials(key)
+        cache_set(key, (user, token))
+        return user, token
+
+
+def _token_deleted(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+def _user_saved(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_user(instance.pk)
+
+
+post_delete.connect(_token_deleted, sender=Token, dispatch_uid="keystone-auth-token-deleted")
+post_save.connect(_user_saved, sender=get_user_model(), dispatch_uid="keystone-auth-user-saved")
@@ -0,0 +1,111 @@
+"""
+Bulk operations.
+
+prepare/deploy/stop across a set of apps. Each app is a task on a shared
+thread pool of KEYSTONE_BULK_CONCURRENCY workers, so parallelism stays
+bounded however many operations are started. Progress and per-app results
+live on a BulkOperation row that clients poll.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import App, BulkOperation, Deployment
+from .pipeline import DEPLOY_FROM_STATUSES, PREPARE_FROM_STATUSES, deploy_app, prepare_app, stop_app
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = [action for action, _ in BulkOperation.ACTION_CHOICES]
+
+_executor = None
+_executor_lock = threading.Lock()
+# Serializes read-modify-write of the results (operations run in the web process)
+_record_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.KEYSTONE_BULK_CONCURRENCY), thread_name_prefix="keystone-bulk"
+            )
+        return _executor
+
+
+def run_app_action(app, action):
+    """
+    Run one action on an app with the same checks as the single-app endpoints.
+    Returns: result dict; raises on failure
+    """
+    if action == "prepare":
+        if app.status not in PREPARE_FROM_STATUSES:
+            raise Exception(f"Cannot prepare app in status: {app.status}")
+        structure = prepare_app(app)
+        return {"status": "prepared", "structure": structure}
+
+    if action == "deploy":
+        if app.status not in DEPLOY_FROM_STATUSES:
+            raise Exception(f"App must be prepared first. Current status: {app.status}")
+        deployment = Deployment.objects.create(app=app, status="running", trigger="bulk", priority="bulk")
+        return {**deploy_app(app, deployment), "deployment": deployment.pk}
+
+    stop_app(app)
+    return {"status": "stopped"}
+
+
+def _record(operation_id, app_id, **entry):
+    """Update one app's entry, and the counters once it has finished."""
+    with _record_lock:
+        operation = BulkOperation.objects.get(pk=operation_id)
+        key = str(app_id)
+        operation.results[key] = {**operation.results.get(key, {}), **entry}
+        if entry["status"] == "succeeded":
+            operation.succeeded += 1
+        elif entry["status"] == "failed":
+            operation.failed += 1
+        if operation.succeeded + operation.failed >= operation.total:
+            operation.status = "finished"
+            operation.finished_at = timezone.now()
+        operation.save()
+
+
+def _run_one(operation_id, app_id, action):
+    """Pool task: run the action for one app and record the outcome."""
+    close_old_connections()
+    try:
+        _record(operation_id, app_id, status="running")
+        try:
+            result = run_app_action(App.objects.get(pk=app_id), action)
+        except Exception as e:
+            logger.info("Bulk %s of app %s failed: %s", action, app_id, e)
+            _record(operation_id, app_id, status="failed", error=str(e))
+        else:
+            _record(operation_id, app_id, status="succeeded", result=result)
+    except Exception:
+        logger.exception("Bulk %s of app %s could not be recorded", action, app_id)
+    finally:
+        # Pool threads don't go through the request cycle - release the DB connection
+        connection.close()
+
+
+def start_operation(action, apps):
+    """Create a BulkOperation for the apps and queue one task per app."""
+    operation = BulkOperation.objects.create(
+        action=action,
+        total=len(apps),
+        results={str(app.pk): {"app": app.name, "status": "pending"} for app in apps},
+    )
+    executor = _get_executor()
+
+    def queue():
+        for app in apps:
+            executor.submit(_run_one, operation.pk, app.pk, action)
+
+    # Queue only once the row is visible to the pool threads
+    transaction.on_commit(queue)
+    return operation
@@ -0,0 +1,23 @@
+"""
+System checks for Keystone's own settings.
+
+The async views (async_views.py) only free a thread while they wait if the
+whole middleware chain is async-capable; a single sync-only middleware makes
+Django adapt the chain under ASGI, silently. Registered in ApiConfig.ready().
+"""
+from django.conf import settings
+from django.core.checks import Error
+from django.utils.module_loading import import_string
+
+
+def check_async_middleware(app_configs, **kwargs):
+    errors = []
+    for path in settings.MIDDLEWARE:
+        if not getattr(import_string(path), "async_capable", False):
+            errors.append(Error(
+                f"Middleware {path} is sync-only, so under ASGI every request (async log views "
+                "included) is adapted to sync and holds a thread.",
+                hint="Use an async-capable middleware (e.g. api.staticfiles.AsyncWhiteNoiseMiddleware).",
+                id="keystone.E001",
+            ))
+    return errors
@@ -0,0 +1,409 @@
+"""
+Docker Compose helpers.
+
+inject_traefik_config() renders a Keystone override file that adapts a user's
+compose file for Keystone routing; deploys pass both files to compose.
+
+For incremental redeploys, every service gets a fingerprint built from its effective config (as rendered
+by `docker compose config`) and the identity of its inputs:
+- build services: git tree of the build context plus any local modifications
+- image services: the local image ID
+
+Comparing fingerprints with the previous deployment tells us which services
+actually need a rebuild; unchanged services (databases, caches, ...) are left
+running.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import yaml
+
+from .runtime import (
+    CACHE_DIR_CONTAINER,
+    RUNTIME_DIR_CONTAINER,
+    TRAEFIK_NETWORK,
+    atomic_write,
+    run_cmd,
+    to_container_path,
+)
+
+# LibYAML bindings are several times faster than the pure Python ones
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+SafeDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+# Written next to the user's compose file and passed as a second `-f`
+OVERRIDE_FILE = "docker-compose.keystone.yml"
+# Bump when the override format or injection rules change
+OVERRIDE_VERSION = 1
+OVERRIDE_KEY_PREFIX = "# keystone-source: "
+OVERRIDE_SERVICES_PREFIX = "# keystone-services: "
+COMPOSE_CACHE_DIR = CACHE_DIR_CONTAINER / "compose"
+
+
+class _Tagged(list):
+    """A sequence written with a compose merge tag (!reset / !override)."""
+
+    def __init__(self, tag, items=()):
+        super().__init__(items)
+        self.tag = tag
+
+
+class _Dumper(SafeDumper):
+    pass
+
+
+_Dumper.add_representer(
+    _Tagged, lambda dumper, data: dumper.represent_sequence(data.tag, list(data))
+)
+
+
+def load_yaml(text):
+    """Parse YAML with the LibYAML loader when available."""
+    return yaml.load(text, Loader=SafeLoader)
+
+
+def _source_key(source, params):
+    digest = hashlib.sha256(source)
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def _read_header(path):
+    """Return (source_key, modified_services) from an override's header, or (None, None)."""
+    try:
+        with open(path, "r") as f:
+            key_line, services_line = f.readline(), f.readline()
+    except OSError:
+        return None, None
+    if not key_line.startswith(OVERRIDE_KEY_PREFIX) or not services_line.startswith(OVERRIDE_SERVICES_PREFIX):
+        return None, None
+    try:
+        services = json.loads(services_line[len(OVERRIDE_SERVICES_PREFIX):])
+    except ValueError:
+        return None, None
+    return key_line[len(OVERRIDE_KEY_PREFIX):].strip(), services
+
+
+def _host_path(repo_dir, source, container_runtime_path, host_runtime_path):
+    """Resolve a relative mount source to an absolute path on the Docker host."""
+    container_abs_path = str((repo_dir / source).resolve())
+    if container_abs_path.startswith(container_runtime_path):
+        return container_abs_path.replace(container_runtime_path, host_runtime_path, 1)
+    return container_abs_path
+
+
+def inject_traefik_config(compose_path, app_slug, app_traefik_rule, add_labels=True):
+    """
+    Write a Keystone override file next to a docker-compose.yml for Traefik routing.
+    The user's file is never modified, so comments, anchors and ordering survive.
+    - Adds Traefik labels to web-facing services (unless routes come from the file provider)
+    - Connects web-facing services to keystone_web network
+    - Drops host port mappings of web-facing services (`!override`/`!reset`)
+    - Converts relative volume mounts to absolute host paths
+    - Skips rendering when the source file (and settings) are unchanged
+    Returns: list of routed services ({"name", "port", "path"})
+    """
+    # Ensure compose_path is a Path object
+    compose_path = Path(compose_path)
+    
+    # Check if file exists
+    if not compose_path.exists():
+        raise FileNotFoundError(f"docker-compose.yml not found at {compose_path}")
+    
+    # Get the absolute path of the repo directory for volume mount conversion
+    repo_dir = compose_path.parent
+    override_path = repo_dir / OVERRIDE_FILE
+    
+    # Convert container path to host path for Docker-in-Docker volume mounts
+    # Container has /runtime/repos, but Docker needs host path
+    host_runtime_path = os.environ.get('HOST_RUNTIME_PATH', '/runtime')
+    container_runtime_path = str(RUNTIME_DIR_CONTAINER)
+    
+    source = compose_path.read_bytes()
+    source_key = _source_key(source, {
+        "version": OVERRIDE_VERSION,
+        "slug": app_slug,
+        "labels": add_labels,
+        "repo_dir": str(repo_dir.resolve()),
+        "host_runtime_path": host_runtime_path,
+    })
+    
+    # Unchanged source: reuse the override already in the checkout, or the
+    # one rendered for an earlier clone of the same file
+    cache_path = COMPOSE_CACHE_DIR / f"{source_key}.yml"
+    existing_key, modified_services = _read_header(override_path)
+    if existing_key == source_key:
+        return modified_services
+    cached_key, modified_services = _read_header(cache_path)
+    if cached_key == source_key:
+        atomic_write(override_path, cache_path.read_text())
+        return modified_services
+    
+    compose_data = load_yaml(source)
+    if not compose_data or 'services' not in compose_data:
+        raise Exception("Invalid docker-compose.yml: no services found")
+    
+    modified_services = []
+    override_services = {}
+    
+    # Common web service names to look for
+    web_service_names = ['nginx', 'frontend', 'web', 'proxy', 'gateway', 'app']
+    backend_service_names = ['backend', 'api', 'server', 'django', 'flask', 'fastapi']
+    
+    # Process ALL services - convert volumes and add network
+    for service_name, service_config in compose_data['services'].items():
+        service_config = service_config or {}
+        override = {}
+        
+        # Convert relative volume mounts to absolute HOST paths
+        # This is needed for Docker-in-Docker: the path must be valid on the Docker host
+        # (compose merges volumes by target, so only the converted mounts are written)
+        converted_volumes = []
+        for vol in service_config.get('volumes') or []:
+            if isinstance(vol, str):
+                # Short syntax: ./host:container or ./host:container:ro
+                if vol.startswith('./') or vol.startswith('../'):
+                    parts = vol.split(':')
+                    parts[0] = _host_path(repo_dir, parts[0], container_runtime_path, host_runtime_path)
+                    converted_volumes.append(':'.join(parts))
+            elif isinstance(vol, dict):
+                # Long syntax with 'source' key
+                vol_source = vol.get('source', '')
+                if vol_source.startswith('./') or vol_source.startswith('../'):
+                    vol = dict(vol)
+                    vol['source'] = _host_path(repo_dir, vol_source, container_runtime_path, host_runtime_path)
+                    converted_volumes.append(vol)
+        if converted_volumes:
+            override['volumes'] = converted_volumes
+        
+        is_web_service = False
+        service_port = None
+        
+        # Check if service has ports that look like web ports
+        ports = service_config.get('ports') or []
+        for port in ports:
+            port_str = str(port)
+            # Look for common web ports (80, 443, 3000, 8000, 8080, 5000)
+            if any(p in port_str for p in ['80:', '443:', '3000:', '8000:', '8080:', '5000:', ':80', ':443']):
+                is_web_service = True
+                # Extract the container port
+                if ':' in port_str:
+                    parts = port_str.split(':')
+                    service_port = parts[-1].split('/')[0]  # Handle "8000:8000/tcp"
+                break
+        
+        # Check if service name suggests it's a web service
+        service_name_lower = service_name.lower()
+        if any(name in service_name_lower for name in web_service_names):
+            is_web_service = True
+            if not service_port:
+                service_port = "80"
+        elif any(name in service_name_lower for name in backend_service_names):
+            is_web_service = True
+            if not service_port:
+                service_port = "8000"
+        
+        if is_web_service:
+            # Create unique router name for this service
+            router_name = f"{app_slug}-{service_name}"
+            
+            # Determine the path prefix for this service
+            if service_name_lower in ['nginx', 'frontend', 'web', 'proxy', 'gateway']:
+                # Frontend/proxy gets the main path
+                path_prefix = f"/{app_slug}"
+            else:
+                # Backend services get a subpath
+                path_prefix = f"/{app_slug}/api" if 'backend' in service_name_lower or 'api' in service_name_lower else f"/{app_slug}/{service_name}"
+            
+            if add_labels:
+                # Compose merges labels by key with the user's own
+                override['labels'] = {
+                    "traefik.enable": "true",
+                    f"traefik.http.routers.{router_name}.rule": f"PathPrefix(`{path_prefix}`)",
+                    f"traefik.http.routers.{router_name}.entrypoints": "web",
+                    f"traefik.http.services.{router_name}.loadbalancer.server.port": str(service_port),
+                    f"traefik.http.middlewares.{router_name}-strip.stripprefix.prefixes": path_prefix,
+                    f"traefik.http.routers.{router_name}.middlewares": f"{router_name}-strip",
+                }
+            
+            # Remove host port mappings, Traefik handles routing. Compose appends
+            # ports across files, so the list is replaced with a merge tag.
+            if any(':' in str(port) for port in ports):
+                # Keep internal-only ports
+                kept = [port for port in ports if ':' not in str(port)]
+                override['ports'] = _Tagged("!override", kept) if kept else _Tagged("!reset")
+            
+            # Ensure service is on keystone_web network. Compose merges this
+            # with the service's own networks; services relying on the implicit
+            # default network keep it.
+            networks = service_config.get('networks') or {}
+            if TRAEFIK_NETWORK not in networks:
+                override['networks'] = [TRAEFIK_NETWORK] if networks else ["default", TRAEFIK_NETWORK]
+            
+            modified_services.append({
+                "name": service_name,
+                "port": service_port,
+                "path": path_prefix
+            })
+        
+        if override:
+            override_services[service_name] = override
+    
+    override_data = {"networks": {TRAEFIK_NETWORK: {"external": True}}}
+    if override_services:
+        override_data["services"] = override_services
+    
+    content = (
+        f"{OVERRIDE_KEY_PREFIX}{source_key}\n"
+        f"{OVERRIDE_SERVICES_PREFIX}{json.dumps(modified_services)}\n"
+        "# Generated by Keystone from the compose file next to it - do not edit\n"
+        + yaml.dump(override_data, Dumper=_Dumper, default_flow_style=False, sort_keys=False)
+    )
+    atomic_write(override_path, content)
+    try:
+        COMPOSE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        atomic_write(cache_path, content)
+    except OSError:
+        pass
+    
+    return modified_services
+
+
+def compose_files(env_vars):
+    """Compose files (user file + Keystone override) for an app prepared in compose mode."""
+    files = [env_vars.get("_keystone_compose_file", "docker-compose.yml")]
+    if env_vars.get("_keystone_compose_override"):
+        files.append(env_vars["_keystone_compose_override"])
+    return files
+
+
+def compose_cmd(project_name, compose_files, *args):
+    """Build a `docker compose` command line for a Keystone project."""
+    if isinstance(compose_files, str):
+        compose_files = [compose_files]
+    cmd = ["docker", "compose", "-p", project_name]
+    for compose_file in compose_files:
+        cmd.extend(["-f", compose_file])
+    return cmd + list(args)
+
+
+def load_effective_config(project_name, compose_files, cwd):
+    """Return the fully interpolated compose config as a dict."""
+    code, out, err = run_cmd(
+        compose_cmd(project_name, compose_files, "config", "--format", "json"),
+        cwd=cwd,
+        timeout=120
+    )
+    if code != 0:
+        raise Exception(f"Docker compose config failed: {err or out}")
+    try:
+        return json.loads(out)
+    except ValueError as e:
+        raise Exception(f"Could not parse docker compose config output: {e}")
+
+
+def _build_context_identity(repo_dir_container, build):
+    """Identify a build context by its git tree hash and local changes."""
+    if isinstance(build, str):
+        build = {"context": build}
+    context = to_container_path(build.get("context", "."))
+    try:
+        rel_path = context.relative_to(repo_dir_container)
+    except ValueError:
+        # Context outside the repo (remote URL, absolute path) - use it verbatim
+        return {"context": str(build.get("context", ""))}
+
+    rel = "" if str(rel_path) == "." else str(rel_path)
+    code, tree, _ = run_cmd(
+        ["git", "-C", str(repo_dir_container), "rev-parse", f"HEAD:{rel}"],
+        timeout=30
+    )
+    identity = {"tree": tree.strip() if code == 0 else ""}
+
+    # Keystone (and users) may modify files after clone, e.g. .env
+    code, status_out, _ = run_cmd(
+        ["git", "-C", str(repo_dir_container), "status", "--porcelain", "-z",
+         "--untracked-files=all", "--", rel or "."],
+        timeout=30
+    )
+    entries = _status_entries(status_out) if code == 0 else []
+    if entries:
+        digest = hashlib.sha256()
+        for entry, path in sorted(entries):
+            digest.update(entry.encode())
+            file_path = repo_dir_container / path
+            if file_path.is_file():
+                digest.update(file_path.read_bytes())
+        identity["local_changes"] = digest.hexdigest()
+    return identity
+
+
+def _status_entries(status_out):
+    """
+    Parse `git status --porcelain -z` output (paths are neither quoted nor
+    escaped). Renames and copies are followed by their source path.
+    Returns: list of (entry, current path)
+    """
+    fields = status_out.split("\0")
+    entries = []
+    index = 0
+    while index < len(fields):
+        field = fields[index]
+        index += 1
+        if len(field) < 4:
+            continue
+        entry, path = field, field[3:]
+        if field[0] in "RC":
+            entry = f"{field}\0{fields[index] if index < len(fields) else ''}"
+            index += 1
+        entries.append((entry, path))
+    return entries
+
+
+def _image_identity(image):
+    """Return the local image ID for an image reference, or '' if not present."""
+    code, out, _ = run_cmd(
+        ["docker", "image", "inspect", "--format", "{{.Id}}", image],
+        timeout=30
+    )
+    return out.strip() if code == 0 else ""
+
+
+def service_image(project_name, name, service):
+    """Image a service runs: its `image:`, or the name compose gives images it builds."""
+    return service.get("image") or f"{project_name}-{name}"
+
+
+def missing_built_images(project_name, config, names):
+    """Services among names that are built but whose image is no longer present (e.g. pruned)."""
+    services = config.get("services") or {}
+    return [
+        name for name in names
+        if services[name].get("build") and not _image_identity(service_image(project_name, name, services[name]))
+    ]
+
+
+def service_fingerprints(config, repo_dir_container):
+    """Compute a stable fingerprint for every service in an effective config."""
+    fingerprints = {}
+    for name, service in (config.get("services") or {}).items():
+        if service.get("build"):
+            inputs = _build_context_identity(repo_dir_container, service["build"])
+        else:
+            inputs = {"image_id": _image_identity(service.get("image", ""))}
+        payload = json.dumps({"config": service, "inputs": inputs}, sort_keys=True, default=str)
+        fingerprints[name] = hashlib.sha256(payload.encode()).hexdigest()
+    return fingerprints
+
+
+def diff_services(previous, current):
+    """
+    Compare fingerprints from the previous and current deployment.
+    Returns: (changed, unchanged, removed) service name lists
+    """
+    changed = sorted(name for name, digest in current.items() if previous.get(name) != digest)
+    unchanged = sorted(name for name, digest in current.items() if previous.get(name) == digest)
+    removed = sorted(name for name in previous if name not in current)
+    return changed, unchanged, removed
@@ -0,0 +1,134 @@
+"""
+Conditional GET and cached serialization for the polled read endpoints.
+
+The dashboard polls apps and deployments constantly. List and retrieve
+responses carry an ETag (and Last-Modified) derived from one aggregate query
+over indexed columns - count and max(updated_at) - so a request with a
+matching If-None-Match gets 304 Not Modified without loading or serializing
+any rows.
+- lists are validated by ETag only: deleting a row changes the count but not
+  max(updated_at), so If-Modified-Since alone could miss it
+- Deployment.updated_at is bumped by queryset updates too (DeploymentQuerySet)
+
+Serialized app payloads are cached (KEYSTONE_API_CACHE_BACKEND) by app id
+along with the updated_at they were built from, so a changed list only loads
+and serializes the apps that changed. Entries are dropped when an app is
+saved or deleted.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max
+from django.db.models.signals import post_delete, post_save
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .models import App
+
+PAYLOAD_PREFIX = "keystone-app-payload:"
+# Entries are checked against updated_at, the TTL only bounds memory
+PAYLOAD_TTL = 3600
+
+
+def _etag(request, *state):
+    # Same data, different renderer (JSON / browsable API) - different representation
+    parts = [request.get_full_path(), request.accepted_renderer.format, *state]
+    return '"%s"' % hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()[:32]
+
+
+def _with_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    # Clients keep the response but revalidate it on every poll
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+class ConditionalReadMixin:
+    """
+    list / retrieve with validators and 304 responses, for models with updated_at.
+    Views can override serialize_list / serialize_instance (e.g. to use a cache).
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        state = queryset.aggregate(count=Count("pk"), latest=Max("updated_at"))
+        latest = state["latest"]
+        etag = _etag(request, state["count"], latest.isoformat() if latest else "")
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(self.serialize_list(queryset))
+        return _with_validators(response, etag, latest)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = _etag(request, instance.pk, instance.updated_at.isoformat())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(instance.updated_at.timestamp())
+        )
+        if response is None:
+            response = Response(self.serialize_instance(instance))
+        return _with_validators(response, etag, instance.updated_at)
+
+    def serialize_list(self, queryset):
+        return self.get_serializer(queryset, many=True).data
+
+    def serialize_instance(self, instance):
+        return self.get_serializer(instance).data
+
+
+def _payload_cache():
+    return caches[settings.KEYSTONE_API_CACHE_BACKEND]
+
+
+def _payload_key(pk):
+    return f"{PAYLOAD_PREFIX}{pk}"
+
+
+def cached_app_payloads(queryset, serialize):
+    """
+    Serialized apps of the queryset, in its order. Only apps without a cached
+    payload for their current updated_at are loaded and passed to serialize.
+    serialize: list of apps -> list of dicts
+    """
+    rows = list(queryset.values_list("pk", "updated_at"))
+    cache = _payload_cache()
+    cached = cache.get_many([_payload_key(pk) for pk, _ in rows])
+    payloads = {}
+    for pk, updated_at in rows:
+        entry = cached.get(_payload_key(pk))
+        if entry and entry[0] == updated_at.isoformat():
+            payloads[pk] = entry[1]
+
+    missing = [pk for pk, _ in rows if pk not in payloads]
+    if missing:
+        apps = list(queryset.filter(pk__in=missing))
+        fresh = {}
+        for app, data in zip(apps, serialize(apps)):
+            payloads[app.pk] = dict(data)
+            fresh[_payload_key(app.pk)] = (app.updated_at.isoformat(), payloads[app.pk])
+        cache.set_many(fresh, PAYLOAD_TTL)
+    # Apps deleted in between are left out
+    return [payloads[pk] for pk, _ in rows if pk in payloads]
+
+
+def cached_app_payload(app, serialize):
+    """Serialized app from the payload cache if it hasn't changed since."""
+    cache = _payload_cache()
+    entry = cache.get(_payload_key(app.pk))
+    if entry and entry[0] == app.updated_at.isoformat():
+        return entry[1]
+    data = dict(serialize(app))
+    cache.set(_payload_key(app.pk), (app.updated_at.isoformat(), data), PAYLOAD_TTL)
+    return data
+
+
+def _app_changed(sender, instance, **kwargs):
+    _payload_cache().delete(_payload_key(instance.pk))
+
+
+post_save.connect(_app_changed, sender=App, dispatch_uid="keystone-app-payload-saved")
+post_delete.connect(_app_changed, sender=App, dispatch_uid="keystone-app-payload-deleted")
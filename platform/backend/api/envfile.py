@@ -0,0 +1,95 @@
+"""
+Managed environment files and runtime config hashing.
+
+Keystone owns a single block at the end of an app's `.env`. The block is
+rewritten (never appended) on each deploy with keys in sorted order, so the
+same env vars always produce byte-identical files and redeploys don't keep
+growing the file or invalidating compose interpolation.
+"""
+import hashlib
+import json
+
+from .runtime import atomic_write
+
+MANAGED_HEADER = "# Keystone managed vars - do not edit below this line"
+# Marker written by older Keystone versions that appended on every deploy
+LEGACY_HEADER = "# Keystone injected vars"
+
+
+def user_env_vars(env_vars):
+    """Return user-facing env vars (internal `_keystone_*` keys removed), sorted by key."""
+    return {
+        key: env_vars[key]
+        for key in sorted(env_vars or {})
+        if not key.startswith("_keystone_")
+    }
+
+
+def strip_managed_block(text):
+    """Remove the Keystone-managed (or legacy injected) block from env file text."""
+    lines = text.splitlines()
+    for index, line in enumerate(lines):
+        if line.strip() in (MANAGED_HEADER, LEGACY_HEADER):
+            lines = lines[:index]
+            break
+    while lines and not lines[-1].strip():
+        lines.pop()
+    return lines
+
+
+def render_env_file(base_text, env_vars):
+    """
+    Render a deterministic env file.
+    - Keeps user lines from base_text, minus keys Keystone overrides
+    - Appends the managed block with sorted KEY=value lines
+    """
+    managed = user_env_vars(env_vars)
+    lines = []
+    for line in strip_managed_block(base_text):
+        key = line.split("=", 1)[0].strip()
+        if key.startswith("export "):
+            key = key[len("export "):].strip()
+        if "=" in line and key in managed:
+            continue
+        lines.append(line)
+
+    if managed:
+        if lines:
+            lines.append("")
+        lines.append(MANAGED_HEADER)
+        lines.extend(f"{key}={value}" for key, value in managed.items())
+
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def write_env_file(env_file, env_vars, fallback=None):
+    """
+    Write the managed env file in place.
+    Uses `fallback` (e.g. .env.example) as the base when env_file doesn't exist.
+    Returns True if the file content changed.
+    """
+    base_text = ""
+    if env_file.exists():
+        base_text = env_file.read_text()
+    elif fallback is not None and fallback.exists():
+        base_text = fallback.read_text()
+
+    content = render_env_file(base_text, env_vars)
+    if env_file.exists():
+        if env_file.read_text() == content:
+            return False
+        mode = env_file.stat().st_mode & 0o777
+    elif not content:
+        return False
+    else:
+        mode = 0o644
+
+    # Write atomically so a concurrent compose invocation never sees half a file
+    atomic_write(env_file, content, mode)
+    return True
+
+
+def config_hash(runtime_config):
+    """Stable sha256 of a JSON-serializable runtime config (env, labels, ports, limits)."""
+    payload = json.dumps(runtime_config, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
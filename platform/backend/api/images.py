@@ -0,0 +1,136 @@
+"""
+Base image discovery and pre-pulling.
+
+Finds the images a repo will need (FROM lines of its Dockerfiles, external
+`image:` services in its compose file, or the images of the Dockerfiles
+Keystone generates) so they can be pulled in parallel before `docker build`
+gets to them.
+"""
+import contextvars
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+
+from .analyzer import analyze_repo
+from .compose import load_yaml
+from .runtime import run_cmd
+
+# Base images of the Dockerfiles generated for Django/Node apps during prepare
+GENERATED_BASE_IMAGES = {
+    "django": "python:3.12-slim",
+    "node": "node:20-alpine",
+}
+
+_ARG_RE = re.compile(r"^\s*ARG\s+([A-Za-z_][A-Za-z0-9_]*)(?:=(\S*))?", re.IGNORECASE)
+_FROM_RE = re.compile(r"^\s*FROM\s+(?:--platform=\S+\s+)?(\S+)(?:\s+AS\s+(\S+))?", re.IGNORECASE)
+_VAR_RE = re.compile(r"\$\{?([A-Za-z_][A-Za-z0-9_]*)\}?")
+
+
+def dockerfile_base_images(text):
+    """
+    Return the external base images referenced by a Dockerfile.
+    Skips `scratch`, earlier build stages and images whose ARG has no default.
+    """
+    args = {}
+    stages = set()
+    images = []
+    for line in text.splitlines():
+        arg = _ARG_RE.match(line)
+        if arg and arg.group(2) is not None:
+            args.setdefault(arg.group(1), arg.group(2).strip("\"'"))
+            continue
+        match = _FROM_RE.match(line)
+        if not match:
+            continue
+        image = _VAR_RE.sub(lambda m: args.get(m.group(1), m.group(0)), match.group(1))
+        if match.group(2):
+            stages.add(match.group(2).lower())
+        if image.lower() == "scratch" or image.lower() in stages or "$" in image:
+            continue
+        if image not in images:
+            images.append(image)
+    return images
+
+
+def _read(path):
+    try:
+        return path.read_text()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def compose_images(compose_path):
+    """Images for a compose file: external `image:` services plus their Dockerfile bases."""
+    text = _read(compose_path)
+    if text is None:
+        return []
+    try:
+        data = load_yaml(text) or {}
+    except yaml.YAMLError:
+        return []
+
+    images = []
+    for service in (data.get("services") or {}).values():
+        service = service or {}
+        build = service.get("build")
+        if build:
+            if isinstance(build, str):
+                build = {"context": build}
+            context = compose_path.parent / build.get("context", ".")
+            dockerfile_text = _read(context / build.get("dockerfile", "Dockerfile"))
+            if dockerfile_text:
+                images.extend(dockerfile_base_images(dockerfile_text))
+        elif service.get("image") and "$" not in str(service["image"]):
+            images.append(str(service["image"]))
+    return list(dict.fromkeys(images))
+
+
+def referenced_images(repo_dir):
+    """
+    All images a freshly cloned repo is expected to need for its deploy.
+    Where the compose file / Dockerfile is comes from analyze_repo, so this
+    follows the same layout rules (analyzer.CANDIDATE_SUBDIRS, COMPOSE_FILES)
+    as prepare does.
+    """
+    report = analyze_repo(repo_dir)
+    if report.compose_file:
+        return compose_images(repo_dir / report.compose_file)
+    if report.app_type == "dockerfile":
+        dockerfile_text = _read(repo_dir / report.build_context / "Dockerfile")
+        return dockerfile_base_images(dockerfile_text) if dockerfile_text else []
+    if report.app_type in GENERATED_BASE_IMAGES:
+        return [GENERATED_BASE_IMAGES[report.app_type]]
+    return []
+
+
+def image_present(image):
+    code, _, _ = run_cmd(["docker", "image", "inspect", "--format", "{{.Id}}", image], timeout=30)
+    return code == 0
+
+
+def pull_image(image, refresh=False):
+    """
+    Pull one image. Images already present are skipped unless refresh=True
+    (docker build uses the local copy anyway).
+    Returns: (image, status, seconds) with status "present", "pulled" or an error
+    """
+    started = time.monotonic()
+    if not refresh and image_present(image):
+        return image, "present", 0.0
+    code, out, err = run_cmd(["docker", "pull", image], timeout=600)
+    status = "pulled" if code == 0 else f"failed: {(err or out).strip()[:200]}"
+    return image, status, time.monotonic() - started
+
+
+def start_pulls(images, concurrency):
+    """
+    Start pulling images in the background. Each pull runs in a copy of the
+    caller's context, so its `docker pull` is reported to the caller's
+    track_processes() hook (and can be cancelled).
+    Returns: (executor, futures); call executor.shutdown() once results are collected.
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="keystone-pull")
+    futures = [executor.submit(contextvars.copy_context().run, pull_image, image) for image in images]
+    return executor, futures
@@ -0,0 +1,221 @@
+"""
+Container log archive.
+
+Keystone-managed container logs are shipped into compressed segments under
+/runtime/logs/{slug}/ so they survive `docker rm` and compose recreating
+containers:
+- {start}.log.gz: a multi-member gzip file; every archive pass appends one
+  member, so members can be decompressed on their own
+- {start}.idx: one line per member, "<first ts> <last ts> <offset> <length>"
+- cursors.json: last archived timestamp per container
+
+Range reads use the index to seek straight to the members that overlap the
+requested time range instead of decompressing whole segments. Lines are stored
+in `compose logs --timestamps` format ("<container> | <ts> <message>").
+"""
+import fcntl
+import gzip
+import json
+import logging
+import os
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from .logs import filter_lines, line_timestamp, timestamp_key
+from .logsearch import index_container_lines, parse_timestamp
+from .runtime import LOGS_DIR_CONTAINER, atomic_write, run_cmd
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".log.gz"
+INDEX_SUFFIX = ".idx"
+
+
+def format_timestamp(value):
+    """Docker-style UTC timestamp for a datetime (for since/until cursors)."""
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def app_log_dir(slug):
+    return LOGS_DIR_CONTAINER / slug
+
+
+@contextmanager
+def locked_log_dir(log_dir):
+    """Serialize writers (archiver command, deploys) for one app."""
+    log_dir.mkdir(parents=True, exist_ok=True)
+    with open(log_dir / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def app_containers(app):
+    """Names of the app's containers, running or not."""
+    env_vars = app.env_vars or {}
+    if env_vars.get("_keystone_deploy_mode") == "compose":
+        code, out, _ = run_cmd([
+            "docker", "ps", "-a",
+            "--filter", f"label=com.docker.compose.project=keystone-{app.slug}",
+            "--format", "{{.Names}}",
+        ], timeout=30)
+        return sorted(out.split()) if code == 0 else []
+    return [f"keystone-app-{app.slug}"]
+
+
+def _read_cursors(log_dir):
+    try:
+        return json.loads((log_dir / "cursors.json").read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _segments(log_dir):
+    """Segment paths, oldest first."""
+    return sorted(log_dir.glob(f"*{SEGMENT_SUFFIX}"))
+
+
+def _index_path(segment):
+    return segment.with_name(segment.name[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX)
+
+
+def _read_index(segment):
+    """Index entries of a segment: list of (first_ts, last_ts, offset, length)."""
+    entries = []
+    try:
+        text = _index_path(segment).read_text()
+    except OSError:
+        return entries
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) == 4:
+            entries.append((parts[0], parts[1], int(parts[2]), int(parts[3])))
+    return entries
+
+
+def _segment_start(segment):
+    return datetime.strptime(segment.name[:-len(SEGMENT_SUFFIX)], "%Y%m%dT%H%M%S").replace(tzinfo=timezone.utc)
+
+
+def _active_segment(log_dir, now):
+    """Current segment to append to, rotating by size/age and pruning old ones."""
+    segments = _segments(log_dir)
+    if segments:
+        current = segments[-1]
+        young = (now - _segment_start(current)).total_seconds() < settings.KEYSTONE_LOG_SEGMENT_SECONDS
+        if young and current.stat().st_size < settings.KEYSTONE_LOG_SEGMENT_BYTES:
+            return current
+
+    segment = log_dir / f"{now.strftime('%Y%m%dT%H%M%S')}{SEGMENT_SUFFIX}"
+    for old in (segments + [segment])[:-settings.KEYSTONE_LOG_MAX_SEGMENTS]:
+        old.unlink(missing_ok=True)
+        _index_path(old).unlink(missing_ok=True)
+    return segment
+
+
+def _append_member(segment, lines):
+    """Append lines as one gzip member and record it in the segment index."""
+    timestamps = [ts for ts in map(line_timestamp, lines) if ts]
+    member = gzip.compress(("\n".join(lines) + "\n").encode(), compresslevel=6)
+    with open(segment, "ab") as f:
+        offset = f.tell()
+        f.write(member)
+        f.flush()
+        os.fsync(f.fileno())
+    first = min(timestamps, key=timestamp_key)
+    last = max(timestamps, key=timestamp_key)
+    with open(_index_path(segment), "a") as f:
+        f.write(f"{first} {last} {offset} {len(member)}\n")
+
+
+def archive_app_logs(app):
+    """
+    Ship new log lines of an app's containers into its archive.
+    Returns: number of lines archived
+    """
+    log_dir = app_log_dir(app.slug)
+    with locked_log_dir(log_dir):
+        cursors = _read_cursors(log_dir)
+        new_lines = []
+        for container in app_containers(app):
+            cmd = ["docker", "logs", "--timestamps"]
+            if cursors.get(container):
+                cmd.append(f"--since={cursors[container]}")
+            code, out, err = run_cmd(cmd + [container], timeout=120)
+            if code != 0:
+                continue
+            # --since is inclusive - drop what the last pass already stored
+            lines = filter_lines(out.splitlines() + err.splitlines(), since=cursors.get(container))
+            lines = [line for line in lines if line_timestamp(line)]
+            if not lines:
+                continue
+            cursors[container] = line_timestamp(lines[-1])
+            new_lines.extend(f"{container} | {line}" for line in lines)
+
+        if new_lines:
+            new_lines = filter_lines(new_lines)
+            _append_member(_active_segment(log_dir, datetime.now(timezone.utc)), new_lines)
+            atomic_write(log_dir / "cursors.json", json.dumps(cursors))
+            # Search index follows the archive's retention
+            oldest = [first for first, _, _, _ in _read_index(_segments(log_dir)[0])]
+            prune_before = parse_timestamp(min(oldest, key=timestamp_key)) if oldest else None
+            index_container_lines(app, new_lines, prune_before=prune_before)
+    return len(new_lines)
+
+
+def safe_archive_app_logs(app, logs=None):
+    """archive_app_logs() for deploy paths - never fails the deploy."""
+    try:
+        count = archive_app_logs(app)
+    except Exception:
+        logger.exception("Archiving logs of %s failed", app.slug)
+        return
+    if logs is not None and count:
+        logs.append(f"Archived {count} container log lines")
+
+
+def read_archive(slug, since=None, until=None, limit=None, newest=False):
+    """
+    Archived lines with since < timestamp < until, oldest first: the first
+    `limit` of them, or the last `limit` with newest=True.
+    Only the gzip members whose index range overlaps are decompressed, in
+    time order from the requested end, and reading stops once no further
+    member can hold a line within the limit.
+    Returns: (lines, truncated)
+    """
+    since_key, until_key = timestamp_key(since), timestamp_key(until)
+    entries = []
+    for segment in _segments(app_log_dir(slug)):
+        for first, last, offset, length in _read_index(segment):
+            first_key, last_key = timestamp_key(first), timestamp_key(last)
+            if (since_key and last_key <= since_key) or (until_key and first_key >= until_key):
+                continue
+            entries.append((first_key, last_key, segment, offset, length))
+    # Oldest first by where members start, newest first by where they end
+    entries.sort(key=lambda entry: entry[1] if newest else entry[0], reverse=newest)
+
+    lines = []
+    for first_key, last_key, segment, offset, length in entries:
+        if limit and len(lines) > limit:
+            # The first line past the limit - members entirely beyond it can't change the result
+            bound = timestamp_key(line_timestamp(lines[0] if newest else lines[-1]))
+            if bound and (last_key < bound if newest else first_key > bound):
+                break
+        with open(segment, "rb") as f:
+            f.seek(offset)
+            member = gzip.decompress(f.read(length))
+        member_lines = member.decode(errors="replace").splitlines()
+        # Walking back, the member goes before what was read (ties keep archive order)
+        lines = filter_lines(member_lines + lines if newest else lines + member_lines, since=since, until=until)
+        if limit:
+            # Keep one line past the limit: it marks the result as truncated
+            lines = lines[-(limit + 1):] if newest else lines[:limit + 1]
+
+    truncated = bool(limit) and len(lines) > limit
+    if truncated:
+        lines = lines[1:] if newest else lines[:limit]
+    return lines, truncated
@@ -0,0 +1,186 @@
+"""
+Container log queries.
+
+Logs are always read with `--timestamps`, so every line carries a cursor:
+clients pass the newest timestamp back as `since` to fetch only new lines,
+or the oldest as `until` to page back through history. Both cursors are
+exclusive, so a line is never returned twice.
+"""
+import asyncio
+import re
+import subprocess
+
+from django.conf import settings
+
+from .compose import compose_cmd, compose_files
+from .runtime import REPOS_DIR
+
+# Relative ("10m"), unix ("1700000000.5") or RFC3339 times, as docker accepts them
+_TIME_RE = re.compile(r"^[0-9A-Za-z:.+-]{1,40}$")
+_SERVICE_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+# `docker logs -t`: "<ts> <msg>"; `compose logs -t`: "<container>  | <ts> <msg>"
+_LINE_RE = re.compile(r"^(?:(?P<container>\S+)\s+\|\s)?(?P<ts>\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d+)?Z)\s?")
+_RFC3339_UTC_RE = re.compile(r"^(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(?:\.(\d{1,9}))?Z$")
+
+
+class LogQueryError(ValueError):
+    """Invalid log query parameters."""
+
+
+def timestamp_key(ts):
+    """Sortable key for a docker UTC timestamp (fraction length varies), or None."""
+    match = _RFC3339_UTC_RE.match(ts or "")
+    if not match:
+        return None
+    return match.group(1), (match.group(2) or "").ljust(9, "0")
+
+
+def line_timestamp(line):
+    match = _LINE_RE.match(line)
+    return match.group("ts") if match else None
+
+
+def parse_query(params):
+    """
+    Validate logs query parameters (request.GET).
+    Returns: dict with tail, since, until, services, follow
+    """
+    since, until = params.get("since"), params.get("until")
+    for name, value in (("since", since), ("until", until)):
+        if value is not None and not _TIME_RE.match(value):
+            raise LogQueryError(f"Invalid {name}: {value!r}")
+
+    max_tail = settings.KEYSTONE_LOGS_MAX_TAIL
+    tail = params.get("tail")
+    if tail is None:
+        # Polling for new lines wants all of them (up to the cap)
+        tail = max_tail if since else settings.KEYSTONE_LOGS_TAIL
+    else:
+        try:
+            tail = int(tail)
+        except ValueError:
+            raise LogQueryError(f"Invalid tail: {tail!r}")
+        if not 1 <= tail <= max_tail:
+            raise LogQueryError(f"tail must be between 1 and {max_tail}")
+
+    services = params.getlist("service")
+    for service in services:
+        if not _SERVICE_RE.match(service):
+            raise LogQueryError(f"Invalid service: {service!r}")
+
+    follow = params.get("follow", "").lower() in ("1", "true", "yes")
+    return {"tail": tail, "since": since, "until": until, "services": services, "follow": follow}
+
+
+def logs_cmd(app, tail=100, since=None, until=None, services=(), follow=False):
+    """
+    Command line for an app's container logs (always with timestamps).
+
+    `--tail` is applied by docker before `--until`, so when paging back with
+    `until` the range is read and trimmed by filter_lines() instead. Without
+    `since` that range is the whole history, so only the newest
+    KEYSTONE_LOGS_MAX_SCAN lines are read.
+    Returns: (cmd, cwd) for run_cmd / run_cmd_async
+    """
+    env_vars = app.env_vars or {}
+    deploy_mode = env_vars.get("_keystone_deploy_mode", "dockerfile")
+
+    args = ["--timestamps"]
+    if since:
+        args.append(f"--since={since}")
+    if until:
+        args.append(f"--until={until}")
+        if not since:
+            args.append(f"--tail={settings.KEYSTONE_LOGS_MAX_SCAN}")
+    elif tail:
+        args.append(f"--tail={tail}")
+    if follow:
+        args.append("--follow")
+
+    if deploy_mode == "compose":
+        # Use host path for Docker commands
+        repo_dir = REPOS_DIR / app.slug
+        project_name = f"keystone-{app.slug}"
+        cmd = compose_cmd(project_name, compose_files(env_vars), "logs", "--no-color", *args, *services)
+        return cmd, str(repo_dir)
+
+    # Single container - services don't apply
+    container_name = f"keystone-app-{app.slug}"
+    return ["docker", "logs", *args, container_name], None
+
+
+def filter_lines(lines, tail=None, since=None, until=None):
+    """
+    Order lines by timestamp, make since/until exclusive and keep the last `tail`.
+    Lines without a timestamp (continuations, warnings) stay with their neighbours.
+    """
+    since_key, until_key = timestamp_key(since), timestamp_key(until)
+    keyed = []
+    last_key = ("", "")
+    for line in lines:
+        key = timestamp_key(line_timestamp(line)) or last_key
+        last_key = key
+        if since_key and key <= since_key:
+            continue
+        if until_key and key >= until_key:
+            continue
+        keyed.append((key, line))
+    # Stable: stdout and stderr lines interleave by time, ties keep their order
+    keyed.sort(key=lambda item: item[0])
+    lines = [line for _, line in keyed]
+    return lines[-tail:] if tail else lines
+
+
+def logs_result(code, out, err, query):
+    """Build the logs API payload from command output."""
+    if code != 0:
+        # e.g. container not created yet - show docker's message as before
+        return {"logs": err or out, "lines": 0, "newest": query["since"], "oldest": query["until"]}
+
+    lines = filter_lines(
+        out.splitlines() + err.splitlines(),
+        tail=query["tail"],
+        since=query["since"],
+        until=query["until"],
+    )
+    timestamps = [ts for ts in map(line_timestamp, lines) if ts]
+    return {
+        "logs": "\n".join(lines) + ("\n" if lines else ""),
+        "lines": len(lines),
+        # Pass back as since= for newer lines, or until= for older ones
+        "newest": timestamps[-1] if timestamps else query["since"],
+        "oldest": timestamps[0] if timestamps else query["until"],
+    }
+
+
+async def follow_lines(cmd, cwd=None, since=None, timeout=None):
+    """
+    Stream log lines of a `--follow` command as they arrive.
+    The process is killed when the client disconnects or after `timeout` seconds.
+    """
+    since_key = timestamp_key(since)
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    )
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout else None
+    try:
+        while True:
+            remaining = deadline - loop.time() if deadline else None
+            if remaining is not None and remaining <= 0:
+                break
+            try:
+                line = await asyncio.wait_for(proc.stdout.readline(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if not line:
+                break
+            text = line.decode(errors="replace")
+            key = timestamp_key(line_timestamp(text))
+            if since_key and key and key <= since_key:
+                continue
+            yield text
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
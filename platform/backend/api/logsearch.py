@@ -0,0 +1,147 @@
+"""
+Log search.
+
+Deployment logs and archived container logs are stored as LogChunk rows of
+CHUNK_LINES lines each. The database narrows a search down to the matching
+chunks with its own index (trigram/full-text on Postgres, FTS5 on SQLite);
+only those chunks are scanned line by line to return matches with context.
+"""
+import logging
+from datetime import datetime, timezone
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .logs import line_timestamp
+from .models import LogChunk
+
+logger = logging.getLogger(__name__)
+
+CHUNK_LINES = 50
+# Trigram indexes can't help with shorter terms
+MIN_INDEXED_TERM = 3
+
+
+def parse_timestamp(ts):
+    """datetime for a docker timestamp (nanoseconds are truncated)."""
+    base, _, fraction = ts.rstrip("Z").partition(".")
+    value = datetime.strptime(base, "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=int(fraction[:6].ljust(6, "0"))) if fraction else value
+
+
+def index_deployment_logs(deployment):
+    """(Re)index a finished deployment's logs. Never raises - search is best effort."""
+    try:
+        lines = (deployment.logs or "").splitlines()
+        if deployment.error:
+            lines.append(f"ERROR: {deployment.error}")
+        ended_at = deployment.finished_at or deployment.created_at
+        LogChunk.objects.filter(deployment=deployment).delete()
+        LogChunk.objects.bulk_create(
+            LogChunk(
+                app_id=deployment.app_id,
+                deployment=deployment,
+                source="deployment",
+                first_line=start,
+                started_at=deployment.created_at,
+                ended_at=ended_at,
+                content="\n".join(lines[start:start + CHUNK_LINES]),
+            )
+            for start in range(0, len(lines), CHUNK_LINES)
+        )
+    except Exception:
+        logger.exception("Indexing logs of deployment %s failed", deployment.pk)
+
+
+def index_container_lines(app, lines, prune_before=None):
+    """
+    Index newly archived container log lines (all carrying timestamps).
+    Chunks older than `prune_before` (the oldest archived segment) are dropped.
+    """
+    chunks = []
+    for start in range(0, len(lines), CHUNK_LINES):
+        block = lines[start:start + CHUNK_LINES]
+        timestamps = [parse_timestamp(ts) for ts in map(line_timestamp, block) if ts]
+        if not timestamps:
+            continue
+        chunks.append(LogChunk(
+            app=app,
+            source="container",
+            started_at=min(timestamps),
+            ended_at=max(timestamps),
+            content="\n".join(block),
+        ))
+    LogChunk.objects.bulk_create(chunks)
+    if prune_before is not None:
+        LogChunk.objects.filter(app=app, source="container", ended_at__lt=prune_before).delete()
+
+
+def _fts5_phrase(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _match(queryset, term, words):
+    """Restrict chunks to those matching, using the database's search index."""
+    vendor = connection.vendor
+    if vendor == "postgresql" and words:
+        return queryset.filter(id__in=RawSQL(
+            "SELECT id FROM api_logchunk "
+            "WHERE to_tsvector('simple', content) @@ websearch_to_tsquery('simple', %s)", [term]
+        ))
+    if vendor == "sqlite" and all(len(word) >= MIN_INDEXED_TERM for word in (words or [term])):
+        query = " AND ".join(_fts5_phrase(word) for word in words) if words else _fts5_phrase(term)
+        return queryset.filter(id__in=RawSQL(
+            "SELECT rowid FROM api_logchunk_fts WHERE api_logchunk_fts MATCH %s", [query]
+        ))
+    # Postgres: ILIKE is served by the trigram index
+    if words:
+        for word in words:
+            queryset = queryset.filter(content__icontains=word)
+        return queryset
+    return queryset.filter(content__icontains=term)
+
+
+def search_logs(term, app=None, since=None, until=None, source=None, words=False, context=2, limit=100):
+    """
+    Find log lines containing `term` (or, with words=True, any of its words
+    in chunks containing all of them), newest chunks first.
+    Returns: (matches, truncated) - matches are dicts with the line and
+    `context` lines before and after it
+    """
+    word_list = term.split() if words else None
+    queryset = LogChunk.objects.all()
+    if app is not None:
+        queryset = queryset.filter(app=app)
+    if source:
+        queryset = queryset.filter(source=source)
+    if since:
+        queryset = queryset.filter(ended_at__gte=since)
+    if until:
+        queryset = queryset.filter(started_at__lte=until)
+    queryset = _match(queryset, term, word_list).select_related("app")
+
+    needles = [word.lower() for word in word_list] if word_list else [term.lower()]
+    matches = []
+    for chunk in queryset.order_by("-started_at", "-id").iterator(chunk_size=100):
+        lines = chunk.content.splitlines()
+        for index, line in enumerate(lines):
+            lowered = line.lower()
+            if not any(needle in lowered for needle in needles):
+                continue
+            timestamp = line_timestamp(line)
+            if timestamp and ((since and parse_timestamp(timestamp) < since)
+                              or (until and parse_timestamp(timestamp) > until)):
+                continue
+            if len(matches) == limit:
+                return matches, True
+            matches.append({
+                "app": chunk.app.name,
+                "source": chunk.source,
+                "deployment": chunk.deployment_id,
+                "line_number": chunk.first_line + index + 1 if chunk.source == "deployment" else None,
+                "timestamp": timestamp,
+                "line": line,
+                "before": lines[max(0, index - context):index],
+                "after": lines[index + 1:index + 1 + context],
+            })
+    return matches, False
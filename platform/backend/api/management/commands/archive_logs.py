@@ -0,0 +1,32 @@
+"""Ship container logs of Keystone apps into the compressed log archive."""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.logarchive import archive_app_logs
+from api.models import App
+
+
+class Command(BaseCommand):
+    help = "Archive container logs of running apps under /runtime/logs/{slug}/"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+        parser.add_argument("--interval", type=float, default=15, help="Seconds between passes")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            for app in App.objects.filter(status="running"):
+                try:
+                    count = archive_app_logs(app)
+                except Exception as e:
+                    self.stderr.write(f"{app.slug}: {e}")
+                    continue
+                if count:
+                    self.stdout.write(f"{app.slug}: archived {count} lines")
+            
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
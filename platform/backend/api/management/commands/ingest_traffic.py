@@ -0,0 +1,44 @@
+"""Fold Traefik's JSON access log into per-app traffic buckets."""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.traffic import ingest_access_log, prune_buckets, rotate_access_log
+
+
+class Command(BaseCommand):
+    help = "Ingest the Traefik access log (KEYSTONE_TRAFFIC_LOG) into per-minute traffic buckets"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+        parser.add_argument("--interval", type=float, default=10, help="Seconds between passes")
+        parser.add_argument("--path", help="Access log to read instead of KEYSTONE_TRAFFIC_LOG")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            try:
+                count = ingest_access_log(options["path"])
+            except Exception as e:
+                self.stderr.write(f"Traffic ingest failed: {e}")
+            else:
+                if count:
+                    self.stdout.write(f"Ingested {count} requests")
+            # Rotation and pruning run regardless, so neither failure stops the other
+            try:
+                if rotate_access_log(options["path"]):
+                    self.stdout.write("Rotated the access log")
+            except Exception as e:
+                self.stderr.write(f"Access log rotation failed: {e}")
+            try:
+                pruned = prune_buckets()
+            except Exception as e:
+                self.stderr.write(f"Traffic bucket pruning failed: {e}")
+            else:
+                if pruned:
+                    self.stdout.write(f"Pruned {pruned} expired buckets")
+            
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
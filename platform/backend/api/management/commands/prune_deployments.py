@@ -0,0 +1,48 @@
+"""Compact old deployments into the compressed archive, keeping summary rows."""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.models import App
+from api.retention import compact_app_deployments
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive the logs of deployments older than KEYSTONE_DEPLOYMENT_KEEP_DAYS that are not among "
+        "an app's KEYSTONE_DEPLOYMENT_KEEP most recent, under /runtime/logs/{slug}/deployments/"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep", type=int, default=settings.KEYSTONE_DEPLOYMENT_KEEP,
+                            help="Most recent deployments kept per app")
+        parser.add_argument("--keep-days", type=int, default=settings.KEYSTONE_DEPLOYMENT_KEEP_DAYS,
+                            help="Deployments newer than this are kept")
+        parser.add_argument("--batch-size", type=int, default=200, help="Deployments per transaction")
+        parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+        parser.add_argument("--app", help="Only this app (name)")
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be compacted")
+
+    def handle(self, *args, **options):
+        apps = App.objects.order_by("name")
+        if options["app"]:
+            apps = apps.filter(name=options["app"])
+        
+        total = 0
+        for app in apps:
+            try:
+                count = compact_app_deployments(
+                    app,
+                    keep=max(0, options["keep"]),
+                    keep_days=max(0, options["keep_days"]),
+                    batch_size=max(1, options["batch_size"]),
+                    pause=options["pause"],
+                    dry_run=options["dry_run"],
+                )
+            except Exception as e:
+                self.stderr.write(f"{app.slug}: {e}")
+                continue
+            if count:
+                verb = "would compact" if options["dry_run"] else "compacted"
+                self.stdout.write(f"{app.slug}: {verb} {count} deployments")
+            total += count
+        self.stdout.write(f"Total: {total}")
@@ -0,0 +1,36 @@
+"""Fail deployments left running by a backend that stopped mid-deploy."""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import App, Deployment
+
+
+class Command(BaseCommand):
+    help = (
+        "Mark pending/running deployments failed and reset apps stuck in preparing/deploying. "
+        "Deploys only run inside the backend, so run this before it starts serving."
+    )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        interrupted = Deployment.objects.filter(status__in=["pending", "running"])
+        count = interrupted.update(
+            status="failed",
+            error="Interrupted: the backend restarted during this deployment",
+            finished_at=now,
+            process_group=None,
+            build_state="done",
+            queue_position=None,
+            expected_wait_seconds=None,
+        )
+        
+        stuck = App.objects.filter(status__in=["preparing", "deploying"])
+        apps = 0
+        for app in stuck:
+            app.status = "failed"
+            app.error_message = "Interrupted: the backend restarted during prepare/deploy"
+            app.save()
+            apps += 1
+        
+        if count or apps:
+            self.stdout.write(f"Recovered {count} interrupted deployments and {apps} apps")
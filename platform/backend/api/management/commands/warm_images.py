@@ -0,0 +1,42 @@
+"""Keep the base images of all apps pulled, and prune old builder cache."""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.warmup import collect_images, host_busy, prune_builder_cache, warm_images
+
+
+class Command(BaseCommand):
+    help = "Pre-pull / refresh base images of all apps while the host is idle, and prune old BuildKit cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+        parser.add_argument("--interval", type=float, default=900, help="Seconds between passes")
+        parser.add_argument("--dry-run", action="store_true", help="List the images and which are due, then exit")
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            due = {image for image, _, _ in warm_images(dry_run=True)}
+            for image, apps in collect_images():
+                self.stdout.write(f"{image}: {apps} apps{' (due)' if image in due else ''}")
+            return
+        
+        while True:
+            close_old_connections()
+            try:
+                if host_busy():
+                    self.stdout.write("Deployments in progress, skipping this pass")
+                else:
+                    for image, status, seconds in warm_images():
+                        self.stdout.write(f"{image}: {status} ({seconds:.1f}s)")
+                    if not host_busy():
+                        summary = prune_builder_cache()
+                        if summary:
+                            self.stdout.write(f"Builder cache pruned: {summary}")
+            except Exception as e:
+                self.stderr.write(f"Warm-up failed: {e}")
+            
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
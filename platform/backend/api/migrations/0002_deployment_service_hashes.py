@@ -0,0 +1,18 @@
+# Generated migration for Keystone
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deployment',
+            name='service_hashes',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated migration for Keystone
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_deployment_service_hashes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deployment',
+            name='config_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='deployment',
+            name='image_id',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated migration for Keystone
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_deployment_config_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Route',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Router name (unique per app)', max_length=100)),
+                ('path_prefix', models.CharField(max_length=500)),
+                ('priority', models.IntegerField(default=0)),
+                ('strip_prefix', models.BooleanField(default=True)),
+                ('middlewares', models.JSONField(blank=True, default=dict, help_text='Traefik middleware definitions by name')),
+                ('backends', models.JSONField(blank=True, default=list, help_text='Weighted backends')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('app', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='routes', to='api.app')),
+            ],
+            options={
+                'ordering': ['app', 'name'],
+                'unique_together': {('app', 'name')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated migration for Keystone
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_route'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deployment',
+            name='commit_sha',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='deployment',
+            name='trigger',
+            field=models.CharField(choices=[('manual', 'Manual'), ('webhook', 'Webhook')], default='manual', max_length=20),
+        ),
+    ]
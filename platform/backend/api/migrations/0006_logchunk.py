@@ -0,0 +1,72 @@
+# Generated migration for Keystone
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Search indexes depend on the database: pg_trgm + full-text GIN indexes on
+# Postgres, an external-content FTS5 table kept in sync by triggers on SQLite.
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX api_logchunk_content_trgm ON api_logchunk USING gin (content gin_trgm_ops)",
+    "CREATE INDEX api_logchunk_content_fts ON api_logchunk USING gin (to_tsvector('simple', content))",
+]
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS api_logchunk_content_fts",
+    "DROP INDEX IF EXISTS api_logchunk_content_trgm",
+]
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE api_logchunk_fts USING fts5("
+    "content, content='api_logchunk', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER api_logchunk_fts_insert AFTER INSERT ON api_logchunk BEGIN "
+    "INSERT INTO api_logchunk_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER api_logchunk_fts_delete AFTER DELETE ON api_logchunk BEGIN "
+    "INSERT INTO api_logchunk_fts(api_logchunk_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER api_logchunk_fts_update AFTER UPDATE ON api_logchunk BEGIN "
+    "INSERT INTO api_logchunk_fts(api_logchunk_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+    "INSERT INTO api_logchunk_fts(rowid, content) VALUES (new.id, new.content); END",
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS api_logchunk_fts_update",
+    "DROP TRIGGER IF EXISTS api_logchunk_fts_delete",
+    "DROP TRIGGER IF EXISTS api_logchunk_fts_insert",
+    "DROP TABLE IF EXISTS api_logchunk_fts",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+create_search_indexes = _run({"postgresql": POSTGRES_FORWARD, "sqlite": SQLITE_FORWARD})
+drop_search_indexes = _run({"postgresql": POSTGRES_REVERSE, "sqlite": SQLITE_REVERSE})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_deployment_trigger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('deployment', 'Deployment logs'), ('container', 'Container logs')], max_length=20)),
+                ('first_line', models.IntegerField(default=0)),
+                ('started_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField()),
+                ('content', models.TextField()),
+                ('app', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='log_chunks', to='api.app')),
+                ('deployment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='log_chunks', to='api.deployment')),
+            ],
+            options={
+                'ordering': ['-started_at', 'first_line'],
+                'indexes': [models.Index(fields=['app', 'started_at'], name='api_logchun_app_id_d061ee_idx')],
+            },
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,23 @@
+# Generated migration for Keystone
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_bulkoperation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deployment',
+            name='previous_app_status',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='deployment',
+            name='process_group',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated migration for Keystone
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_deployment_cancel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deployment',
+            name='build_finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='deployment',
+            name='build_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='deployment',
+            name='build_state',
+            field=models.CharField(blank=True, choices=[('queued', 'Waiting for a build slot'), ('building', 'Building'), ('done', 'Build finished')], default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='deployment',
+            name='expected_wait_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='deployment',
+            name='priority',
+            field=models.CharField(choices=[('hotfix', 'Hotfix'), ('routine', 'Routine'), ('bulk', 'Bulk')], default='routine', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='deployment',
+            name='queue_position',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='deployment',
+            name='queued_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='deployment',
+            index=models.Index(fields=['build_state', 'status'], name='api_deploym_build_s_8aa87e_idx'),
+        ),
+    ]
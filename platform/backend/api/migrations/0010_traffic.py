@@ -0,0 +1,46 @@
+# Generated migration for Keystone
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_build_scheduling'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrafficCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=500, unique=True)),
+                ('inode', models.BigIntegerField(default=0)),
+                ('offset', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TrafficBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('router', models.CharField(max_length=200)),
+                ('minute', models.DateTimeField()),
+                ('requests', models.IntegerField(default=0)),
+                ('status_2xx', models.IntegerField(default=0)),
+                ('status_3xx', models.IntegerField(default=0)),
+                ('status_4xx', models.IntegerField(default=0)),
+                ('status_5xx', models.IntegerField(default=0)),
+                ('duration_ms_sum', models.FloatField(default=0)),
+                ('duration_ms_max', models.FloatField(default=0)),
+                ('latency_histogram', models.JSONField(blank=True, default=dict)),
+                ('app', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='traffic_buckets', to='api.app')),
+            ],
+            options={
+                'ordering': ['minute', 'router'],
+                'indexes': [models.Index(fields=['app', 'minute'], name='api_traffic_app_id_a7d8a6_idx'), models.Index(fields=['minute'], name='api_traffic_minute_c0203d_idx')],
+                'unique_together': {('router', 'minute')},
+            },
+        ),
+    ]
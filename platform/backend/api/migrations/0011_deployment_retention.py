@@ -0,0 +1,27 @@
+# Generated migration for Keystone
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_traffic'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deployment',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='deployment',
+            name='logs_archive',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='deployment',
+            index=models.Index(fields=['app', '-created_at'], name='api_deploy_app_created_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated migration for Keystone
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_updated_at(apps, schema_editor):
+    Deployment = apps.get_model("api", "Deployment")
+    Deployment.objects.update(updated_at=Coalesce("finished_at", "created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_deployment_retention'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deployment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='app',
+            index=models.Index(fields=['updated_at'], name='api_app_updated_6db997_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deployment',
+            index=models.Index(fields=['updated_at'], name='api_deploym_updated_c8256a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deployment',
+            index=models.Index(fields=['app', 'updated_at'], name='api_deploym_app_id_8054b5_idx'),
+        ),
+    ]
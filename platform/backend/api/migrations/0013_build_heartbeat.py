@@ -0,0 +1,18 @@
+# Generated migration for Keystone
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_conditional_reads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deployment',
+            name='build_heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
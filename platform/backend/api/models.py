@@ -7,6 +7,7 @@ Keystone Models - Simple VPS Deployment
 3. Deploy - Run the app
 """
 from django.db import models
+from django.utils import timezone
 
 
 class App(models.Model):
@@ -44,6 +45,10 @@ class App(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        # Latest change (ETag / Last-Modified of the app list)
+        indexes = [models.Index(fields=["updated_at"])]
+    
     def __str__(self):
         return f"{self.name} ({self.status})"
     
@@ -53,19 +58,227 @@ class App(models.Model):
         return self.name.lower().replace(" ", "-").replace("_", "-")
 
 
+class DeploymentQuerySet(models.QuerySet):
+    
+    def update(self, **kwargs):
+        # Queryset updates skip auto_now - updated_at drives conditional GETs
+        kwargs.setdefault("updated_at", timezone.now())
+        return super().update(**kwargs)
+
+
 class Deployment(models.Model):
     """Deployment history for an app."""
     
+    PRIORITY_CHOICES = [
+        ("hotfix", "Hotfix"),
+        ("routine", "Routine"),
+        ("bulk", "Bulk"),
+    ]
+    
+    BUILD_STATE_CHOICES = [
+        ("queued", "Waiting for a build slot"),
+        ("building", "Building"),
+        ("done", "Build finished"),
+    ]
+    
+    TRIGGER_CHOICES = [
+        ("manual", "Manual"),
+        ("webhook", "Webhook"),
+        ("bulk", "Bulk operation"),
+    ]
+    
     app = models.ForeignKey(App, on_delete=models.CASCADE, related_name="deployments")
+    # pending, running, success, failed or cancelled
     status = models.CharField(max_length=20, default="pending")
+    trigger = models.CharField(max_length=20, choices=TRIGGER_CHOICES, default="manual")
+    commit_sha = models.CharField(max_length=40, blank=True, default="")
     logs = models.TextField(blank=True, default="")
     error = models.TextField(blank=True, default="")
     
+    # Per-service fingerprints for compose deployments (config + image inputs)
+    service_hashes = models.JSONField(default=dict, blank=True)
+    # Hash of the effective runtime config (env, labels, ports, limits) and image built
+    config_hash = models.CharField(max_length=64, blank=True, default="")
+    image_id = models.CharField(max_length=100, blank=True, default="")
+    
+    # Build scheduling (see api/scheduler.py)
+    priority = models.CharField(max_length=20, choices=PRIORITY_CHOICES, default="routine")
+    build_state = models.CharField(max_length=20, choices=BUILD_STATE_CHOICES, blank=True, default="")
+    queue_position = models.IntegerField(null=True, blank=True)
+    expected_wait_seconds = models.FloatField(null=True, blank=True)
+    queued_at = models.DateTimeField(null=True, blank=True)
+    build_started_at = models.DateTimeField(null=True, blank=True)
+    build_finished_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by the waiting process on every poll; rows without a recent
+    # one (process died) drop out of the queue
+    build_heartbeat_at = models.DateTimeField(null=True, blank=True)
+    
+    # For cancelling: process group of the command running now, and the app
+    # status to restore
+    process_group = models.IntegerField(null=True, blank=True)
+    previous_app_status = models.CharField(max_length=20, blank=True, default="")
+    
+    # Retention (see api/retention.py): logs moved to a gzip member
+    # {"file", "offset", "length"} under /runtime/logs/{slug}/
+    archived_at = models.DateTimeField(null=True, blank=True)
+    logs_archive = models.JSONField(null=True, blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     finished_at = models.DateTimeField(null=True, blank=True)
     
+    objects = DeploymentQuerySet.as_manager()
+    
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # The build queue (queued/building deployments)
+            models.Index(fields=["build_state", "status"]),
+            # History of an app, newest first
+            models.Index(fields=["app", "-created_at"], name="api_deploy_app_created_idx"),
+            # Latest change, overall and per app (ETag / Last-Modified)
+            models.Index(fields=["updated_at"]),
+            models.Index(fields=["app", "updated_at"]),
+        ]
     
     def __str__(self):
         return f"{self.app.name} - {self.status} - {self.created_at}"
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "updated_at" not in update_fields:
+            kwargs["update_fields"] = [*update_fields, "updated_at"]
+        super().save(*args, **kwargs)
+
+
+class LogChunk(models.Model):
+    """
+    A block of consecutive log lines, indexed for search.
+    Postgres: trigram and full-text GIN indexes; SQLite: an FTS5 table
+    (both created in migration 0006).
+    """
+    
+    SOURCE_CHOICES = [
+        ("deployment", "Deployment logs"),
+        ("container", "Container logs"),
+    ]
+    
+    app = models.ForeignKey(App, on_delete=models.CASCADE, related_name="log_chunks")
+    deployment = models.ForeignKey(
+        Deployment, on_delete=models.CASCADE, null=True, blank=True, related_name="log_chunks"
+    )
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    # Line number of the first line within the deployment's logs
+    first_line = models.IntegerField(default=0)
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField()
+    content = models.TextField()
+    
+    class Meta:
+        indexes = [models.Index(fields=["app", "started_at"])]
+        ordering = ["-started_at", "first_line"]
+    
+    def __str__(self):
+        return f"{self.app.name} - {self.source} - {self.started_at}"
+
+
+class BulkOperation(models.Model):
+    """
+    A prepare/deploy/stop run across several apps (see api/bulk.py).
+    Results are keyed by app id: {"app": name, "status": ..., "result" or "error"}
+    with status "pending", "running", "succeeded" or "failed".
+    """
+    
+    ACTION_CHOICES = [
+        ("prepare", "Prepare"),
+        ("deploy", "Deploy"),
+        ("stop", "Stop"),
+    ]
+    
+    STATUS_CHOICES = [
+        ("running", "Running"),
+        ("finished", "Finished"),
+    ]
+    
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="running")
+    total = models.IntegerField(default=0)
+    succeeded = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    results = models.JSONField(default=dict, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ["-created_at"]
+    
+    def __str__(self):
+        return f"{self.action} x{self.total} ({self.status})"
+
+
+class Route(models.Model):
+    """
+    Traefik route for an app, rendered by the file provider.
+    Backends are {"url": ..., "weight": n} or {"app": <app name>, "weight": n};
+    an empty list routes to the app's own container.
+    """
+    
+    app = models.ForeignKey(App, on_delete=models.CASCADE, related_name="routes")
+    name = models.CharField(max_length=100, help_text="Router name (unique per app)")
+    path_prefix = models.CharField(max_length=500)
+    priority = models.IntegerField(default=0)
+    strip_prefix = models.BooleanField(default=True)
+    middlewares = models.JSONField(default=dict, blank=True, help_text="Traefik middleware definitions by name")
+    backends = models.JSONField(default=list, blank=True, help_text="Weighted backends")
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = [("app", "name")]
+        ordering = ["app", "name"]
+    
+    def __str__(self):
+        return f"{self.app.name} - {self.name} ({self.path_prefix})"
+
+
+class TrafficBucket(models.Model):
+    """
+    Requests through one Traefik router in one minute (see api/traffic.py).
+    latency_histogram maps a log-scale latency bucket index to a request count,
+    so percentiles can be estimated over any range of buckets.
+    """
+    
+    app = models.ForeignKey(App, on_delete=models.CASCADE, related_name="traffic_buckets")
+    router = models.CharField(max_length=200)
+    minute = models.DateTimeField()
+    requests = models.IntegerField(default=0)
+    status_2xx = models.IntegerField(default=0)
+    status_3xx = models.IntegerField(default=0)
+    status_4xx = models.IntegerField(default=0)
+    status_5xx = models.IntegerField(default=0)
+    duration_ms_sum = models.FloatField(default=0)
+    duration_ms_max = models.FloatField(default=0)
+    latency_histogram = models.JSONField(default=dict, blank=True)
+    
+    class Meta:
+        unique_together = [("router", "minute")]
+        # minute alone: retention pruning across all apps
+        indexes = [models.Index(fields=["app", "minute"]), models.Index(fields=["minute"])]
+        ordering = ["minute", "router"]
+    
+    def __str__(self):
+        return f"{self.router} @ {self.minute}: {self.requests}"
+
+
+class TrafficCursor(models.Model):
+    """How far the Traefik access log at path has been ingested."""
+    
+    path = models.CharField(max_length=500, unique=True)
+    inode = models.BigIntegerField(default=0)
+    offset = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.path} @ {self.offset}"
@@ -0,0 +1,688 @@
+"""
+Keystone deploy pipeline.
+
+The prepare/deploy/stop steps behind the API actions, as plain functions so
+they can also run outside a request (webhooks, background jobs).
+"""
+import shutil
+import time
+from concurrent.futures import wait
+
+from django.conf import settings
+from django.utils import timezone
+
+from .analyzer import analyze_repo, commit_sha
+from .compose import (
+    OVERRIDE_FILE,
+    compose_cmd,
+    compose_files,
+    diff_services,
+    inject_traefik_config,
+    load_effective_config,
+    missing_built_images,
+    service_fingerprints,
+)
+from .envfile import config_hash, user_env_vars, write_env_file
+from .images import referenced_images, start_pulls
+from .logarchive import safe_archive_app_logs
+from .logsearch import index_deployment_logs
+from .models import Deployment
+from .runtime import (
+    REPOS_DIR,
+    REPOS_DIR_CONTAINER,
+    TRAEFIK_NETWORK,
+    ensure_dir,
+    kill_process_group,
+    run_cmd,
+    track_processes,
+)
+from .scheduler import build_slot
+from .traefik import file_provider_enabled, sync_routes
+
+# Statuses the prepare / deploy actions may start from
+PREPARE_FROM_STATUSES = ("imported", "failed", "prepared")
+DEPLOY_FROM_STATUSES = ("prepared", "running", "stopped", "failed")
+# How often waiting for pre-pulls checks for a cancel
+PULL_POLL_SECONDS = 1.0
+
+
+class DeploymentCancelled(Exception):
+    """The deployment was cancelled through the API while it was running."""
+
+
+def _process_tracker(deployment):
+    """
+    track_processes() hook: records the running command's process group on
+    the deployment (for cancel_deployment), and kills commands started after
+    the deployment was cancelled.
+    """
+    def hook(pgid):
+        updated = Deployment.objects.filter(pk=deployment.pk, status="running").update(process_group=pgid)
+        if not updated and pgid is not None:
+            kill_process_group(pgid)
+    return hook
+
+
+def _is_cancelled(deployment):
+    return Deployment.objects.filter(pk=deployment.pk, status="cancelled").exists()
+
+
+def _remember_app_status(app, deployment):
+    """Record the app's status before the deployment touches it (restored on cancel)."""
+    if not deployment.previous_app_status:
+        deployment.previous_app_status = app.status
+        deployment.save(update_fields=["previous_app_status"])
+
+
+def _restore_app_status(app, deployment):
+    app.status = deployment.previous_app_status or "failed"
+    app.error_message = ""
+    app.save()
+
+
+def _finish_cancelled(app, deployment, logs):
+    """Wrap up in the deploy thread after a cancel: keep the logs, restore the app."""
+    Deployment.objects.filter(pk=deployment.pk).update(
+        logs="\n".join(logs + ["Deployment cancelled"]), process_group=None
+    )
+    deployment.refresh_from_db()
+    _restore_app_status(app, deployment)
+    index_deployment_logs(deployment)
+
+
+def _finish_success(app, deployment, logs, container_id):
+    """
+    Mark the deployment successful, then the app running. Only a deployment
+    still running is updated: a cancel that landed after the last command
+    keeps its status and error, and the app the status it was given back.
+    Raises DeploymentCancelled if the deployment is no longer running.
+    """
+    finished_at = timezone.now()
+    fields = {
+        "status": "success",
+        "logs": "\n".join(logs),
+        "finished_at": finished_at,
+        # Set on the instance during the deploy
+        "commit_sha": deployment.commit_sha,
+        "service_hashes": deployment.service_hashes,
+        "config_hash": deployment.config_hash,
+        "image_id": deployment.image_id,
+    }
+    if not Deployment.objects.filter(pk=deployment.pk, status="running").update(**fields):
+        raise DeploymentCancelled(f"Deployment {deployment.pk} was cancelled")
+    for name, value in fields.items():
+        setattr(deployment, name, value)
+    
+    app.container_id = container_id
+    app.status = "running"
+    app.save()
+    index_deployment_logs(deployment)
+
+
+def cancel_deployment(deployment):
+    """
+    Cancel a running deployment: mark it cancelled with the elapsed time, kill
+    the process group of its running command and give the app its previous
+    status back. The deploy thread stops as soon as its command dies (or when
+    it starts the next one).
+    Returns False if the deployment had already finished.
+    """
+    now = timezone.now()
+    cancelled = Deployment.objects.filter(pk=deployment.pk, status__in=["pending", "running"]).update(
+        status="cancelled", finished_at=now
+    )
+    if not cancelled:
+        return False
+    
+    deployment.refresh_from_db()
+    if deployment.process_group:
+        kill_process_group(deployment.process_group)
+    deployment.error = f"Cancelled after {(now - deployment.created_at).total_seconds():.1f}s"
+    deployment.save(update_fields=["error"])
+    _restore_app_status(deployment.app, deployment)
+    return True
+
+
+def prepare_app(app, on_cloned=None):
+    """
+    Step 2: Prepare repo for Traefik deployment.
+    - Clone the repo
+    - Detect structure (Django backend, frontend, docker-compose, etc.)
+    - Generate Traefik labels
+    on_cloned(repo_dir_container) is called right after the clone, before
+    structure detection. Returns the detected structure. On error the app is
+    marked failed and the exception re-raised.
+    """
+    app.status = "preparing"
+    app.error_message = ""
+    app.save()
+    
+    try:
+        # Clone or update repo
+        # Use container path for file operations (git clone, file checks)
+        repo_dir_container = REPOS_DIR_CONTAINER / app.slug
+        ensure_dir(REPOS_DIR_CONTAINER)
+        
+        if repo_dir_container.exists():
+            shutil.rmtree(repo_dir_container)
+        
+        # Clone repo to container path (will be visible on host via volume mount)
+        code, out, err = run_cmd(
+            ["git", "clone", "--depth", "1", "-b", app.branch, app.git_url, str(repo_dir_container)]
+        )
+        
+        if code != 0:
+            raise Exception(f"Git clone failed: {err or out}")
+        
+        if on_cloned is not None:
+            on_cloned(repo_dir_container)
+        
+        # Single-pass structure analysis (cached per commit) of the clean checkout
+        report = analyze_repo(repo_dir_container)
+        has_compose = report.compose_file is not None
+        compose_file = report.compose_file
+        app_type = report.app_type
+        build_context = repo_dir_container / report.build_context if report.build_context else None
+        dockerfile_path = build_context / "Dockerfile" if app_type == "dockerfile" else None
+        
+        structure = {
+            "dockerfile": report.has_root("dockerfiles") or (dockerfile_path is not None),
+            "docker_compose": has_compose,
+            "django": report.has_root("manage_py") or app_type == "django",
+            "python": report.has_root("requirements") or app_type == "python",
+            "node": report.has_root("package_json") or app_type == "node",
+            "build_context": report.build_context or ".",
+            "deploy_mode": "compose" if has_compose else "dockerfile",
+            "lockfiles": report.lockfiles,
+            "exposed_ports": report.exposed_ports,
+            "commit": report.commit_sha,
+        }
+        
+        # Determine deployment strategy
+        if has_compose:
+            # Multi-service app with docker-compose.yml
+            # Render Traefik configuration into a Keystone override file
+            compose_path = repo_dir_container / compose_file
+            modified_services = inject_traefik_config(
+                compose_path, 
+                app.slug, 
+                f"PathPrefix(`/{app.slug}`)",
+                add_labels=not file_provider_enabled()
+            )
+            
+            # Store the compose file path for deploy step
+            app.env_vars = app.env_vars or {}
+            app.env_vars["_keystone_deploy_mode"] = "compose"
+            app.env_vars["_keystone_compose_file"] = compose_file
+            app.env_vars["_keystone_compose_override"] = OVERRIDE_FILE
+            # Routed services, used to render Traefik file provider config
+            app.env_vars["_keystone_services"] = modified_services
+            
+            structure["message"] = f"Generated {OVERRIDE_FILE} with Traefik routing"
+            structure["modified_services"] = modified_services
+            structure["traefik_injected"] = True
+            
+        elif dockerfile_path:
+            # Found Dockerfile (possibly in subdirectory)
+            app.env_vars = app.env_vars or {}
+            app.env_vars["_keystone_deploy_mode"] = "dockerfile"
+            app.env_vars["_keystone_build_context"] = report.build_context
+            
+        elif app_type == "django":
+            # Generate Django Dockerfile
+            dockerfile_content = generate_django_dockerfile()
+            with open(build_context / "Dockerfile", "w") as f:
+                f.write(dockerfile_content)
+            app.env_vars = app.env_vars or {}
+            app.env_vars["_keystone_deploy_mode"] = "dockerfile"
+            app.env_vars["_keystone_build_context"] = report.build_context
+            structure["generated_dockerfile"] = True
+            
+        elif app_type == "node":
+            # Generate Node Dockerfile
+            dockerfile_content = generate_node_dockerfile()
+            with open(build_context / "Dockerfile", "w") as f:
+                f.write(dockerfile_content)
+            app.env_vars = app.env_vars or {}
+            app.env_vars["_keystone_deploy_mode"] = "dockerfile"
+            app.env_vars["_keystone_build_context"] = report.build_context
+            structure["generated_dockerfile"] = True
+            
+        else:
+            raise Exception(
+                "No Dockerfile or docker-compose.yml found, and couldn't detect app type. "
+                "Checked: root, backend/, app/, src/, api/, server/ directories. "
+                "Please add a Dockerfile or docker-compose.yml to your repository."
+            )
+        
+        # Set Traefik rule (path-based routing)
+        app.traefik_rule = f"PathPrefix(`/{app.slug}`)"
+        app.status = "prepared"
+        app.save()
+        
+        return structure
+        
+    except Exception as e:
+        app.status = "failed"
+        app.error_message = str(e)
+        app.save()
+        raise
+
+
+def deploy_app(app, deployment, logs=None):
+    """
+    Step 3: Deploy the app.
+    - For docker-compose apps: use docker compose up
+    - For single Dockerfile apps: build and run with Traefik labels
+    Returns a result dict. On error the app and deployment are marked failed
+    and the exception re-raised; DeploymentCancelled if it was cancelled.
+    """
+    _remember_app_status(app, deployment)
+    with track_processes(_process_tracker(deployment)):
+        return _deploy_app(app, deployment, logs)
+
+
+def _deploy_app(app, deployment, logs):
+    app.status = "deploying"
+    app.error_message = ""
+    app.save()
+    
+    logs = logs if logs is not None else []
+    
+    try:
+        if _is_cancelled(deployment):
+            raise DeploymentCancelled(f"Deployment {deployment.pk} was cancelled")
+        
+        # Use host path for Docker commands (Docker runs on host)
+        repo_dir = REPOS_DIR / app.slug
+        # Use container path for file checks
+        repo_dir_container = REPOS_DIR_CONTAINER / app.slug
+        
+        if not repo_dir_container.exists():
+            # Also check host path in case volume mount issue
+            if not repo_dir.exists():
+                raise Exception(f"Repo not found. Please prepare first. Checked: {repo_dir_container} and {repo_dir}")
+            else:
+                # Host path exists but container path doesn't - volume mount issue
+                raise Exception(f"Repo exists on host at {repo_dir} but not visible in container at {repo_dir_container}. Check volume mount.")
+        
+        # Record which commit is being deployed
+        deployment.commit_sha = commit_sha(repo_dir_container)
+        
+        # Get deployment mode from env_vars (set during prepare)
+        env_vars = app.env_vars or {}
+        deploy_mode = env_vars.get("_keystone_deploy_mode", "dockerfile")
+        
+        if deploy_mode == "compose":
+            # Deploy using docker-compose
+            return _deploy_compose(app, deployment, repo_dir, logs)
+        else:
+            # Deploy using single Dockerfile
+            return _deploy_dockerfile(app, deployment, repo_dir, logs)
+        
+    except Exception as e:
+        if _is_cancelled(deployment):
+            _finish_cancelled(app, deployment, logs)
+            if isinstance(e, DeploymentCancelled):
+                raise
+            raise DeploymentCancelled(f"Deployment {deployment.pk} was cancelled") from e
+        
+        app.status = "failed"
+        app.error_message = str(e)
+        app.save()
+        
+        deployment.status = "failed"
+        deployment.error = str(e)
+        deployment.logs = "\n".join(logs)
+        deployment.finished_at = timezone.now()
+        deployment.save()
+        index_deployment_logs(deployment)
+        raise
+
+
+def _deploy_compose(app, deployment, repo_dir, logs):
+    """Deploy app using docker-compose with Traefik routing."""
+    env_vars = app.env_vars or {}
+    files = compose_files(env_vars)
+    # repo_dir is already the host path (passed from deploy method)
+    
+    logs.append(f"Deploying with docker-compose: {', '.join(files)}")
+    logs.append(f"Traefik routing: {app.traefik_rule}")
+    
+    # Create a project name based on app slug
+    project_name = f"keystone-{app.slug}"
+    
+    # Write Keystone env vars into a managed block of .env (based on
+    # .env.example when the repo has no .env) - rewritten, never appended
+    # Use container path for file operations (files are in container, visible on host via mount)
+    repo_dir_container = REPOS_DIR_CONTAINER / app.slug
+    env_file = repo_dir_container / ".env"
+    if write_env_file(env_file, env_vars, fallback=repo_dir_container / ".env.example"):
+        logs.append(f"Updated .env with {len(user_env_vars(env_vars))} Keystone env vars")
+    
+    # Work out which services changed since the last successful deployment
+    # (effective config is rendered after .env so interpolation is included)
+    config = load_effective_config(project_name, files, str(repo_dir))
+    fingerprints = service_fingerprints(config, repo_dir_container)
+    previous = app.deployments.filter(status="success").exclude(pk=deployment.pk).first()
+    previous_fingerprints = previous.service_hashes if previous else {}
+    changed, unchanged, removed = diff_services(previous_fingerprints, fingerprints)
+    deployment.service_hashes = fingerprints
+    deployment.config_hash = config_hash(fingerprints)
+    
+    def build_images(names):
+        logs.append(f"Building images: {', '.join(names)}")
+        docker_cmd = compose_cmd(project_name, files, "build", *names)
+        with build_slot(deployment, logs):
+            code, out, err = run_cmd(
+                docker_cmd,
+                cwd=str(repo_dir),
+                timeout=900
+            )
+        logs.append(f"Build output:\n{out}\n{err}")
+        
+        if code != 0:
+            raise Exception(f"Docker compose build failed: {err or out}")
+    
+    # Unchanged services start with --no-build - rebuild those whose image is
+    # gone (removed by hand or pruned) instead of failing the deploy
+    missing = missing_built_images(project_name, config, unchanged)
+    if missing:
+        logs.append(f"Images missing for unchanged services: {', '.join(missing)}")
+    
+    if previous and previous.config_hash == deployment.config_hash:
+        # Nothing changed - just make sure the stack is up, never recreate
+        if missing:
+            logs.append("Config unchanged since last deployment, rebuilding missing images only")
+            build_images(missing)
+        else:
+            logs.append("Config and images unchanged since last deployment, skipping rebuild")
+        code, out, err = run_cmd(
+            compose_cmd(project_name, files, "up", "-d", "--no-build", "--no-recreate"),
+            cwd=str(repo_dir),
+            timeout=300
+        )
+        logs.append(f"Up output:\n{out}\n{err}")
+        
+        if code != 0:
+            raise Exception(f"Docker compose up failed: {err or out}")
+    else:
+        logs.append(f"Changed services: {', '.join(changed) or 'none'}")
+        logs.append(f"Unchanged services: {', '.join(unchanged) or 'none'}")
+        if removed:
+            logs.append(f"Removed services: {', '.join(removed)}")
+        
+        # Build images only for changed services that have a build section
+        to_build = [name for name in changed if config["services"][name].get("build")] + missing
+        if to_build:
+            build_images(to_build)
+        else:
+            logs.append("No images to rebuild")
+        
+        # Start services - compose only recreates containers whose config or
+        # image changed, so unchanged services keep running untouched.
+        # Recreated and orphaned containers lose their logs - archive first.
+        safe_archive_app_logs(app, logs)
+        logs.append("Starting services with Traefik routing...")
+        code, out, err = run_cmd(
+            compose_cmd(project_name, files, "up", "-d", "--no-build", "--remove-orphans"),
+            cwd=str(repo_dir),
+            timeout=300
+        )
+        logs.append(f"Up output:\n{out}\n{err}")
+        
+        if code != 0:
+            raise Exception(f"Docker compose up failed: {err or out}")
+    
+    # Get running containers
+    code, out, err = run_cmd(
+        compose_cmd(project_name, files, "ps", "--format", "table"),
+        cwd=str(repo_dir)
+    )
+    logs.append(f"Running containers:\n{out}")
+    
+    _finish_success(app, deployment, logs, container_id=project_name)  # project name for compose apps
+    sync_routes()
+    
+    return {
+        "status": "running",
+        "container_id": project_name,
+        "deploy_mode": "compose",
+        "changed_services": changed,
+        "url": f"/{app.slug}",
+        "message": f"App deployed! Access at http://YOUR_VPS_IP/{app.slug}"
+    }
+
+
+def _deploy_dockerfile(app, deployment, repo_dir, logs):
+    """Deploy app using single Dockerfile."""
+    env_vars = app.env_vars or {}
+    build_context = env_vars.get("_keystone_build_context", ".")
+    # repo_dir is already the host path (passed from deploy method)
+    build_dir = repo_dir / build_context if build_context != "." else repo_dir
+    
+    container_name = f"keystone-app-{app.slug}"
+    
+    # Build image (the old container keeps serving until the build succeeds)
+    image_tag = f"keystone/{app.slug}:latest"
+    logs.append(f"Building image: {image_tag} (context: {build_context})")
+    
+    docker_cmd = ["docker", "build", "-t", image_tag, "."]
+    with build_slot(deployment, logs):
+        code, out, err = run_cmd(
+            docker_cmd,
+            cwd=str(build_dir),
+            timeout=600
+        )
+    logs.append(f"Build output:\n{out}\n{err}")
+    
+    if code != 0:
+        raise Exception(f"Docker build failed: {err or out}")
+    
+    code, out, err = run_cmd(["docker", "image", "inspect", "--format", "{{.Id}}", image_tag])
+    deployment.image_id = out.strip() if code == 0 else ""
+    
+    # Prepare environment variables (skip internal keys, sorted for a stable hash)
+    env_args = []
+    for key, value in user_env_vars(env_vars).items():
+        env_args.extend(["-e", f"{key}={value}"])
+    
+    # Runtime options for the container
+    run_args = [
+        "--network", TRAEFIK_NETWORK,
+        "--restart", "unless-stopped",
+    ]
+    if not file_provider_enabled():
+        # Traefik labels (with the file provider, routes live in Keystone's dynamic config)
+        run_args += [
+            "-l", "traefik.enable=true",
+            "-l", f"traefik.http.routers.{app.slug}.rule={app.traefik_rule}",
+            "-l", f"traefik.http.routers.{app.slug}.entrypoints=web",
+            "-l", f"traefik.http.services.{app.slug}.loadbalancer.server.port={app.container_port}",
+            # Strip path prefix so app receives clean URLs
+            "-l", f"traefik.http.middlewares.{app.slug}-strip.stripprefix.prefixes=/{app.slug}",
+            "-l", f"traefik.http.routers.{app.slug}.middlewares={app.slug}-strip",
+        ]
+    run_args += env_args
+    deployment.config_hash = config_hash({"run_args": run_args, "image": image_tag})
+    
+    previous = app.deployments.filter(status="success").exclude(pk=deployment.pk).first()
+    code, existing_id, _ = run_cmd(["docker", "inspect", "--format", "{{.Id}}", container_name])
+    unchanged = (
+        previous is not None
+        and code == 0
+        and deployment.image_id
+        and previous.image_id == deployment.image_id
+        and previous.config_hash == deployment.config_hash
+    )
+    
+    if unchanged:
+        # Same image and runtime config - keep the existing container
+        logs.append("Image and config unchanged since last deployment, keeping existing container")
+        code, out, err = run_cmd(["docker", "start", container_name])
+        logs.append(f"Start output:\n{out}\n{err}")
+        
+        if code != 0:
+            raise Exception(f"Docker start failed: {err or out}")
+        out = existing_id
+    else:
+        # Replace existing container if any - archive its logs before they're gone
+        run_cmd(["docker", "stop", container_name])
+        safe_archive_app_logs(app, logs)
+        run_cmd(["docker", "rm", container_name])
+        
+        docker_run_cmd = ["docker", "run", "-d", "--name", container_name] + run_args + [image_tag]
+        
+        logs.append(f"Running container: {container_name}")
+        code, out, err = run_cmd(docker_run_cmd)
+        logs.append(f"Run output:\n{out}\n{err}")
+        
+        if code != 0:
+            raise Exception(f"Docker run failed: {err or out}")
+    
+    # Get container ID
+    _finish_success(app, deployment, logs, container_id=out.strip()[:12])
+    sync_routes()
+    
+    return {
+        "status": "running",
+        "container_id": app.container_id,
+        "url": f"/{app.slug}",
+        "deploy_mode": "dockerfile",
+        "recreated": not unchanged,
+        "message": f"App deployed! Access at http://YOUR_VPS_IP/{app.slug}"
+    }
+
+
+def ship_app(app, deployment):
+    """
+    Prepare + deploy in one step.
+    As soon as the repo is cloned, the base images of its Dockerfiles and the
+    external images of its compose services are pulled in parallel while
+    structure detection and Traefik injection run, so the build starts with
+    a warm image cache.
+    Returns: (structure, deploy result)
+    """
+    _remember_app_status(app, deployment)
+    with track_processes(_process_tracker(deployment)):
+        return _ship_app(app, deployment)
+
+
+def _ship_app(app, deployment):
+    logs = []
+    pulls = {"groups": set()}
+    tracker = _process_tracker(deployment)
+    
+    def track_pull(pgid):
+        # Pulls run side by side, so the deployment only records the latest;
+        # keep them all to kill on cancel
+        if pgid is not None:
+            pulls["groups"].add(pgid)
+            tracker(pgid)
+    
+    def start_prepull(repo_dir_container):
+        images = referenced_images(repo_dir_container)
+        if images:
+            logs.append(f"Pre-pulling images: {', '.join(images)}")
+            pulls["started"] = time.monotonic()
+            with track_processes(track_pull):
+                pulls["executor"], pulls["futures"] = start_pulls(images, settings.KEYSTONE_PULL_CONCURRENCY)
+    
+    try:
+        try:
+            structure = prepare_app(app, on_cloned=start_prepull)
+        except Exception as e:
+            if _is_cancelled(deployment):
+                _finish_cancelled(app, deployment, logs)
+                raise DeploymentCancelled(f"Deployment {deployment.pk} was cancelled") from e
+            deployment.status = "failed"
+            deployment.error = str(e)
+            deployment.logs = "\n".join(logs)
+            deployment.finished_at = timezone.now()
+            deployment.save()
+            index_deployment_logs(deployment)
+            raise
+        
+        # Let pulls finish before building so the build doesn't pull the same layers
+        waiting = set(pulls.get("futures", []))
+        while waiting:
+            _, waiting = wait(waiting, timeout=PULL_POLL_SECONDS)
+            if waiting and _is_cancelled(deployment):
+                for pgid in pulls["groups"]:
+                    kill_process_group(pgid)
+                _finish_cancelled(app, deployment, logs)
+                raise DeploymentCancelled(f"Deployment {deployment.pk} was cancelled")
+        for future in pulls.get("futures", []):
+            image, pull_status, seconds = future.result()
+            logs.append(f"  {image}: {pull_status}" + (f" ({seconds:.1f}s)" if seconds else ""))
+        if pulls:
+            logs.append(f"Pre-pull finished in {time.monotonic() - pulls['started']:.1f}s")
+    finally:
+        if "executor" in pulls:
+            pulls["executor"].shutdown(wait=False, cancel_futures=True)
+    
+    result = deploy_app(app, deployment, logs=logs)
+    return structure, result
+
+
+def stop_app(app):
+    """Stop a running app."""
+    env_vars = app.env_vars or {}
+    deploy_mode = env_vars.get("_keystone_deploy_mode", "dockerfile")
+    
+    if deploy_mode == "compose":
+        # Stop compose stack
+        # Use host path for Docker commands
+        repo_dir = REPOS_DIR / app.slug
+        project_name = f"keystone-{app.slug}"
+        run_cmd(
+            compose_cmd(project_name, compose_files(env_vars), "stop"),
+            cwd=str(repo_dir)
+        )
+    else:
+        # Stop single container
+        container_name = f"keystone-app-{app.slug}"
+        run_cmd(["docker", "stop", container_name])
+    
+    app.status = "stopped"
+    app.save()
+    sync_routes()
+
+
+def generate_django_dockerfile():
+    """Generate Dockerfile for Django app."""
+    return '''FROM python:3.12-slim
+
+WORKDIR /app
+
+# Install dependencies
+COPY requirements.txt .
+RUN pip install --no-cache-dir -r requirements.txt gunicorn
+
+# Copy app
+COPY . .
+
+# Collect static files
+RUN python manage.py collectstatic --noinput 2>/dev/null || true
+
+EXPOSE 8000
+
+CMD ["gunicorn", "--bind", "0.0.0.0:8000", "--workers", "2", "keystone.wsgi:application"]
+'''
+
+def generate_node_dockerfile():
+    """Generate Dockerfile for Node app."""
+    return '''FROM node:20-alpine
+
+WORKDIR /app
+
+COPY package*.json ./
+RUN npm install
+
+COPY . .
+RUN npm run build 2>/dev/null || true
+
+EXPOSE 3000
+
+CMD ["npm", "start"]
+'''
@@ -0,0 +1,177 @@
+"""
+Opt-in request profiling (KEYSTONE_PROFILING=1).
+
+ProfilingMiddleware keeps a RequestProfile in a context variable for the
+duration of each request; it follows the request into sync views run in
+worker threads under ASGI. Collected per request:
+- wall time
+- SQL query count and time (an execute wrapper installed on every connection)
+- serializer time (serializers using TimedSerializerMixin)
+- run_cmd / run_cmd_async subprocess count and time
+They are returned in a Server-Timing header. Requests slower than
+KEYSTONE_PROFILING_SLOW_MS are kept in an in-process ring buffer, shown at
+GET /api/admin/slow-requests/.
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+# Slowest SQL statements kept per sampled request
+SLOW_QUERIES_KEPT = 5
+
+_current = contextvars.ContextVar("keystone_request_profile", default=None)
+_slow_requests = deque(maxlen=settings.KEYSTONE_PROFILING_SLOW_SAMPLES)
+_slow_lock = threading.Lock()
+
+
+class RequestProfile:
+    """Timings collected for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.queries = []
+        self.serializer_seconds = 0.0
+        self.serializer_depth = 0
+        self.commands = []
+        self._lock = threading.Lock()
+
+    def add_query(self, sql, seconds):
+        with self._lock:
+            self.sql_count += 1
+            self.sql_seconds += seconds
+            self.queries.append((seconds, sql))
+            # Keep only the slowest few statements
+            if len(self.queries) > SLOW_QUERIES_KEPT * 4:
+                self.queries = sorted(self.queries, reverse=True)[:SLOW_QUERIES_KEPT]
+
+    def add_command(self, cmd, seconds):
+        with self._lock:
+            self.commands.append((" ".join(cmd)[:200], seconds))
+
+    def server_timing(self, total):
+        command_seconds = sum(seconds for _, seconds in self.commands)
+        return ", ".join([
+            f"total;dur={total * 1000:.1f}",
+            f'sql;dur={self.sql_seconds * 1000:.1f};desc="{self.sql_count} queries"',
+            f"serializer;dur={self.serializer_seconds * 1000:.1f}",
+            f'cmd;dur={command_seconds * 1000:.1f};desc="{len(self.commands)} commands"',
+        ])
+
+    def sample(self, request, response, total):
+        return {
+            "at": timezone.now().isoformat(),
+            "method": request.method,
+            "path": request.get_full_path(),
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 1),
+            "sql_count": self.sql_count,
+            "sql_ms": round(self.sql_seconds * 1000, 1),
+            "slowest_queries": [
+                {"ms": round(seconds * 1000, 1), "sql": sql[:500]}
+                for seconds, sql in sorted(self.queries, reverse=True)[:SLOW_QUERIES_KEPT]
+            ],
+            "serializer_ms": round(self.serializer_seconds * 1000, 1),
+            "commands": [{"cmd": cmd, "ms": round(seconds * 1000, 1)} for cmd, seconds in self.commands],
+        }
+
+
+def record_command(cmd, seconds):
+    """Called by run_cmd / run_cmd_async for every subprocess."""
+    profile = _current.get()
+    if profile is not None:
+        profile.add_command(cmd, seconds)
+
+
+def slow_requests():
+    """Sampled slow requests, newest first."""
+    with _slow_lock:
+        return list(reversed(_slow_requests))
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(sql, time.perf_counter() - started)
+
+
+def _install_sql_wrapper(sender, connection, **kwargs):
+    # Database connections are per thread - wrap each one as it connects
+    if _sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_sql_wrapper)
+
+
+class TimedSerializerMixin:
+    """Adds the time spent serializing (outermost serializer only) to the request profile."""
+
+    def to_representation(self, instance):
+        profile = _current.get()
+        if profile is None:
+            return super().to_representation(instance)
+        profile.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            profile.serializer_depth -= 1
+            if profile.serializer_depth == 0:
+                profile.serializer_seconds += time.perf_counter() - started
+
+
+class ProfilingMiddleware:
+    """Server-Timing header and slow request sampling; enabled by KEYSTONE_PROFILING."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.KEYSTONE_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        connection_created.connect(_install_sql_wrapper, dispatch_uid="keystone-profiling-sql")
+        for connection in connections.all(initialized_only=True):
+            _install_sql_wrapper(None, connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, profile)
+
+    async def _acall(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, profile)
+
+    def _finish(self, request, response, profile):
+        total = time.perf_counter() - profile.started
+        response["Server-Timing"] = profile.server_timing(total)
+        if total * 1000 >= settings.KEYSTONE_PROFILING_SLOW_MS:
+            with _slow_lock:
+                _slow_requests.append(profile.sample(request, response, total))
+        return response
@@ -0,0 +1,126 @@
+"""
+Deployment history retention.
+
+Every deployment keeps its full build/run logs in the database. The
+prune_deployments command compacts deployments that are both older than
+KEYSTONE_DEPLOYMENT_KEEP_DAYS and not among an app's
+KEYSTONE_DEPLOYMENT_KEEP most recent:
+- their logs (with status, commit, trigger and times) are appended as one
+  gzip member per batch to /runtime/logs/{slug}/deployments/{YYYY-MM}.jsonl.gz
+- the row stays as a summary: logs and service hashes are cleared, and
+  logs_archive records where the member is, so the logs can still be read
+- their log search chunks are deleted
+
+Work is done in small batches, each written to disk before its rows are
+updated in a short transaction, so the table is never locked for long.
+Running, pending and queued deployments are never touched.
+"""
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .logarchive import app_log_dir, locked_log_dir
+from .models import Deployment, LogChunk
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = "deployments"
+FINISHED_STATUSES = ["success", "failed", "cancelled"]
+ARCHIVED_FIELDS = ["pk", "status", "trigger", "commit_sha", "error", "created_at", "finished_at", "logs"]
+
+
+def compact_before(app, keep, keep_days, now=None):
+    """
+    Deployments of the app created before this are compacted.
+    Returns: datetime, or None if the app has no more than `keep` deployments
+    """
+    before = (now or timezone.now()) - timedelta(days=keep_days)
+    if keep > 0:
+        kept = list(app.deployments.order_by("-created_at").values_list("created_at", flat=True)[keep - 1:keep])
+        if not kept:
+            return None
+        before = min(before, kept[0])
+    return before
+
+
+def _candidates(app, before):
+    return app.deployments.filter(
+        created_at__lt=before, status__in=FINISHED_STATUSES, archived_at__isnull=True
+    ).order_by("created_at")
+
+
+def _append_member(path, records):
+    """Append records as one gzip member of JSON lines. Returns: (offset, length)"""
+    text = "".join(json.dumps(record, cls=DjangoJSONEncoder) + "\n" for record in records)
+    member = gzip.compress(text.encode(), compresslevel=6)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "ab") as f:
+        offset = f.tell()
+        f.write(member)
+        f.flush()
+        os.fsync(f.fileno())
+    return offset, len(member)
+
+
+def compact_app_deployments(app, keep, keep_days, batch_size=200, pause=0.0, dry_run=False):
+    """
+    Compact an app's deployments that fall outside the retention policy.
+    Returns: number of deployments compacted (or that would be, with dry_run)
+    """
+    before = compact_before(app, keep, keep_days)
+    if before is None:
+        return 0
+    if dry_run:
+        return _candidates(app, before).count()
+
+    log_dir = app_log_dir(app.slug)
+    compacted = 0
+    while True:
+        batch = list(_candidates(app, before).values(*ARCHIVED_FIELDS)[:batch_size])
+        if not batch:
+            return compacted
+        now = timezone.now()
+        name = f"{ARCHIVE_DIR}/{now:%Y-%m}.jsonl.gz"
+        # Same lock as the container log archiver writing to this directory
+        with locked_log_dir(log_dir):
+            offset, length = _append_member(log_dir / name, batch)
+
+        ids = [record["pk"] for record in batch]
+        # A crash before this commits only leaves a duplicate member behind
+        with transaction.atomic():
+            Deployment.objects.filter(pk__in=ids, archived_at__isnull=True).update(
+                logs="",
+                service_hashes={},
+                archived_at=now,
+                logs_archive={"file": name, "offset": offset, "length": length},
+            )
+            LogChunk.objects.filter(deployment_id__in=ids).delete()
+        compacted += len(ids)
+        logger.info("Compacted %s deployments of %s into %s", len(ids), app.slug, name)
+        if pause:
+            time.sleep(pause)
+
+
+def deployment_logs(deployment):
+    """Logs of a deployment, from the database or its archive (None if the archive is gone)."""
+    archive = deployment.logs_archive
+    if not archive:
+        return deployment.logs
+    try:
+        with open(app_log_dir(deployment.app.slug) / archive["file"], "rb") as f:
+            f.seek(archive["offset"])
+            member = gzip.decompress(f.read(archive["length"]))
+    except (OSError, EOFError, KeyError):
+        return None
+    for line in member.decode(errors="replace").splitlines():
+        record = json.loads(line)
+        if record["pk"] == deployment.pk:
+            return record["logs"]
+    return None
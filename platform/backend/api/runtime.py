@@ -0,0 +1,156 @@
+"""
+Keystone runtime paths and shell helpers shared by the deploy pipeline.
+"""
+import asyncio
+import contextvars
+import os
+import signal
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from .profiling import record_command
+
+# Runtime directory as mounted in this container (overridable for benchmarks)
+RUNTIME_DIR_CONTAINER = Path(os.environ.get("KEYSTONE_RUNTIME_DIR", "/runtime"))
+
+# Directories for repos and logs
+# Check if running inside container and convert to host path if needed
+REPOS_DIR_CONTAINER = RUNTIME_DIR_CONTAINER / "repos"
+LOGS_DIR_CONTAINER = RUNTIME_DIR_CONTAINER / "logs"
+# Traefik watches this directory for dynamic config (file provider)
+TRAEFIK_DIR_CONTAINER = RUNTIME_DIR_CONTAINER / "traefik"
+# Keystone-internal caches (repo analysis, ...)
+CACHE_DIR_CONTAINER = RUNTIME_DIR_CONTAINER / "cache"
+
+# Get host runtime path from environment (set in docker-compose.yml)
+HOST_RUNTIME_PATH = os.environ.get('HOST_RUNTIME_PATH', '/home/munaim/keystone/apps/keystone/runtime')
+HOST_RUNTIME_PATH = Path(HOST_RUNTIME_PATH)
+
+# Use host paths for Docker commands (Docker runs on host, not in container)
+REPOS_DIR = HOST_RUNTIME_PATH / "repos"
+LOGS_DIR = HOST_RUNTIME_PATH / "logs"
+
+# Traefik network name
+TRAEFIK_NETWORK = "keystone_web"
+# Traefik container (docker-compose.yml), signalled to reopen its access log
+TRAEFIK_CONTAINER = "keystone-traefik"
+
+
+# Called with the process group id when run_cmd starts a command, and with
+# None when it exits (see track_processes)
+_process_hook = contextvars.ContextVar("keystone_process_hook", default=None)
+
+
+@contextmanager
+def track_processes(hook):
+    """Report the process group of every run_cmd in this context to hook(pgid)."""
+    token = _process_hook.set(hook)
+    try:
+        yield
+    finally:
+        _process_hook.reset(token)
+
+
+def kill_process_group(pgid):
+    """Kill a command started by run_cmd together with everything it spawned."""
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def run_cmd(cmd, cwd=None, timeout=300):
+    """
+    Run a command and return (code, stdout, stderr).
+    The command gets its own process group, so on timeout (or cancel) the
+    whole tree dies - e.g. the buildx/compose plugins `docker compose` runs.
+    """
+    try:
+        proc = subprocess.Popen(
+            cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, start_new_session=True
+        )
+    except Exception as e:
+        return 1, "", str(e)
+    hook = _process_hook.get()
+    started = time.perf_counter()
+    try:
+        if hook:
+            hook(proc.pid)
+        out, err = proc.communicate(timeout=timeout)
+        return proc.returncode, out, err
+    except subprocess.TimeoutExpired:
+        kill_process_group(proc.pid)
+        proc.communicate()
+        return 1, "", "Command timed out"
+    except BaseException:
+        kill_process_group(proc.pid)
+        proc.communicate()
+        raise
+    finally:
+        record_command(cmd, time.perf_counter() - started)
+        if hook:
+            hook(None)
+
+
+async def run_cmd_async(cmd, cwd=None, timeout=300):
+    """
+    asyncio version of run_cmd for async views - waits without holding a thread.
+    The process is killed on timeout or when the awaiting request is cancelled.
+    """
+    started = time.perf_counter()
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+    except Exception as e:
+        return 1, "", str(e)
+    try:
+        out, err = await asyncio.wait_for(proc.communicate(), timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+        proc.kill()
+        await proc.wait()
+        if isinstance(e, asyncio.CancelledError):
+            raise
+        return 1, "", "Command timed out"
+    finally:
+        record_command(cmd, time.perf_counter() - started)
+    return proc.returncode, out.decode(errors="replace"), err.decode(errors="replace")
+
+
+def to_container_path(path):
+    """Map a host runtime path back to the path visible inside this container."""
+    path = str(path)
+    host_prefix = str(HOST_RUNTIME_PATH)
+    if path == host_prefix or path.startswith(host_prefix + "/"):
+        return Path(str(RUNTIME_DIR_CONTAINER) + path[len(host_prefix):])
+    return Path(path)
+
+
+def ensure_dir(path):
+    """
+    Create a runtime directory when it is first needed. Not done at import:
+    containers like migrate and the workers only mount part of /runtime.
+    """
+    try:
+        Path(path).mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        raise Exception(f"Runtime directory {path} is not writable: {e}")
+
+
+def atomic_write(path, content, mode=0o644):
+    """Write a text file via temp file + rename so readers never see a partial file."""
+    path = Path(path)
+    # Hidden temp name without the target suffix so file watchers ignore it
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
@@ -0,0 +1,180 @@
+"""
+Build scheduler.
+
+Image builds (`docker build`, `docker compose build`) run in at most
+KEYSTONE_BUILD_CONCURRENCY slots on the host. Deployments waiting for a slot
+form a queue in the database, ordered by:
+- priority: hotfix, then routine, then bulk
+- fairness: an app's n-th queued build goes behind every other app's
+  (n-1)-th, so an app deploying over and over can't starve the others
+- queue time
+Slots are claimed under a file lock in the runtime dir, so every process on
+the host shares the cap. Queued deployments carry their queue position and
+an expected wait estimated from recent build durations. A waiting process
+refreshes its deployment's heartbeat on every poll; queued rows left behind
+by a process that died stop counting after QUEUE_HEARTBEAT_TIMEOUT, just as
+stale builds do after KEYSTONE_BUILD_SLOT_TIMEOUT.
+"""
+import fcntl
+import logging
+import math
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Deployment
+from .runtime import CACHE_DIR_CONTAINER
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_ORDER = {"hotfix": 0, "routine": 1, "bulk": 2}
+LOCK_PATH = CACHE_DIR_CONTAINER / "build-scheduler.lock"
+# Builds only run in the backend container, whose workers share /tmp too
+FALLBACK_LOCK_PATH = Path(tempfile.gettempdir()) / "keystone-build-scheduler.lock"
+POLL_SECONDS = 1.0
+QUEUE_HEARTBEAT_TIMEOUT = 60
+# Expected build duration until there are finished builds to average
+DEFAULT_BUILD_SECONDS = 120
+RECENT_BUILDS = 20
+
+
+class BuildSlotUnavailable(Exception):
+    """The deployment stopped running (cancelled) while waiting for a slot."""
+
+
+def _open_lock():
+    try:
+        LOCK_PATH.parent.mkdir(parents=True, exist_ok=True)
+        return open(LOCK_PATH, "a")
+    except OSError as e:
+        logger.warning("Build scheduler lock falls back to %s: %s", FALLBACK_LOCK_PATH, e)
+        return open(FALLBACK_LOCK_PATH, "a")
+
+
+@contextmanager
+def _locked():
+    """Host-wide lock around reading and changing the queue."""
+    with _open_lock() as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _building_count(now):
+    """Slots in use. Builds of crashed processes stop counting after KEYSTONE_BUILD_SLOT_TIMEOUT."""
+    return Deployment.objects.filter(
+        status="running",
+        build_state="building",
+        build_started_at__gte=now - timedelta(seconds=settings.KEYSTONE_BUILD_SLOT_TIMEOUT),
+    ).count()
+
+
+def _queue(now):
+    """Queued deployments (with a live waiting process) in the order they get slots."""
+    queued = Deployment.objects.filter(
+        status="running",
+        build_state="queued",
+        build_heartbeat_at__gte=now - timedelta(seconds=QUEUE_HEARTBEAT_TIMEOUT),
+    ).order_by("queued_at", "pk")
+    per_app = Counter()
+    keyed = []
+    for deployment in queued:
+        keyed.append((
+            (PRIORITY_ORDER.get(deployment.priority, 1), per_app[deployment.app_id], deployment.queued_at, deployment.pk),
+            deployment,
+        ))
+        per_app[deployment.app_id] += 1
+    keyed.sort(key=lambda item: item[0])
+    return [deployment for _, deployment in keyed]
+
+
+def average_build_seconds():
+    recent = Deployment.objects.filter(
+        status="success", build_started_at__isnull=False, build_finished_at__isnull=False
+    ).order_by("-build_finished_at").values_list("build_started_at", "build_finished_at")[:RECENT_BUILDS]
+    durations = [(finished - started).total_seconds() for started, finished in recent]
+    return sum(durations) / len(durations) if durations else DEFAULT_BUILD_SECONDS
+
+
+def _update_positions(queue, free, concurrency):
+    """Store queue position and expected wait (whole rounds of builds ahead) on queued deployments."""
+    if not queue:
+        return
+    average = average_build_seconds()
+    for index, deployment in enumerate(queue):
+        deployment.queue_position = index + 1
+        rounds = math.ceil(max(0, index + 1 - free) / concurrency)
+        deployment.expected_wait_seconds = round(rounds * average, 1)
+    Deployment.objects.bulk_update(queue, ["queue_position", "expected_wait_seconds"])
+
+
+def _try_claim(deployment):
+    """
+    Claim a slot if one is free and the deployment is next in line.
+    Returns: (claimed, queue position, expected wait in seconds)
+    """
+    concurrency = max(1, settings.KEYSTONE_BUILD_CONCURRENCY)
+    with _locked():
+        now = timezone.now()
+        Deployment.objects.filter(pk=deployment.pk).update(build_heartbeat_at=now)
+        free = max(0, concurrency - _building_count(now))
+        queue = _queue(now)
+        index = next((i for i, queued in enumerate(queue) if queued.pk == deployment.pk), None)
+        if index is None:
+            raise BuildSlotUnavailable(f"Deployment {deployment.pk} is no longer waiting for a build slot")
+
+        claimed = index < free
+        if claimed:
+            fields = {"build_state": "building", "build_started_at": now, "queue_position": None, "expected_wait_seconds": None}
+            Deployment.objects.filter(pk=deployment.pk).update(**fields)
+            for name, value in fields.items():
+                setattr(deployment, name, value)
+            queue.pop(index)
+            free -= 1
+        _update_positions(queue, free, concurrency)
+    return claimed, index + 1, (0 if claimed else queue[index].expected_wait_seconds)
+
+
+def _set(deployment, **fields):
+    Deployment.objects.filter(pk=deployment.pk).update(**fields)
+    for name, value in fields.items():
+        setattr(deployment, name, value)
+
+
+@contextmanager
+def build_slot(deployment, logs):
+    """
+    Wait for a build slot, run the block in it and release it.
+    Raises BuildSlotUnavailable if the deployment is cancelled while queued.
+    """
+    now = timezone.now()
+    _set(deployment, build_state="queued", queued_at=now, build_heartbeat_at=now)
+    started = time.monotonic()
+    reported = None
+    try:
+        while True:
+            claimed, position, wait = _try_claim(deployment)
+            if claimed:
+                break
+            if reported is None:
+                logs.append(f"Waiting for a build slot: position {position}, expected wait {wait:.0f}s")
+            if position != reported:
+                logger.info("Deployment %s waiting for a build slot (position %s)", deployment.pk, position)
+                reported = position
+            time.sleep(POLL_SECONDS)
+        if reported is not None:
+            logs.append(f"Waited {time.monotonic() - started:.1f}s for a build slot")
+        yield
+    finally:
+        if deployment.build_state == "building":
+            _set(deployment, build_state="done", build_finished_at=timezone.now())
+        else:
+            _set(deployment, build_state="done", queue_position=None, expected_wait_seconds=None)
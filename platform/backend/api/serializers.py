@@ -1,6 +1,7 @@
 import re
 from rest_framework import serializers
-from .models import App, Deployment
+from .models import App, BulkOperation, Deployment, Route
+from .profiling import TimedSerializerMixin
 
 
 def normalize_github_url(url):
@@ -45,7 +46,7 @@ def normalize_github_url(url):
     return url
 
 
-class AppSerializer(serializers.ModelSerializer):
+class AppSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     slug = serializers.ReadOnlyField()
     
     def validate_git_url(self, value):
@@ -57,9 +58,87 @@ class AppSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class DeploymentSerializer(serializers.ModelSerializer):
+class AppImportSerializer(serializers.ModelSerializer):
+    """One row of a bulk import manifest; name uniqueness is checked for the whole batch."""
+    
+    def validate_git_url(self, value):
+        return normalize_github_url(value)
+    
+    class Meta:
+        model = App
+        fields = ["name", "git_url", "branch", "container_port", "env_vars"]
+        extra_kwargs = {"name": {"validators": []}}
+
+
+class BulkOperationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    done = serializers.SerializerMethodField()
+    
+    def get_done(self, obj):
+        return obj.succeeded + obj.failed
+    
+    class Meta:
+        model = BulkOperation
+        fields = "__all__"
+
+
+class DeploymentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     app_name = serializers.CharField(source="app.name", read_only=True)
+    elapsed_seconds = serializers.SerializerMethodField()
+    
+    def get_elapsed_seconds(self, obj):
+        if not obj.finished_at:
+            return None
+        return round((obj.finished_at - obj.created_at).total_seconds(), 1)
     
     class Meta:
         model = Deployment
         fields = "__all__"
+
+
+# Route and middleware names become part of Traefik names: no "@" (provider
+# suffix) and no doubled "_", which would make traefik.NAME_SEPARATOR ambiguous
+_TRAEFIK_NAME_RE = re.compile(r"^[A-Za-z0-9]+(?:[-_][A-Za-z0-9]+)*$")
+
+
+class RouteSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    
+    def validate_name(self, value):
+        if not _TRAEFIK_NAME_RE.match(value):
+            raise serializers.ValidationError(
+                "Route name may only contain letters, digits and single - or _ between them"
+            )
+        return value
+    
+    def validate_path_prefix(self, value):
+        if not value.startswith("/"):
+            raise serializers.ValidationError("Path prefix must start with /")
+        return value.rstrip("/") or "/"
+    
+    def validate_backends(self, value):
+        """Each backend needs a url or app name, and a non-negative integer weight."""
+        if not isinstance(value, list):
+            raise serializers.ValidationError("Backends must be a list")
+        for backend in value:
+            if not isinstance(backend, dict):
+                raise serializers.ValidationError("Each backend must be an object")
+            if backend.get("url") and backend.get("app"):
+                raise serializers.ValidationError("Backend can have either url or app, not both")
+            weight = backend.get("weight", 1)
+            # bool is an int subclass - `true` is not a weight
+            if isinstance(weight, bool) or not isinstance(weight, int) or weight < 0:
+                raise serializers.ValidationError("Backend weight must be a non-negative integer")
+        return value
+    
+    def validate_middlewares(self, value):
+        if not isinstance(value, dict) or not all(isinstance(v, dict) for v in value.values()):
+            raise serializers.ValidationError("Middlewares must map names to Traefik middleware definitions")
+        for name in value:
+            if not _TRAEFIK_NAME_RE.match(name):
+                raise serializers.ValidationError(
+                    f"Middleware name {name!r} may only contain letters, digits and single - or _ between them"
+                )
+        return value
+    
+    class Meta:
+        model = Route
+        fields = "__all__"
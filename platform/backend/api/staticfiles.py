@@ -0,0 +1,38 @@
+"""
+Static files (admin, browsable API) without breaking the async middleware chain.
+
+WhiteNoiseMiddleware (6.x) is sync-only. One sync-only middleware makes Django
+adapt the whole chain to sync under ASGI, so the async views would hold a
+worker thread per request again. This subclass serves the same files from
+either mode:
+- the lookup is a dict read (or a stat with autorefresh, done in a thread)
+- other requests go straight on to the next async handler
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoiseMiddleware that runs in sync and async chains."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, **kwargs):
+        super().__init__(get_response, **kwargs)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        return super().__call__(request)
+
+    async def _acall(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
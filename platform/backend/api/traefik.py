@@ -0,0 +1,158 @@
+"""
+Traefik dynamic configuration (file provider).
+
+Instead of baking routers into container labels, Keystone renders routers,
+services, weighted services and middlewares from the database into a YAML
+file in a directory Traefik watches. Route changes (path prefix, middleware,
+traffic weights) then apply instantly without recreating containers.
+
+Enabled with KEYSTONE_TRAEFIK_PROVIDER=file; with the default "labels"
+provider nothing is written and containers keep their Traefik labels.
+"""
+import yaml
+from django.conf import settings
+
+from .runtime import TRAEFIK_DIR_CONTAINER, atomic_write, ensure_dir
+
+DYNAMIC_CONFIG_FILE = "keystone.yml"
+# Joins an app's slug to its route / compose service names, and a router's
+# name to its middlewares and weighted services. Slugs never contain "_" and
+# route and middleware names may not contain the separator, so e.g. app "foo"
+# route "bar-baz" and app "foo-bar" route "baz" can't render the same name.
+NAME_SEPARATOR = "__"
+
+
+def file_provider_enabled():
+    return settings.KEYSTONE_TRAEFIK_PROVIDER == "file"
+
+
+def app_backends(app):
+    """
+    Default backends for an app's own containers.
+    Returns: list of {"name", "path", "url"} dicts, one per routed service
+    """
+    env_vars = app.env_vars or {}
+    if env_vars.get("_keystone_deploy_mode") == "compose":
+        project_name = f"keystone-{app.slug}"
+        return [
+            {
+                "name": f"{app.slug}{NAME_SEPARATOR}{service['name']}",
+                "path": service["path"],
+                # Compose container names resolve on the shared keystone_web network
+                "url": f"http://{project_name}-{service['name']}-1:{service['port']}",
+            }
+            for service in env_vars.get("_keystone_services", [])
+        ]
+    return [{
+        "name": app.slug,
+        "path": f"/{app.slug}",
+        "url": f"http://keystone-app-{app.slug}:{app.container_port}",
+    }]
+
+
+def _primary_url(app):
+    """URL of the backend serving the app's main path (/{slug}), if any."""
+    backends = app_backends(app)
+    for backend in backends:
+        if backend["path"] == f"/{app.slug}":
+            return backend["url"]
+    return backends[0]["url"] if backends else None
+
+
+def _add_router(config, name, path_prefix, backends, middlewares=None, strip_prefix=True, priority=0):
+    """Add a router, its (possibly weighted) service and middlewares to config."""
+    http = config["http"]
+    router = {
+        "rule": f"PathPrefix(`{path_prefix}`)",
+        "entryPoints": ["web"],
+        "service": name,
+    }
+    if priority:
+        router["priority"] = priority
+
+    router_middlewares = []
+    if strip_prefix:
+        http["middlewares"][f"{name}{NAME_SEPARATOR}strip"] = {"stripPrefix": {"prefixes": [path_prefix]}}
+        router_middlewares.append(f"{name}{NAME_SEPARATOR}strip")
+    for middleware_name, definition in (middlewares or {}).items():
+        http["middlewares"][f"{name}{NAME_SEPARATOR}{middleware_name}"] = definition
+        router_middlewares.append(f"{name}{NAME_SEPARATOR}{middleware_name}")
+    if router_middlewares:
+        router["middlewares"] = router_middlewares
+
+    if len(backends) == 1:
+        http["services"][name] = {"loadBalancer": {"servers": [{"url": backends[0]["url"]}]}}
+    else:
+        weighted = []
+        for index, backend in enumerate(backends):
+            backend_name = f"{name}{NAME_SEPARATOR}b{index}"
+            http["services"][backend_name] = {"loadBalancer": {"servers": [{"url": backend["url"]}]}}
+            weighted.append({"name": backend_name, "weight": backend.get("weight", 1)})
+        http["services"][name] = {"weighted": {"services": weighted}}
+
+    http["routers"][name] = router
+
+
+def render_dynamic_config():
+    """Render Traefik dynamic config for all running apps and their routes."""
+    from .models import App
+
+    config = {"http": {"routers": {}, "services": {}, "middlewares": {}}}
+    apps = list(App.objects.prefetch_related("routes"))
+    running = {app.name: app for app in apps if app.status == "running"}
+
+    for app in running.values():
+        own_backends = app_backends(app)
+        routes = list(app.routes.all())
+        if not routes:
+            for backend in own_backends:
+                _add_router(config, backend["name"], backend["path"], [backend])
+            continue
+
+        default_url = _primary_url(app)
+        for route in routes:
+            backends = []
+            for backend in route.backends or [{"weight": 1}]:
+                if backend.get("url"):
+                    url = backend["url"]
+                elif backend.get("app"):
+                    # Shift traffic to another Keystone app (e.g. blue/green)
+                    target = running.get(backend["app"])
+                    url = _primary_url(target) if target else None
+                else:
+                    url = default_url
+                if url and backend.get("weight", 1) > 0:
+                    backends.append({"url": url, "weight": backend.get("weight", 1)})
+            if not backends:
+                continue
+            _add_router(
+                config,
+                f"{app.slug}{NAME_SEPARATOR}{route.name}",
+                route.path_prefix,
+                backends,
+                middlewares=route.middlewares,
+                strip_prefix=route.strip_prefix,
+                priority=route.priority,
+            )
+
+    # Traefik rejects empty sections
+    config["http"] = {key: value for key, value in config["http"].items() if value}
+    return config if config["http"] else {}
+
+
+def sync_routes():
+    """
+    Write the dynamic config atomically to the watched directory.
+    Returns True if the file changed; no-op unless the file provider is enabled.
+    """
+    if not file_provider_enabled():
+        return False
+
+    content = yaml.safe_dump(render_dynamic_config(), default_flow_style=False, sort_keys=True)
+    ensure_dir(TRAEFIK_DIR_CONTAINER)
+    target = TRAEFIK_DIR_CONTAINER / DYNAMIC_CONFIG_FILE
+    if target.exists() and target.read_text() == content:
+        return False
+
+    atomic_write(target, content)
+    return True
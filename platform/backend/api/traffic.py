@@ -0,0 +1,348 @@
+"""
+Per-app traffic analytics from Traefik's JSON access log.
+
+The ingest_traffic command tails the access log (KEYSTONE_TRAFFIC_LOG) and
+folds every request into a TrafficBucket per router and minute: request
+count, status classes, and a log-scale latency histogram from which
+percentiles are estimated.
+- the read offset (and inode) is kept in a TrafficCursor, saved in the same
+  transaction as the buckets, so a restart resumes where it stopped without
+  counting requests twice
+- a rotated log (moved to <path>.1) is read to its end before the new file;
+  a truncated log is read again from the start
+- the ingester rotates the log itself once it outgrows
+  KEYSTONE_TRAFFIC_LOG_MAX_MB and the previous <path>.1 has been read, then
+  signals Traefik (USR1) to reopen it
+- routers map to apps by name: "{slug}" (labels), "{slug}-{service}"
+  (compose labels) and "{slug}__{route}" / "{slug}__{service}" (file provider)
+"""
+import json
+import logging
+import math
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import App, TrafficBucket, TrafficCursor
+from .runtime import TRAEFIK_CONTAINER, run_cmd
+from .traefik import NAME_SEPARATOR
+
+logger = logging.getLogger(__name__)
+
+# Bytes read per transaction
+READ_BYTES = 4 * 1024 * 1024
+# Latency bucket i holds durations up to GROWTH**i ms (bucket 0: up to 1ms),
+# so estimated percentiles are within ~25% of the real value
+GROWTH = 1.25
+# Keystone's own routers (docker-compose.yml), never attributed to an app
+PLATFORM_ROUTERS = {"keystone-api", "keystone-ui"}
+COUNTERS = ["requests", "status_2xx", "status_3xx", "status_4xx", "status_5xx"]
+
+
+def latency_bucket(ms):
+    return 0 if ms <= 1 else math.ceil(math.log(ms, GROWTH))
+
+
+def percentile(histogram, q):
+    """Estimate the q-th quantile (0-1) in ms from a latency histogram."""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for index in sorted(histogram):
+        count = histogram[index]
+        if seen + count >= rank:
+            upper = GROWTH ** index
+            lower = GROWTH ** (index - 1) if index > 0 else 0
+            return round(lower + (upper - lower) * (rank - seen) / count, 1)
+        seen += count
+    return round(GROWTH ** max(histogram), 1)
+
+
+class _Stats:
+    """Counters and latency histogram being summed up."""
+
+    def __init__(self):
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.duration_ms_sum = 0.0
+        self.duration_ms_max = 0.0
+        self.histogram = Counter()
+
+    def add_request(self, status, ms):
+        self.counts["requests"] += 1
+        status_class = f"status_{status // 100}xx"
+        if status_class in self.counts:
+            self.counts[status_class] += 1
+        self.duration_ms_sum += ms
+        self.duration_ms_max = max(self.duration_ms_max, ms)
+        self.histogram[latency_bucket(ms)] += 1
+
+    def add_bucket(self, bucket):
+        for name in COUNTERS:
+            self.counts[name] += getattr(bucket, name)
+        self.duration_ms_sum += bucket.duration_ms_sum
+        self.duration_ms_max = max(self.duration_ms_max, bucket.duration_ms_max)
+        # JSON keys are strings
+        self.histogram.update({int(index): count for index, count in bucket.latency_histogram.items()})
+
+    def merge_into(self, bucket):
+        """Add these stats to a bucket's."""
+        for name in COUNTERS:
+            setattr(bucket, name, getattr(bucket, name) + self.counts[name])
+        bucket.duration_ms_sum += self.duration_ms_sum
+        bucket.duration_ms_max = max(bucket.duration_ms_max, self.duration_ms_max)
+        histogram = Counter({int(index): count for index, count in bucket.latency_histogram.items()})
+        histogram.update(self.histogram)
+        bucket.latency_histogram = {str(index): count for index, count in sorted(histogram.items())}
+
+    def as_dict(self):
+        requests = self.counts["requests"]
+        if not requests:
+            return {**self.counts, "avg_ms": None, "p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+        max_ms = round(self.duration_ms_max, 1)
+        return {
+            **self.counts,
+            "avg_ms": round(self.duration_ms_sum / requests, 1),
+            # Estimates interpolate within a bucket - never above the slowest request
+            "p50_ms": min(percentile(self.histogram, 0.50), max_ms),
+            "p95_ms": min(percentile(self.histogram, 0.95), max_ms),
+            "p99_ms": min(percentile(self.histogram, 0.99), max_ms),
+            "max_ms": max_ms,
+        }
+
+
+class _RouterApps:
+    """Resolves router names to app ids, longest matching slug first."""
+
+    def __init__(self):
+        self.by_slug = {app.slug: app.pk for app in App.objects.only("id", "name")}
+        self.slugs = sorted(self.by_slug.items(), key=lambda item: len(item[0]), reverse=True)
+        self.resolved = {}
+
+    def __call__(self, router):
+        if router not in self.resolved and NAME_SEPARATOR in router:
+            # File provider names: the slug is everything before the separator
+            self.resolved[router] = self.by_slug.get(router.split(NAME_SEPARATOR, 1)[0])
+        if router not in self.resolved:
+            self.resolved[router] = next(
+                (
+                    app_id for slug, app_id in self.slugs
+                    if router not in PLATFORM_ROUTERS and (router == slug or router.startswith(slug + "-"))
+                ),
+                None,
+            )
+        return self.resolved[router]
+
+
+def _parse_minute(value, cache):
+    """Minute of a StartUTC timestamp ("2024-01-31T12:00:00.123456789Z")."""
+    key = value[:16]
+    if key not in cache:
+        try:
+            cache[key] = datetime.fromisoformat(key).replace(tzinfo=dt_timezone.utc)
+        except ValueError:
+            cache[key] = None
+    return cache[key]
+
+
+def aggregate(lines, router_apps):
+    """
+    Fold access log lines into per-(router, minute) stats.
+    Returns: ({(router, minute): _Stats}, {router: app id}, skipped line count)
+    """
+    buckets = {}
+    apps = {}
+    minutes = {}
+    skipped = 0
+    for line in lines:
+        try:
+            entry = json.loads(line)
+            router = entry["RouterName"].split("@", 1)[0]
+            minute = _parse_minute(entry["StartUTC"], minutes)
+            status = int(entry.get("DownstreamStatus") or 0)
+            ms = int(entry.get("Duration") or 0) / 1_000_000
+        except (ValueError, KeyError, TypeError, AttributeError):
+            # Not JSON, or a request no router matched
+            skipped += 1
+            continue
+        app_id = router_apps(router)
+        if app_id is None or minute is None:
+            skipped += 1
+            continue
+        apps[router] = app_id
+        key = (router, minute)
+        if key not in buckets:
+            buckets[key] = _Stats()
+        buckets[key].add_request(status, ms)
+    return buckets, apps, skipped
+
+
+def _save_buckets(buckets, apps):
+    """Add stats to existing buckets, creating missing ones."""
+    if not buckets:
+        return
+    minutes = [minute for _, minute in buckets]
+    existing = {
+        (bucket.router, bucket.minute): bucket
+        for bucket in TrafficBucket.objects.filter(
+            router__in={router for router, _ in buckets}, minute__gte=min(minutes), minute__lte=max(minutes)
+        )
+    }
+    created, updated = [], []
+    for (router, minute), stats in buckets.items():
+        bucket = existing.get((router, minute))
+        if bucket is None:
+            bucket = TrafficBucket(app_id=apps[router], router=router, minute=minute)
+            created.append(bucket)
+        else:
+            updated.append(bucket)
+        stats.merge_into(bucket)
+    TrafficBucket.objects.bulk_create(created, batch_size=500)
+    TrafficBucket.objects.bulk_update(
+        updated, COUNTERS + ["duration_ms_sum", "duration_ms_max", "latency_histogram"], batch_size=500
+    )
+
+
+def _source(path, cursor):
+    """
+    File to read next and the offset to read it from.
+    Returns: (path, inode, offset, rotated)
+    """
+    stat = path.stat()
+    if cursor.inode in (0, stat.st_ino):
+        return path, stat.st_ino, (cursor.offset if cursor.offset <= stat.st_size else 0), False
+    rotated = Path(f"{path}.1")
+    try:
+        rotated_stat = rotated.stat()
+    except FileNotFoundError:
+        rotated_stat = None
+    if rotated_stat and rotated_stat.st_ino == cursor.inode and rotated_stat.st_size > cursor.offset:
+        return rotated, cursor.inode, cursor.offset, True
+    return path, stat.st_ino, 0, False
+
+
+def _ingest_chunk(path, router_apps, max_bytes):
+    """
+    Ingest up to max_bytes of complete lines in one transaction.
+    Returns: (lines read, requests counted, more to read)
+    """
+    with transaction.atomic():
+        cursor, _ = TrafficCursor.objects.select_for_update().get_or_create(path=str(path))
+        source, inode, offset, rotated = _source(path, cursor)
+        with open(source, "rb") as log:
+            log.seek(offset)
+            data = log.read(max_bytes)
+        end = data.rfind(b"\n") + 1
+        if rotated and len(data) < max_bytes:
+            # Nothing more is written to a rotated log - take a final unterminated line too
+            end = len(data)
+        elif not end and len(data) == max_bytes:
+            # A single line longer than max_bytes - skip it
+            end = len(data)
+
+        lines = data[:end].splitlines()
+        buckets, apps, skipped = aggregate(lines, router_apps)
+        _save_buckets(buckets, apps)
+        cursor.inode = inode
+        cursor.offset = offset + end
+        cursor.save()
+
+    if skipped:
+        logger.debug("Skipped %s access log lines without a known app router", skipped)
+    more = rotated or (end > 0 and len(data) == max_bytes)
+    return len(lines), sum(stats.counts["requests"] for stats in buckets.values()), more
+
+
+def ingest_access_log(path=None, max_bytes=READ_BYTES):
+    """
+    Ingest everything appended to the access log since the last call.
+    Returns: number of requests added to buckets
+    """
+    path = Path(path or settings.KEYSTONE_TRAFFIC_LOG)
+    if not path.exists():
+        return 0
+    router_apps = _RouterApps()
+    total = 0
+    while True:
+        _, requests, more = _ingest_chunk(path, router_apps, max_bytes)
+        total += requests
+        if not more:
+            return total
+
+
+def rotate_access_log(path=None, max_bytes=None):
+    """
+    Move the access log to <path>.1 once it is larger than max_bytes
+    (KEYSTONE_TRAFFIC_LOG_MAX_MB) and have Traefik reopen it. Only done while
+    the cursor is on the current log, i.e. the previous <path>.1 has been
+    read; what is left of the moved log is ingested on the next pass.
+    Returns: True if the log was rotated
+    """
+    path = Path(path or settings.KEYSTONE_TRAFFIC_LOG)
+    if max_bytes is None:
+        max_bytes = settings.KEYSTONE_TRAFFIC_LOG_MAX_MB * 1024 * 1024
+    if max_bytes <= 0:
+        return False
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return False
+    cursor = TrafficCursor.objects.filter(path=str(path)).first()
+    if stat.st_size <= max_bytes or cursor is None or cursor.inode != stat.st_ino:
+        return False
+
+    try:
+        path.rename(f"{path}.1")
+    except OSError as e:
+        # e.g. the log dir isn't writable by this user - keep ingesting, just unrotated
+        logger.warning("Could not rotate %s: %s", path, e)
+        return False
+    # Traefik keeps writing to the moved file until it reopens the log
+    code, out, err = run_cmd(["docker", "kill", "--signal", "USR1", TRAEFIK_CONTAINER], timeout=30)
+    if code != 0:
+        logger.warning("Could not signal %s to reopen its access log: %s", TRAEFIK_CONTAINER, (err or out).strip())
+    return True
+
+
+def prune_buckets(days=None):
+    """Delete buckets older than KEYSTONE_TRAFFIC_RETENTION_DAYS."""
+    days = settings.KEYSTONE_TRAFFIC_RETENTION_DAYS if days is None else days
+    deleted, _ = TrafficBucket.objects.filter(minute__lt=timezone.now() - timedelta(days=days)).delete()
+    return deleted
+
+
+def _floor(minute, step):
+    seconds = int(minute.timestamp())
+    return datetime.fromtimestamp(seconds - seconds % (step * 60), tz=dt_timezone.utc)
+
+
+def traffic_summary(app, since, until, step=1, router=None):
+    """
+    Traffic of an app between since (inclusive) and until (exclusive).
+    Returns: totals, per-router totals, and one entry per step minutes that had requests
+    """
+    buckets = app.traffic_buckets.filter(minute__gte=since, minute__lt=until)
+    if router:
+        buckets = buckets.filter(router=router)
+
+    totals = _Stats()
+    routers = {}
+    series = {}
+    for bucket in buckets.order_by("minute"):
+        totals.add_bucket(bucket)
+        routers.setdefault(bucket.router, _Stats()).add_bucket(bucket)
+        series.setdefault(_floor(bucket.minute, step), _Stats()).add_bucket(bucket)
+
+    return {
+        "since": since,
+        "until": until,
+        "step_minutes": step,
+        "totals": totals.as_dict(),
+        "routers": {name: stats.as_dict() for name, stats in sorted(routers.items())},
+        "series": [{"minute": minute, **stats.as_dict()} for minute, stats in series.items()],
+    }
@@ -1,21 +1,33 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from . import async_views
 from .views import (
     AppViewSet,
+    BulkOperationViewSet,
     DeploymentViewSet,
+    GitWebhookView,
+    LogSearchView,
     LoginView,
     LogoutView,
-    health,
+    RouteViewSet,
+    SlowRequestsView,
 )
 
 router = DefaultRouter()
 router.register(r"apps", AppViewSet, basename="apps")
 router.register(r"deployments", DeploymentViewSet, basename="deployments")
+router.register(r"routes", RouteViewSet, basename="routes")
+router.register(r"bulk-operations", BulkOperationViewSet, basename="bulk-operations")
 
 urlpatterns = [
-    path("health/", health),
+    path("health/", async_views.health),
+    # Async views (plain Django views, not routed through DRF)
+    path("apps/<int:pk>/logs/", async_views.app_logs),
     path("auth/login/", LoginView.as_view()),
     path("auth/logout/", LogoutView.as_view()),
+    path("webhooks/git/", GitWebhookView.as_view()),
+    path("logs/search/", LogSearchView.as_view()),
+    path("admin/slow-requests/", SlowRequestsView.as_view()),
     path("", include(router.urls)),
 ]
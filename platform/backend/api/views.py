@@ -6,313 +6,137 @@ Simple 3-step workflow:
 2. Prepare - POST /api/apps/{id}/prepare/ - Configure for Traefik
 3. Deploy - POST /api/apps/{id}/deploy/ - Build and run container
 """
-import os
-import shutil
-import subprocess
-import copy
-import time
-from pathlib import Path
+import json
+from datetime import timedelta, timezone as dt_timezone
 
-import yaml
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import permissions, status, viewsets
 from rest_framework.authtoken.models import Token
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import App, Deployment
-from .serializers import AppSerializer, DeploymentSerializer
-
-# Directories for repos and logs
-# Check if running inside container and convert to host path if needed
-REPOS_DIR_CONTAINER = Path("/runtime/repos")
-LOGS_DIR_CONTAINER = Path("/runtime/logs")
-
-# Get host runtime path from environment (set in docker-compose.yml)
-HOST_RUNTIME_PATH = os.environ.get('HOST_RUNTIME_PATH', '/home/munaim/keystone/apps/keystone/runtime')
-HOST_RUNTIME_PATH = Path(HOST_RUNTIME_PATH)
-
-# Use host paths for Docker commands (Docker runs on host, not in container)
-REPOS_DIR = HOST_RUNTIME_PATH / "repos"
-LOGS_DIR = HOST_RUNTIME_PATH / "logs"
-
-# Create directories using container paths (for file operations inside container)
-REPOS_DIR_CONTAINER.mkdir(parents=True, exist_ok=True)
-LOGS_DIR_CONTAINER.mkdir(parents=True, exist_ok=True)
-
-# #region agent log
-import json
-DEBUG_LOG_PATH = Path("/home/munaim/keystone/apps/keystone/.cursor/debug.log")
-def _debug_log(location, message, data=None, hypothesis_id=None):
-    try:
-        log_entry = {
-            "location": location,
-            "message": message,
-            "timestamp": int(time.time() * 1000),
-            "sessionId": "debug-session",
-            "runId": "run1",
-        }
-        if data:
-            log_entry["data"] = data
-        if hypothesis_id:
-            log_entry["hypothesisId"] = hypothesis_id
-        with open(DEBUG_LOG_PATH, "a") as f:
-            f.write(json.dumps(log_entry) + "\n")
-    except:
-        pass
-# #endregion
-
-# Traefik network name
-TRAEFIK_NETWORK = "keystone_web"
-
-
-def inject_traefik_config(compose_path, app_slug, app_traefik_rule):
+from .bulk import ACTIONS as BULK_ACTIONS, start_operation
+from .conditional import ConditionalReadMixin, cached_app_payload, cached_app_payloads
+from .logarchive import format_timestamp, read_archive
+from .logs import line_timestamp, timestamp_key
+from .logsearch import search_logs
+from .models import App, BulkOperation, Deployment, Route
+from .pipeline import (
+    DEPLOY_FROM_STATUSES,
+    PREPARE_FROM_STATUSES,
+    DeploymentCancelled,
+    cancel_deployment,
+    deploy_app,
+    prepare_app,
+    ship_app,
+    stop_app,
+)
+from .profiling import slow_requests
+from .retention import deployment_logs
+from .serializers import (
+    AppImportSerializer,
+    AppSerializer,
+    BulkOperationSerializer,
+    DeploymentSerializer,
+    RouteSerializer,
+)
+from .traefik import sync_routes
+from .traffic import traffic_summary
+from .webhooks import accepts_push, coalescer, matching_apps, parse_push, verify_signature
+
+
+# Build priorities a deploy request may ask for ("bulk" is used by bulk operations)
+DEPLOY_PRIORITIES = ["hotfix", "routine"]
+
+
+class AppViewSet(ConditionalReadMixin, viewsets.ModelViewSet):
     """
-    Modify a docker-compose.yml to add Traefik routing configuration.
-    - Adds Traefik labels to web-facing services
-    - Connects services to keystone_web network
-    - Removes conflicting port mappings (80, 443)
-    - Converts relative volume mounts to absolute paths
-    - Backs up original file
+    CRUD for Apps + prepare/deploy actions.
+    list / retrieve answer 304 to unchanged polls and reuse cached payloads.
     """
-    # Ensure compose_path is a Path object
-    compose_path = Path(compose_path)
-    
-    # Check if file exists
-    if not compose_path.exists():
-        raise FileNotFoundError(f"docker-compose.yml not found at {compose_path}")
-    
-    # Read original compose file
-    with open(compose_path, 'r') as f:
-        compose_data = yaml.safe_load(f)
-    
-    # Get the absolute path of the repo directory for volume mount conversion
-    repo_dir = compose_path.parent
-    
-    # Convert container path to host path for Docker-in-Docker volume mounts
-    # Container has /runtime/repos, but Docker needs host path
-    host_runtime_path = os.environ.get('HOST_RUNTIME_PATH', '/runtime')
-    container_runtime_path = '/runtime'
-    
-    if not compose_data or 'services' not in compose_data:
-        raise Exception("Invalid docker-compose.yml: no services found")
+    queryset = App.objects.all().order_by("-created_at")
+    serializer_class = AppSerializer
     
-    # Backup original
-    backup_path = compose_path.parent / f"{compose_path.name}.original"
-    shutil.copy(compose_path, backup_path)
+    def serialize_list(self, queryset):
+        return cached_app_payloads(queryset, lambda apps: self.get_serializer(apps, many=True).data)
     
-    modified_services = []
+    def serialize_instance(self, instance):
+        return cached_app_payload(instance, lambda app: self.get_serializer(app).data)
     
-    # Common web service names to look for
-    web_service_names = ['nginx', 'frontend', 'web', 'proxy', 'gateway', 'app']
-    backend_service_names = ['backend', 'api', 'server', 'django', 'flask', 'fastapi']
+    def perform_destroy(self, instance):
+        instance.delete()
+        sync_routes()
     
-    # Process ALL services - convert volumes and add network
-    for service_name, service_config in compose_data['services'].items():
-        if service_config is None:
-            service_config = {}
-            compose_data['services'][service_name] = service_config
-        
-        # Convert relative volume mounts to absolute HOST paths
-        # This is needed for Docker-in-Docker: the path must be valid on the Docker host
-        if 'volumes' in service_config:
-            new_volumes = []
-            for vol in service_config['volumes']:
-                if isinstance(vol, str):
-                    # Short syntax: ./host:container or ./host:container:ro
-                    if vol.startswith('./') or vol.startswith('../'):
-                        parts = vol.split(':')
-                        host_path = parts[0]
-                        # Convert relative to absolute (container path)
-                        container_abs_path = str((repo_dir / host_path).resolve())
-                        # Convert container path to host path
-                        if container_abs_path.startswith(container_runtime_path):
-                            host_abs_path = container_abs_path.replace(container_runtime_path, host_runtime_path, 1)
-                        else:
-                            host_abs_path = container_abs_path
-                        parts[0] = host_abs_path
-                        vol = ':'.join(parts)
-                    new_volumes.append(vol)
-                elif isinstance(vol, dict):
-                    # Long syntax with 'source' key
-                    source = vol.get('source', '')
-                    if source.startswith('./') or source.startswith('../'):
-                        container_abs_path = str((repo_dir / source).resolve())
-                        if container_abs_path.startswith(container_runtime_path):
-                            host_abs_path = container_abs_path.replace(container_runtime_path, host_runtime_path, 1)
-                        else:
-                            host_abs_path = container_abs_path
-                        vol['source'] = host_abs_path
-                    new_volumes.append(vol)
-                else:
-                    new_volumes.append(vol)
-            service_config['volumes'] = new_volumes
-        
-        is_web_service = False
-        service_port = None
-        
-        # Check if service has ports that look like web ports
-        ports = service_config.get('ports', [])
-        for port in ports:
-            port_str = str(port)
-            # Look for common web ports (80, 443, 3000, 8000, 8080, 5000)
-            if any(p in port_str for p in ['80:', '443:', '3000:', '8000:', '8080:', '5000:', ':80', ':443']):
-                is_web_service = True
-                # Extract the container port
-                if ':' in port_str:
-                    parts = port_str.split(':')
-                    service_port = parts[-1].split('/')[0]  # Handle "8000:8000/tcp"
-                break
-        
-        # Check if service name suggests it's a web service
-        service_name_lower = service_name.lower()
-        if any(name in service_name_lower for name in web_service_names):
-            is_web_service = True
-            if not service_port:
-                service_port = "80"
-        elif any(name in service_name_lower for name in backend_service_names):
-            is_web_service = True
-            if not service_port:
-                service_port = "8000"
-        
-        if is_web_service:
-            # Add Traefik labels
-            labels = service_config.get('labels', [])
-            if isinstance(labels, dict):
-                labels = [f"{k}={v}" for k, v in labels.items()]
-            
-            # Create unique router name for this service
-            router_name = f"{app_slug}-{service_name}"
-            
-            # Determine the path prefix for this service
-            if service_name_lower in ['nginx', 'frontend', 'web', 'proxy', 'gateway']:
-                # Frontend/proxy gets the main path
-                path_prefix = f"/{app_slug}"
-            else:
-                # Backend services get a subpath
-                path_prefix = f"/{app_slug}/api" if 'backend' in service_name_lower or 'api' in service_name_lower else f"/{app_slug}/{service_name}"
-            
-            traefik_labels = [
-                "traefik.enable=true",
-                f"traefik.http.routers.{router_name}.rule=PathPrefix(`{path_prefix}`)",
-                f"traefik.http.routers.{router_name}.entrypoints=web",
-                f"traefik.http.services.{router_name}.loadbalancer.server.port={service_port}",
-                f"traefik.http.middlewares.{router_name}-strip.stripprefix.prefixes={path_prefix}",
-                f"traefik.http.routers.{router_name}.middlewares={router_name}-strip",
-            ]
-            
-            # Add labels
-            for label in traefik_labels:
-                if label not in labels:
-                    labels.append(label)
-            
-            service_config['labels'] = labels
-            
-            # Remove conflicting port mappings (ports that would conflict on host)
-            if 'ports' in service_config:
-                new_ports = []
-                for port in service_config['ports']:
-                    port_str = str(port)
-                    # Keep internal-only ports, remove host-mapped ones
-                    if ':' not in port_str:
-                        new_ports.append(port)
-                    else:
-                        # Check if it's mapping to host ports 80 or 443 (which Traefik uses)
-                        host_port = port_str.split(':')[0]
-                        if host_port not in ['80', '443']:
-                            # Keep non-conflicting ports but comment them out by not adding
-                            pass
-                # Remove ports section if empty, Traefik handles routing
-                if new_ports:
-                    service_config['ports'] = new_ports
-                else:
-                    service_config.pop('ports', None)
-            
-            # Ensure service is on keystone_web network
-            networks = service_config.get('networks', [])
-            if isinstance(networks, list):
-                if TRAEFIK_NETWORK not in networks:
-                    networks.append(TRAEFIK_NETWORK)
-            elif isinstance(networks, dict):
-                if TRAEFIK_NETWORK not in networks:
-                    networks[TRAEFIK_NETWORK] = {}
+    @action(detail=False, methods=["post"], url_path="import")
+    def bulk_import(self, request):
+        """
+        Create many apps from a manifest in one transaction:
+        {"apps": [{"name": ..., "git_url": ..., "branch": ..., ...}, ...]}
+        Every row is validated (git URLs normalized) before anything is
+        created; any invalid row rejects the whole manifest.
+        """
+        rows = request.data.get("apps") if isinstance(request.data, dict) else request.data
+        if not isinstance(rows, list) or not rows:
+            return Response({"error": "apps must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        row_serializers = [AppImportSerializer(data=row) for row in rows]
+        errors = []
+        names = {}
+        for index, serializer in enumerate(row_serializers):
+            if not serializer.is_valid():
+                errors.append({"index": index, "errors": serializer.errors})
             else:
-                networks = [TRAEFIK_NETWORK]
-            service_config['networks'] = networks
-            
-            modified_services.append({
-                "name": service_name,
-                "port": service_port,
-                "path": path_prefix
-            })
-    
-    # Add keystone_web to top-level networks as external
-    if 'networks' not in compose_data:
-        compose_data['networks'] = {}
-    
-    compose_data['networks'][TRAEFIK_NETWORK] = {
-        'external': True
-    }
-    
-    # Write modified compose file
-    with open(compose_path, 'w') as f:
-        yaml.dump(compose_data, f, default_flow_style=False, sort_keys=False)
-    
-    return modified_services
-
-
-def run_cmd(cmd, cwd=None, timeout=300):
-    """Run a shell command and return result."""
-    try:
-        result = subprocess.run(
-            cmd, cwd=cwd, capture_output=True, text=True, timeout=timeout
+                names[index] = serializer.validated_data["name"]
+        
+        # One query for the whole manifest instead of a unique check per row
+        taken = set(App.objects.filter(name__in=names.values()).values_list("name", flat=True))
+        seen = set()
+        for index, name in names.items():
+            if name in taken or name in seen:
+                errors.append({"index": index, "errors": {"name": [f"App name already exists: {name}"]}})
+            seen.add(name)
+        if errors:
+            errors.sort(key=lambda error: error["index"])
+            return Response({"error": "Invalid manifest", "rows": errors}, status=status.HTTP_400_BAD_REQUEST)
+        
+        with transaction.atomic():
+            apps = App.objects.bulk_create(App(**serializer.validated_data) for serializer in row_serializers)
+        return Response(
+            {"created": len(apps), "apps": AppSerializer(apps, many=True).data},
+            status=status.HTTP_201_CREATED
         )
-        return result.returncode, result.stdout, result.stderr
-    except subprocess.TimeoutExpired:
-        return 1, "", "Command timed out"
-    except Exception as e:
-        return 1, "", str(e)
-
-
-class AppViewSet(viewsets.ModelViewSet):
-    """
-    CRUD for Apps + prepare/deploy actions.
-    """
-    queryset = App.objects.all().order_by("-created_at")
-    serializer_class = AppSerializer
     
-    def _find_dockerfile_or_app(self, repo_dir):
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
         """
-        Find Dockerfile or app files in repo, checking root and common subdirectories.
-        Returns: (dockerfile_path, app_type, build_context)
+        Run prepare, deploy or stop across apps in the background:
+        {"action": "deploy", "apps": [1, 2, 3]}
+        Runs KEYSTONE_BULK_CONCURRENCY apps at a time; poll the returned
+        operation at /api/bulk-operations/{id}/ for per-app results.
         """
-        # Common subdirectory names to check
-        subdirs_to_check = ["", "backend", "app", "src", "api", "server"]
+        action_name = request.data.get("action")
+        if action_name not in BULK_ACTIONS:
+            return Response(
+                {"error": f"action must be one of: {', '.join(BULK_ACTIONS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        for subdir in subdirs_to_check:
-            check_dir = repo_dir / subdir if subdir else repo_dir
-            if not check_dir.exists():
-                continue
-                
-            # Check for Dockerfile
-            if (check_dir / "Dockerfile").exists():
-                return (check_dir / "Dockerfile", "dockerfile", check_dir)
-            
-            # Check for Django app
-            if (check_dir / "manage.py").exists():
-                return (None, "django", check_dir)
-            
-            # Check for Node app
-            if (check_dir / "package.json").exists():
-                return (None, "node", check_dir)
-            
-            # Check for Python app with requirements.txt
-            if (check_dir / "requirements.txt").exists():
-                return (None, "python", check_dir)
-        
-        return (None, None, None)
-
+        app_ids = request.data.get("apps")
+        if not isinstance(app_ids, list) or not app_ids or not all(isinstance(i, int) for i in app_ids):
+            return Response({"error": "apps must be a non-empty list of app ids"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        apps = list(App.objects.filter(pk__in=app_ids))
+        missing = sorted(set(app_ids) - {app.pk for app in apps})
+        if missing:
+            return Response({"error": f"Apps not found: {missing}"}, status=status.HTTP_404_NOT_FOUND)
+        
+        operation = start_operation(action_name, apps)
+        return Response(BulkOperationSerializer(operation).data, status=status.HTTP_202_ACCEPTED)
+    
     @action(detail=True, methods=["post"])
     def prepare(self, request, pk=None):
         """
@@ -323,163 +147,23 @@ class AppViewSet(viewsets.ModelViewSet):
         """
         app = self.get_object()
         
-        if app.status not in ["imported", "failed", "prepared"]:
+        if app.status not in PREPARE_FROM_STATUSES:
             return Response(
                 {"error": f"Cannot prepare app in status: {app.status}"},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        app.status = "preparing"
-        app.error_message = ""
-        app.save()
-        
         try:
-            # #region agent log
-            _debug_log("views.py:297", "REPOS_DIR value", {"REPOS_DIR": str(REPOS_DIR), "REPOS_DIR_exists": REPOS_DIR.exists(), "REPOS_DIR_absolute": str(REPOS_DIR.resolve()), "HOST_RUNTIME_PATH": str(HOST_RUNTIME_PATH), "REPOS_DIR_CONTAINER": str(REPOS_DIR_CONTAINER)}, "A")
-            # #endregion
-            # Clone or update repo
-            # Use container path for file operations (git clone, file checks)
-            repo_dir_container = REPOS_DIR_CONTAINER / app.slug
-            # Use host path for Docker commands (Docker runs on host)
-            repo_dir = REPOS_DIR / app.slug
-            # #region agent log
-            _debug_log("views.py:299", "repo_dir path construction", {"repo_dir": str(repo_dir), "repo_dir_exists": repo_dir.exists(), "repo_dir_absolute": str(repo_dir.resolve()) if repo_dir.exists() else "N/A", "repo_dir_container": str(repo_dir_container), "repo_dir_container_exists": repo_dir_container.exists(), "app_slug": app.slug}, "A")
-            # #endregion
-            
-            # Use container path for file operations
-            if repo_dir_container.exists():
-                shutil.rmtree(repo_dir_container)
-            
-            # Clone repo to container path (will be visible on host via volume mount)
-            code, out, err = run_cmd(
-                ["git", "clone", "--depth", "1", "-b", app.branch, app.git_url, str(repo_dir_container)]
-            )
-            
-            if code != 0:
-                raise Exception(f"Git clone failed: {err or out}")
-            
-            # Check for docker-compose.yml first (multi-service apps)
-            # Check both container and host paths (volume mount should sync them, but check both for safety)
-            has_compose_container = (repo_dir_container / "docker-compose.yml").exists() or (repo_dir_container / "compose.yml").exists()
-            has_compose_host = (repo_dir / "docker-compose.yml").exists() or (repo_dir / "compose.yml").exists()
-            has_compose = has_compose_container or has_compose_host
-            compose_file = None
-            if (repo_dir_container / "docker-compose.yml").exists() or (repo_dir / "docker-compose.yml").exists():
-                compose_file = "docker-compose.yml"
-            elif (repo_dir_container / "compose.yml").exists() or (repo_dir / "compose.yml").exists():
-                compose_file = "compose.yml"
-            # #region agent log
-            _debug_log("views.py:312", "docker-compose detection", {"has_compose": has_compose, "has_compose_container": has_compose_container, "has_compose_host": has_compose_host, "compose_file": compose_file, "repo_dir": str(repo_dir), "repo_dir_container": str(repo_dir_container), "container_docker_compose_exists": (repo_dir_container / "docker-compose.yml").exists(), "host_docker_compose_exists": (repo_dir / "docker-compose.yml").exists()}, "B")
-            # #endregion
-            
-            # Detect app structure at root level - use container path for file checks
-            has_dockerfile = (repo_dir_container / "Dockerfile").exists()
-            has_requirements = (repo_dir_container / "requirements.txt").exists()
-            has_manage_py = (repo_dir_container / "manage.py").exists()
-            has_package_json = (repo_dir_container / "package.json").exists()
-            
-            # Find Dockerfile or app in subdirectories - use container path
-            dockerfile_path, app_type, build_context = self._find_dockerfile_or_app(repo_dir_container)
-            
-            structure = {
-                "dockerfile": has_dockerfile or (dockerfile_path is not None),
-                "docker_compose": has_compose,
-                "django": has_manage_py or app_type == "django",
-                "python": has_requirements or app_type == "python",
-                "node": has_package_json or app_type == "node",
-                "build_context": str(build_context.relative_to(repo_dir_container)) if build_context and build_context != repo_dir_container else ".",
-                "deploy_mode": "compose" if has_compose else "dockerfile",
-            }
-            
-            # Determine deployment strategy
-            if has_compose:
-                # Multi-service app with docker-compose.yml
-                # INJECT TRAEFIK CONFIGURATION into the compose file
-                # Use container path for file operations (files are synced via volume mount)
-                # But check both paths to find the file
-                compose_path_container = repo_dir_container / compose_file
-                compose_path_host = repo_dir / compose_file
-                # Use whichever path exists (should be both via volume mount, but be safe)
-                if compose_path_container.exists():
-                    compose_path = compose_path_container
-                elif compose_path_host.exists():
-                    compose_path = compose_path_host
-                else:
-                    raise Exception(f"docker-compose.yml not found at {compose_path_container} or {compose_path_host}")
-                # #region agent log
-                _debug_log("views.py:385", "inject_traefik_config call", {"compose_path": str(compose_path), "compose_path_exists": compose_path.exists(), "compose_path_container": str(compose_path_container), "compose_path_host": str(compose_path_host)}, "B")
-                # #endregion
-                modified_services = inject_traefik_config(
-                    compose_path, 
-                    app.slug, 
-                    f"PathPrefix(`/{app.slug}`)"
-                )
-                
-                # Store the compose file path for deploy step
-                app.env_vars = app.env_vars or {}
-                app.env_vars["_keystone_deploy_mode"] = "compose"
-                app.env_vars["_keystone_compose_file"] = compose_file
-                
-                structure["message"] = "Modified docker-compose.yml with Traefik routing"
-                structure["modified_services"] = modified_services
-                structure["traefik_injected"] = True
-                
-            elif dockerfile_path:
-                # Found Dockerfile (possibly in subdirectory)
-                app.env_vars = app.env_vars or {}
-                app.env_vars["_keystone_deploy_mode"] = "dockerfile"
-                app.env_vars["_keystone_build_context"] = str(build_context.relative_to(repo_dir_container)) if build_context != repo_dir_container else "."
-                
-            elif has_dockerfile:
-                # Dockerfile at root
-                app.env_vars = app.env_vars or {}
-                app.env_vars["_keystone_deploy_mode"] = "dockerfile"
-                app.env_vars["_keystone_build_context"] = "."
-                
-            elif app_type == "django":
-                # Generate Django Dockerfile
-                dockerfile_content = self._generate_django_dockerfile()
-                with open(build_context / "Dockerfile", "w") as f:
-                    f.write(dockerfile_content)
-                app.env_vars = app.env_vars or {}
-                app.env_vars["_keystone_deploy_mode"] = "dockerfile"
-                app.env_vars["_keystone_build_context"] = str(build_context.relative_to(repo_dir_container)) if build_context != repo_dir_container else "."
-                structure["generated_dockerfile"] = True
-                
-            elif app_type == "node":
-                # Generate Node Dockerfile
-                dockerfile_content = self._generate_node_dockerfile()
-                with open(build_context / "Dockerfile", "w") as f:
-                    f.write(dockerfile_content)
-                app.env_vars = app.env_vars or {}
-                app.env_vars["_keystone_deploy_mode"] = "dockerfile"
-                app.env_vars["_keystone_build_context"] = str(build_context.relative_to(repo_dir_container)) if build_context != repo_dir_container else "."
-                structure["generated_dockerfile"] = True
-                
-            else:
-                raise Exception(
-                    "No Dockerfile or docker-compose.yml found, and couldn't detect app type. "
-                    "Checked: root, backend/, app/, src/, api/, server/ directories. "
-                    "Please add a Dockerfile or docker-compose.yml to your repository."
-                )
-            
-            # Set Traefik rule (path-based routing)
-            app.traefik_rule = f"PathPrefix(`/{app.slug}`)"
-            app.status = "prepared"
-            app.save()
-            
-            return Response({
-                "status": "prepared",
-                "structure": structure,
-                "traefik_rule": app.traefik_rule,
-                "message": f"App prepared. Will be accessible at /{app.slug}"
-            })
-            
+            structure = prepare_app(app)
         except Exception as e:
-            app.status = "failed"
-            app.error_message = str(e)
-            app.save()
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        return Response({
+            "status": "prepared",
+            "structure": structure,
+            "traefik_rule": app.traefik_rule,
+            "message": f"App prepared. Will be accessible at /{app.slug}"
+        })
     
     @action(detail=True, methods=["post"])
     def deploy(self, request, pk=None):
@@ -487,352 +171,205 @@ class AppViewSet(viewsets.ModelViewSet):
         Step 3: Deploy the app.
         - For docker-compose apps: use docker compose up
         - For single Dockerfile apps: build and run with Traefik labels
+        - priority: "hotfix" builds jump the build queue, default "routine"
         """
         app = self.get_object()
         
-        if app.status not in ["prepared", "running", "stopped", "failed"]:
+        if app.status not in DEPLOY_FROM_STATUSES:
             return Response(
                 {"error": f"App must be prepared first. Current status: {app.status}"},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Create deployment record
-        deployment = Deployment.objects.create(app=app, status="running")
-        
-        app.status = "deploying"
-        app.error_message = ""
-        app.save()
+        priority = request.data.get("priority", "routine")
+        if priority not in DEPLOY_PRIORITIES:
+            return Response(
+                {"error": f"priority must be one of: {', '.join(DEPLOY_PRIORITIES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        logs = []
+        # Create deployment record
+        deployment = Deployment.objects.create(app=app, status="running", priority=priority)
         
         try:
-            # Use host path for Docker commands (Docker runs on host)
-            repo_dir = REPOS_DIR / app.slug
-            # Use container path for file checks
-            repo_dir_container = REPOS_DIR_CONTAINER / app.slug
-            # #region agent log
-            _debug_log("views.py:435", "deploy: repo_dir path", {"repo_dir": str(repo_dir), "repo_dir_exists": repo_dir.exists(), "repo_dir_absolute": str(repo_dir.resolve()) if repo_dir.exists() else "N/A", "repo_dir_container": str(repo_dir_container), "repo_dir_container_exists": repo_dir_container.exists(), "REPOS_DIR": str(REPOS_DIR), "HOST_RUNTIME_PATH": str(HOST_RUNTIME_PATH)}, "A")
-            # #endregion
-            
-            if not repo_dir_container.exists():
-                # Also check host path in case volume mount issue
-                if not repo_dir.exists():
-                    raise Exception(f"Repo not found. Please prepare first. Checked: {repo_dir_container} and {repo_dir}")
-                else:
-                    # Host path exists but container path doesn't - volume mount issue
-                    raise Exception(f"Repo exists on host at {repo_dir} but not visible in container at {repo_dir_container}. Check volume mount.")
-            
-            # Get deployment mode from env_vars (set during prepare)
-            env_vars = app.env_vars or {}
-            deploy_mode = env_vars.get("_keystone_deploy_mode", "dockerfile")
-            # #region agent log
-            _debug_log("views.py:442", "deploy: deployment mode", {"deploy_mode": deploy_mode, "env_vars": env_vars, "app_slug": app.slug, "repo_dir": str(repo_dir), "compose_file_exists": (repo_dir / "docker-compose.yml").exists() if repo_dir.exists() else False}, "B")
-            # #endregion
-            
-            if deploy_mode == "compose":
-                # Deploy using docker-compose
-                # #region agent log
-                _debug_log("views.py:448", "deploy: using compose mode", {"app_slug": app.slug}, "B")
-                # #endregion
-                return self._deploy_compose(app, deployment, repo_dir, logs)
-            else:
-                # Deploy using single Dockerfile
-                # #region agent log
-                _debug_log("views.py:451", "deploy: using dockerfile mode", {"app_slug": app.slug, "build_context": env_vars.get("_keystone_build_context", ".")}, "B")
-                # #endregion
-                return self._deploy_dockerfile(app, deployment, repo_dir, logs)
-            
+            result = deploy_app(app, deployment)
+        except DeploymentCancelled as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
         except Exception as e:
-            app.status = "failed"
-            app.error_message = str(e)
-            app.save()
-            
-            deployment.status = "failed"
-            deployment.error = str(e)
-            deployment.logs = "\n".join(logs)
-            deployment.finished_at = timezone.now()
-            deployment.save()
-            
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    def _deploy_compose(self, app, deployment, repo_dir, logs):
-        """Deploy app using docker-compose with Traefik routing."""
-        env_vars = app.env_vars or {}
-        compose_file = env_vars.get("_keystone_compose_file", "docker-compose.yml")
-        # repo_dir is already the host path (passed from deploy method)
-        # #region agent log
-        _debug_log("views.py:466", "_deploy_compose entry", {"repo_dir": str(repo_dir), "repo_dir_exists": repo_dir.exists(), "repo_dir_absolute": str(repo_dir.resolve()) if repo_dir.exists() else "N/A", "compose_file": compose_file, "compose_path": str((repo_dir / compose_file).resolve()) if (repo_dir / compose_file).exists() else "N/A"}, "C")
-        # #endregion
-        
-        logs.append(f"Deploying with docker-compose: {compose_file}")
-        logs.append(f"Traefik routing: {app.traefik_rule}")
-        
-        # Create a project name based on app slug
-        project_name = f"keystone-{app.slug}"
-        
-        # Stop existing compose stack if any
-        logs.append("Stopping existing containers...")
-        run_cmd(
-            ["docker", "compose", "-p", project_name, "-f", compose_file, "down", "--remove-orphans"],
-            cwd=str(repo_dir),
-            timeout=120
-        )
-        
-        # Handle .env file - copy from .env.example if exists and .env doesn't
-        # Use container path for file operations (files are in container, visible on host via mount)
-        repo_dir_container = REPOS_DIR_CONTAINER / app.slug
-        env_example = repo_dir_container / ".env.example"
-        env_file = repo_dir_container / ".env"
-        if env_example.exists() and not env_file.exists():
-            shutil.copy(env_example, env_file)
-            logs.append("Created .env from .env.example")
-        
-        # Prepare environment variables to inject
-        env_file_content = []
-        for key, value in env_vars.items():
-            if not key.startswith("_keystone_"):  # Skip internal keys
-                env_file_content.append(f"{key}={value}")
-        
-        # Append Keystone env vars to .env file
-        if env_file_content:
-            mode = "a" if env_file.exists() else "w"
-            with open(env_file, mode) as f:
-                f.write("\n# Keystone injected vars\n")
-                f.write("\n".join(env_file_content) + "\n")
-            logs.append(f"Added {len(env_file_content)} env vars to .env")
-        
-        # Build images
-        logs.append("Building images...")
-        # #region agent log
-        docker_cmd = ["docker", "compose", "-p", project_name, "-f", compose_file, "build", "--no-cache"]
-        _debug_log("views.py:506", "docker compose build command", {"cmd": docker_cmd, "cwd": str(repo_dir), "cwd_exists": Path(repo_dir).exists(), "cwd_absolute": str(Path(repo_dir).resolve()) if Path(repo_dir).exists() else "N/A", "compose_file_exists": (repo_dir / compose_file).exists() if repo_dir.exists() else False}, "C")
-        # #endregion
-        code, out, err = run_cmd(
-            docker_cmd,
-            cwd=str(repo_dir),
-            timeout=900
-        )
-        logs.append(f"Build output:\n{out}\n{err}")
-        # #region agent log
-        _debug_log("views.py:511", "docker compose build result", {"returncode": code, "stdout": out[:500] if out else "", "stderr": err[:500] if err else ""}, "C")
-        # #endregion
-        
-        if code != 0:
-            raise Exception(f"Docker compose build failed: {err or out}")
-        
-        # Start services
-        logs.append("Starting services with Traefik routing...")
-        code, out, err = run_cmd(
-            ["docker", "compose", "-p", project_name, "-f", compose_file, "up", "-d"],
-            cwd=str(repo_dir),
-            timeout=300
-        )
-        logs.append(f"Up output:\n{out}\n{err}")
         
-        if code != 0:
-            raise Exception(f"Docker compose up failed: {err or out}")
+        return Response(result)
+    
+    @action(detail=True, methods=["post"])
+    def ship(self, request, pk=None):
+        """
+        Prepare + deploy in one step, pre-pulling base images in parallel
+        with structure detection so the build starts immediately.
+        """
+        app = self.get_object()
         
-        # Get running containers
-        code, out, err = run_cmd(
-            ["docker", "compose", "-p", project_name, "-f", compose_file, "ps", "--format", "table"],
-            cwd=str(repo_dir)
-        )
-        logs.append(f"Running containers:\n{out}")
+        if app.status in ["preparing", "deploying"]:
+            return Response(
+                {"error": f"App is busy. Current status: {app.status}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        app.container_id = project_name  # Store project name for compose apps
-        app.status = "running"
-        app.save()
+        priority = request.data.get("priority", "routine")
+        if priority not in DEPLOY_PRIORITIES:
+            return Response(
+                {"error": f"priority must be one of: {', '.join(DEPLOY_PRIORITIES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        deployment.status = "success"
-        deployment.logs = "\n".join(logs)
-        deployment.finished_at = timezone.now()
-        deployment.save()
+        deployment = Deployment.objects.create(app=app, status="running", priority=priority)
         
-        return Response({
-            "status": "running",
-            "container_id": project_name,
-            "deploy_mode": "compose",
-            "url": f"/{app.slug}",
-            "message": f"App deployed! Access at http://YOUR_VPS_IP/{app.slug}"
-        })
-
-    def _deploy_dockerfile(self, app, deployment, repo_dir, logs):
-        """Deploy app using single Dockerfile."""
-        env_vars = app.env_vars or {}
-        build_context = env_vars.get("_keystone_build_context", ".")
-        # repo_dir is already the host path (passed from deploy method)
-        build_dir = repo_dir / build_context if build_context != "." else repo_dir
-        # #region agent log
-        _debug_log("views.py:555", "_deploy_dockerfile entry", {"repo_dir": str(repo_dir), "build_context": build_context, "build_dir": str(build_dir), "build_dir_exists": build_dir.exists(), "build_dir_absolute": str(build_dir.resolve()) if build_dir.exists() else "N/A", "dockerfile_exists": (build_dir / "Dockerfile").exists() if build_dir.exists() else False}, "D")
-        # #endregion
-        
-        # Stop existing container if any
-        container_name = f"keystone-app-{app.slug}"
-        run_cmd(["docker", "stop", container_name])
-        run_cmd(["docker", "rm", container_name])
-        
-        # Build image
-        image_tag = f"keystone/{app.slug}:latest"
-        logs.append(f"Building image: {image_tag} (context: {build_context})")
-        
-        # #region agent log
-        docker_cmd = ["docker", "build", "-t", image_tag, "."]
-        _debug_log("views.py:567", "docker build command", {"cmd": docker_cmd, "cwd": str(build_dir), "cwd_exists": build_dir.exists(), "cwd_absolute": str(build_dir.resolve()) if build_dir.exists() else "N/A"}, "D")
-        # #endregion
-        code, out, err = run_cmd(
-            docker_cmd,
-            cwd=str(build_dir),
-            timeout=600
-        )
-        logs.append(f"Build output:\n{out}\n{err}")
-        # #region agent log
-        _debug_log("views.py:572", "docker build result", {"returncode": code, "stdout": out[:500] if out else "", "stderr": err[:500] if err else ""}, "D")
-        # #endregion
-        
-        if code != 0:
-            raise Exception(f"Docker build failed: {err or out}")
-        
-        # Prepare environment variables (skip internal keys)
-        env_args = []
-        for key, value in env_vars.items():
-            if not key.startswith("_keystone_"):
-                env_args.extend(["-e", f"{key}={value}"])
-        
-        # Run container with Traefik labels
-        docker_run_cmd = [
-            "docker", "run", "-d",
-            "--name", container_name,
-            "--network", TRAEFIK_NETWORK,
-            "--restart", "unless-stopped",
-            # Traefik labels
-            "-l", "traefik.enable=true",
-            "-l", f"traefik.http.routers.{app.slug}.rule={app.traefik_rule}",
-            "-l", f"traefik.http.routers.{app.slug}.entrypoints=web",
-            "-l", f"traefik.http.services.{app.slug}.loadbalancer.server.port={app.container_port}",
-            # Strip path prefix so app receives clean URLs
-            "-l", f"traefik.http.middlewares.{app.slug}-strip.stripprefix.prefixes=/{app.slug}",
-            "-l", f"traefik.http.routers.{app.slug}.middlewares={app.slug}-strip",
-        ] + env_args + [image_tag]
-        
-        logs.append(f"Running container: {container_name}")
-        code, out, err = run_cmd(docker_run_cmd)
-        logs.append(f"Run output:\n{out}\n{err}")
-        
-        if code != 0:
-            raise Exception(f"Docker run failed: {err or out}")
-        
-        # Get container ID
-        app.container_id = out.strip()[:12]
-        app.status = "running"
-        app.save()
-        
-        deployment.status = "success"
-        deployment.logs = "\n".join(logs)
-        deployment.finished_at = timezone.now()
-        deployment.save()
+        try:
+            structure, result = ship_app(app, deployment)
+        except DeploymentCancelled as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
-        return Response({
-            "status": "running",
-            "container_id": app.container_id,
-            "url": f"/{app.slug}",
-            "deploy_mode": "dockerfile",
-            "message": f"App deployed! Access at http://YOUR_VPS_IP/{app.slug}"
-        })
+        return Response({**result, "structure": structure})
     
     @action(detail=True, methods=["post"])
     def stop(self, request, pk=None):
         """Stop a running app."""
         app = self.get_object()
-        env_vars = app.env_vars or {}
-        deploy_mode = env_vars.get("_keystone_deploy_mode", "dockerfile")
-        
-        if deploy_mode == "compose":
-            # Stop compose stack
-            # Use host path for Docker commands
-            repo_dir = REPOS_DIR / app.slug
-            compose_file = env_vars.get("_keystone_compose_file", "docker-compose.yml")
-            project_name = f"keystone-{app.slug}"
-            run_cmd(
-                ["docker", "compose", "-p", project_name, "-f", compose_file, "stop"],
-                cwd=str(repo_dir)
-            )
-        else:
-            # Stop single container
-            container_name = f"keystone-app-{app.slug}"
-            run_cmd(["docker", "stop", container_name])
-        
-        app.status = "stopped"
-        app.save()
-        
+        stop_app(app)
         return Response({"status": "stopped"})
     
-    @action(detail=True, methods=["get"])
-    def logs(self, request, pk=None):
-        """Get container logs."""
+    @action(detail=True, methods=["get"], url_path="logs/archive")
+    def log_archive(self, request, pk=None):
+        """
+        Archived container logs for a time range.
+        - since / until: exclusive timestamps (as returned by the logs API)
+        - deployment: id of a deployment, covers its lifetime until the next one
+        - limit: max lines (oldest first); continue with since=<newest>
+        - tail=true: the newest `limit` lines of the range instead; page back
+          with until=<oldest>
+        """
         app = self.get_object()
-        env_vars = app.env_vars or {}
-        deploy_mode = env_vars.get("_keystone_deploy_mode", "dockerfile")
-        
-        if deploy_mode == "compose":
-            # Get compose logs
-            # Use host path for Docker commands
-            repo_dir = REPOS_DIR / app.slug
-            compose_file = env_vars.get("_keystone_compose_file", "docker-compose.yml")
-            project_name = f"keystone-{app.slug}"
-            code, out, err = run_cmd(
-                ["docker", "compose", "-p", project_name, "-f", compose_file, "logs", "--tail", "100"],
-                cwd=str(repo_dir)
-            )
-        else:
-            # Get single container logs
-            container_name = f"keystone-app-{app.slug}"
-            code, out, err = run_cmd(["docker", "logs", "--tail", "100", container_name])
+        since = request.query_params.get("since")
+        until = request.query_params.get("until")
+        
+        deployment_id = request.query_params.get("deployment")
+        if deployment_id:
+            deployment = app.deployments.filter(pk=deployment_id).first()
+            if deployment is None:
+                return Response({"error": "Deployment not found"}, status=status.HTTP_404_NOT_FOUND)
+            following = app.deployments.filter(created_at__gt=deployment.created_at).order_by("created_at").first()
+            since = since or format_timestamp(deployment.created_at)
+            until = until or (format_timestamp(following.created_at) if following else None)
+        
+        for name, value in (("since", since), ("until", until)):
+            if value and timestamp_key(value) is None:
+                return Response(
+                    {"error": f"{name} must be a UTC timestamp like 2024-01-31T12:00:00.000Z"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
         
-        return Response({"logs": out or err})
-    
-    def _generate_django_dockerfile(self):
-        """Generate Dockerfile for Django app."""
-        return '''FROM python:3.12-slim
-
-WORKDIR /app
-
-# Install dependencies
-COPY requirements.txt .
-RUN pip install --no-cache-dir -r requirements.txt gunicorn
+        try:
+            limit = int(request.query_params.get("limit", settings.KEYSTONE_LOGS_MAX_TAIL))
+        except ValueError:
+            return Response({"error": "Invalid limit"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, settings.KEYSTONE_LOGS_MAX_TAIL))
+        
+        newest = request.query_params.get("tail", "").lower() in ("1", "true", "yes")
+        lines, truncated = read_archive(app.slug, since=since, until=until, limit=limit, newest=newest)
+        timestamps = [ts for ts in map(line_timestamp, lines) if ts]
+        return Response({
+            "logs": "\n".join(lines) + ("\n" if lines else ""),
+            "lines": len(lines),
+            "truncated": truncated,
+            "newest": timestamps[-1] if timestamps else since,
+            "oldest": timestamps[0] if timestamps else until,
+        })
 
-# Copy app
-COPY . .
 
-# Collect static files
-RUN python manage.py collectstatic --noinput 2>/dev/null || true
+    @action(detail=True, methods=["get"])
+    def traffic(self, request, pk=None):
+        """
+        Requests, status classes and latency percentiles from the Traefik access log.
+        - minutes: window ending now (default 60), or since / until: ISO timestamps
+        - step: minutes per series entry (1-1440); router: one router only
+        """
+        app = self.get_object()
+        params = request.query_params
+        try:
+            minutes = int(params.get("minutes", 60))
+            step = max(1, min(int(params.get("step", 1)), 1440))
+        except ValueError:
+            return Response({"error": "minutes and step must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        bounds = {}
+        for name in ("since", "until"):
+            value = params.get(name)
+            if not value:
+                continue
+            parsed = parse_datetime(value)
+            if parsed is None:
+                return Response({"error": f"Invalid {name}: {value}"}, status=status.HTTP_400_BAD_REQUEST)
+            bounds[name] = parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, dt_timezone.utc)
+        until = bounds.get("until") or timezone.now()
+        since = bounds.get("since") or until - timedelta(minutes=max(1, minutes))
+        if since >= until:
+            return Response({"error": "since must be before until"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        summary = traffic_summary(app, since, until, step=step, router=params.get("router") or None)
+        return Response({"app": app.name, **summary})
 
-EXPOSE 8000
 
-CMD ["gunicorn", "--bind", "0.0.0.0:8000", "--workers", "2", "keystone.wsgi:application"]
-'''
+class DeploymentViewSet(ConditionalReadMixin, viewsets.ReadOnlyModelViewSet):
+    """View deployment history."""
+    # app_name is serialized for every deployment
+    queryset = Deployment.objects.select_related("app")
+    serializer_class = DeploymentSerializer
     
-    def _generate_node_dockerfile(self):
-        """Generate Dockerfile for Node app."""
-        return '''FROM node:20-alpine
-
-WORKDIR /app
-
-COPY package*.json ./
-RUN npm install
-
-COPY . .
-RUN npm run build 2>/dev/null || true
+    def get_queryset(self):
+        qs = super().get_queryset()
+        app_id = self.request.query_params.get("app")
+        if app_id:
+            qs = qs.filter(app_id=app_id)
+        return qs
+    
+    @action(detail=True, methods=["post"])
+    def cancel(self, request, pk=None):
+        """
+        Cancel a running deployment: its running command is killed with all
+        its child processes and the app gets its previous status back.
+        """
+        deployment = self.get_object()
+        if not cancel_deployment(deployment):
+            return Response(
+                {"error": f"Deployment is not running. Current status: {deployment.status}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(DeploymentSerializer(deployment).data)
+    
+    @action(detail=True, methods=["get"])
+    def logs(self, request, pk=None):
+        """Logs of a deployment, read from the archive once it has been compacted."""
+        deployment = self.get_object()
+        logs = deployment_logs(deployment)
+        if logs is None:
+            return Response({"error": "Archived logs not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"deployment": deployment.pk, "archived": deployment.archived_at is not None, "logs": logs})
 
-EXPOSE 3000
 
-CMD ["npm", "start"]
-'''
+class BulkOperationViewSet(viewsets.ReadOnlyModelViewSet):
+    """Progress and per-app results of bulk operations."""
+    queryset = BulkOperation.objects.all()
+    serializer_class = BulkOperationSerializer
 
 
-class DeploymentViewSet(viewsets.ReadOnlyModelViewSet):
-    """View deployment history."""
-    queryset = Deployment.objects.all()
-    serializer_class = DeploymentSerializer
+class RouteViewSet(viewsets.ModelViewSet):
+    """
+    Traefik routes (file provider). Every change re-renders the dynamic
+    config, so routing updates apply without recreating containers.
+    """
+    queryset = Route.objects.all()
+    serializer_class = RouteSerializer
     
     def get_queryset(self):
         qs = super().get_queryset()
@@ -840,6 +377,130 @@ class DeploymentViewSet(viewsets.ReadOnlyModelViewSet):
         if app_id:
             qs = qs.filter(app_id=app_id)
         return qs
+    
+    def perform_create(self, serializer):
+        serializer.save()
+        sync_routes()
+    
+    def perform_update(self, serializer):
+        serializer.save()
+        sync_routes()
+    
+    def perform_destroy(self, instance):
+        instance.delete()
+        sync_routes()
+
+
+class GitWebhookView(APIView):
+    """
+    GitHub push webhook - POST /api/webhooks/git/
+    Signed with X-Hub-Signature-256 using KEYSTONE_WEBHOOK_SECRET (content type
+    application/json). Matching apps are prepared and deployed after a debounce
+    window, with bursts of pushes collapsed into one deploy. Stopped and
+    never-prepared apps are reported as skipped.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    
+    def post(self, request):
+        if not verify_signature(request.body, request.headers.get("X-Hub-Signature-256")):
+            return Response({"error": "Invalid signature"}, status=status.HTTP_403_FORBIDDEN)
+        
+        event = request.headers.get("X-GitHub-Event", "push")
+        if event == "ping":
+            return Response({"ok": True})
+        if event != "push":
+            return Response({"ignored": f"Unsupported event: {event}"})
+        
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            return Response({"error": "Invalid JSON payload"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        push = parse_push(payload)
+        if push is None:
+            return Response({"ignored": "Not a branch push"})
+        
+        urls, branch, commit_sha = push
+        queued, skipped = [], {}
+        for app in matching_apps(urls, branch):
+            if accepts_push(app):
+                coalescer.push(app.id, commit_sha)
+                queued.append(app.name)
+            else:
+                skipped[app.name] = app.status
+        
+        return Response({
+            "queued": queued,
+            "skipped": skipped,
+            "commit": commit_sha,
+            "debounce_seconds": coalescer.window,
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class SlowRequestsView(APIView):
+    """
+    GET /api/admin/slow-requests/ - requests sampled by the profiling middleware
+    (KEYSTONE_PROFILING=1) for taking longer than KEYSTONE_PROFILING_SLOW_MS,
+    newest first. Samples are kept per server process.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request):
+        return Response({
+            "enabled": settings.KEYSTONE_PROFILING,
+            "threshold_ms": settings.KEYSTONE_PROFILING_SLOW_MS,
+            "requests": slow_requests(),
+        })
+
+
+class LogSearchView(APIView):
+    """
+    GET /api/logs/search/?q=... - search deployment and archived container logs.
+    - app: app id; source: "deployment" or "container"
+    - since / until: ISO timestamps
+    - mode=words: match words anywhere (full-text) instead of the exact phrase
+    - context: lines around each match (0-10), limit: max matches (1-500)
+    """
+    
+    def get(self, request):
+        params = request.query_params
+        term = params.get("q", "").strip()
+        if len(term) < 2:
+            return Response({"error": "q must be at least 2 characters"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        app = None
+        if params.get("app"):
+            app = App.objects.filter(pk=params["app"]).first() if params["app"].isdigit() else None
+            if app is None:
+                return Response({"error": "App not found"}, status=status.HTTP_404_NOT_FOUND)
+        
+        bounds = {}
+        for name in ("since", "until"):
+            value = params.get(name)
+            if not value:
+                continue
+            parsed = parse_datetime(value)
+            if parsed is None:
+                return Response({"error": f"Invalid {name}: {value}"}, status=status.HTTP_400_BAD_REQUEST)
+            bounds[name] = parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, dt_timezone.utc)
+        
+        try:
+            context = max(0, min(int(params.get("context", 2)), 10))
+            limit = max(1, min(int(params.get("limit", 100)), 500))
+        except ValueError:
+            return Response({"error": "context and limit must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        matches, truncated = search_logs(
+            term,
+            app=app,
+            source=params.get("source") or None,
+            words=params.get("mode") == "words",
+            context=context,
+            limit=limit,
+            **bounds,
+        )
+        return Response({"query": term, "count": len(matches), "truncated": truncated, "matches": matches})
 
 
 # =============================================================================
@@ -867,12 +528,6 @@ class LoginView(APIView):
 class LogoutView(APIView):
     """Invalidate auth token."""
     def post(self, request):
+        # post_delete also drops the token from the auth cache
         Token.objects.filter(user=request.user).delete()
         return Response({"ok": True})
-
-
-@api_view(["GET"])
-@permission_classes([permissions.AllowAny])
-def health(request):
-    """Health check endpoint."""
-    return Response({"status": "ok", "service": "keystone"})
@@ -0,0 +1,156 @@
+"""
+Base image warm-up and builder cache maintenance.
+
+The warm_images command keeps the base images of every registered app on
+the host, so the first deploy after a reboot or prune starts building right
+away instead of pulling:
+- images come from the cloned repos (FROM lines, compose `image:` services,
+  see images.referenced_images) plus the bases of the Dockerfiles Keystone
+  generates, deduplicated and most used first
+- missing images are pulled, present ones re-pulled (only changed layers
+  are downloaded) every KEYSTONE_WARMUP_REFRESH_HOURS
+- work only starts while the host is idle (no deployment running or
+  finished in the last minute; orphaned ones expire) and stops as soon as
+  one starts
+- at most KEYSTONE_WARMUP_CONCURRENCY pulls at a time with a pause of
+  KEYSTONE_WARMUP_PAUSE_SECONDS after each, which caps the bandwidth taken
+  from deploys and the apps
+- once a day, BuildKit cache older than KEYSTONE_BUILDER_CACHE_MAX_AGE_HOURS
+  is pruned (base images are images, not build cache, so they stay)
+
+When each image was last checked is kept in the runtime cache dir.
+"""
+import json
+import logging
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .images import GENERATED_BASE_IMAGES, pull_image, referenced_images
+from .models import App, Deployment
+from .runtime import CACHE_DIR_CONTAINER, REPOS_DIR_CONTAINER, atomic_write, run_cmd
+
+logger = logging.getLogger(__name__)
+
+STATE_PATH = CACHE_DIR_CONTAINER / "warmup.json"
+# Quiet time after the last deployment before the host counts as idle
+IDLE_AFTER_SECONDS = 60
+BUILDER_PRUNE_EVERY_SECONDS = 24 * 3600
+
+
+def _read_state():
+    try:
+        state = json.loads(STATE_PATH.read_text())
+    except (OSError, ValueError):
+        state = {}
+    state.setdefault("images", {})
+    return state
+
+
+def _write_state(state):
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write(STATE_PATH, json.dumps(state, indent=2, sort_keys=True))
+
+
+def host_busy():
+    """
+    True while a deployment runs or has just finished. Deployments left
+    running by a crashed process (no update for KEYSTONE_BUILD_SLOT_TIMEOUT)
+    don't count, as for build slots.
+    """
+    now = timezone.now()
+    recent = now - timedelta(seconds=IDLE_AFTER_SECONDS)
+    stale = now - timedelta(seconds=settings.KEYSTONE_BUILD_SLOT_TIMEOUT)
+    return Deployment.objects.filter(
+        Q(status__in=["pending", "running"], updated_at__gte=stale) | Q(finished_at__gte=recent)
+    ).exists()
+
+
+def collect_images():
+    """
+    Base images of all apps with a cloned repo, plus the generated Dockerfile bases.
+    Returns: list of (image, number of apps using it), most used first
+    """
+    usage = Counter({image: 0 for image in GENERATED_BASE_IMAGES.values()})
+    for app in App.objects.order_by("name"):
+        repo_dir = REPOS_DIR_CONTAINER / app.slug
+        if not repo_dir.is_dir():
+            continue
+        try:
+            usage.update(set(referenced_images(repo_dir)))
+        except Exception as e:
+            logger.warning("Could not scan %s for base images: %s", app.slug, e)
+    return sorted(usage.items(), key=lambda item: (-item[1], item[0]))
+
+
+def _due(entry, now):
+    """Whether an image should be pulled or refreshed now."""
+    if not entry:
+        return True
+    return now - entry.get("checked_at", 0) >= settings.KEYSTONE_WARMUP_REFRESH_HOURS * 3600
+
+
+def warm_images(images=None, dry_run=False):
+    """
+    Pull / refresh the images that are due, while the host stays idle.
+    Returns: list of (image, status, seconds); status "skipped: busy" for
+    images left for the next pass
+    """
+    images = [image for image, _ in collect_images()] if images is None else images
+    state = _read_state()
+    now = time.time()
+    todo = [image for image in images if _due(state["images"].get(image), now)]
+    if dry_run:
+        return [(image, "due", 0.0) for image in todo]
+
+    results = []
+    concurrency = max(1, settings.KEYSTONE_WARMUP_CONCURRENCY)
+
+    def record(futures):
+        for future in futures:
+            image, status, seconds = future.result()
+            results.append((image, status, seconds))
+            state["images"][image] = {"checked_at": time.time(), "status": status}
+        _write_state(state)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="keystone-warmup") as executor:
+        pending = set()
+        for index, image in enumerate(todo):
+            while len(pending) >= concurrency:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                record(done)
+                time.sleep(settings.KEYSTONE_WARMUP_PAUSE_SECONDS)
+            if host_busy():
+                results.extend((skipped, "skipped: busy", 0.0) for skipped in todo[index:])
+                break
+            known = image in state["images"]
+            pending.add(executor.submit(pull_image, image, refresh=known))
+        record(wait(pending).done)
+    return results
+
+
+def prune_builder_cache():
+    """
+    Drop BuildKit cache older than KEYSTONE_BUILDER_CACHE_MAX_AGE_HOURS, at most once a day.
+    Returns: docker's summary line, or None if nothing was run
+    """
+    max_age = settings.KEYSTONE_BUILDER_CACHE_MAX_AGE_HOURS
+    if max_age <= 0:
+        return None
+    state = _read_state()
+    if time.time() - state.get("builder_pruned_at", 0) < BUILDER_PRUNE_EVERY_SECONDS:
+        return None
+    code, out, err = run_cmd(
+        ["docker", "builder", "prune", "--force", "--filter", f"until={max_age}h"], timeout=600
+    )
+    if code != 0:
+        raise Exception(f"docker builder prune failed: {(err or out).strip()[:200]}")
+    state["builder_pruned_at"] = time.time()
+    _write_state(state)
+    lines = out.strip().splitlines()
+    return lines[-1] if lines else "Total reclaimed space: 0B"
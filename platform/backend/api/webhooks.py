@@ -0,0 +1,149 @@
+"""
+Git push webhooks.
+
+A signed GitHub push is mapped to the Apps tracking that repo and branch,
+and each app gets a prepare + deploy after a debounce window. Pushes that
+arrive while the window is open (or while the app is still deploying) are
+coalesced, so a burst of commits ends in a single deploy of the latest one.
+Only apps that are deployed or ready to be (prepared, running, failed) are
+shipped; stopped apps stay stopped until started by hand.
+
+Timers and pending pushes live in the PushCoalescer of this process, so the
+API must run as a single worker process (KEYSTONE_WEB_WORKERS=1, the
+default): with several, each would debounce and deploy its own share of the
+pushes, concurrently.
+"""
+import hashlib
+import hmac
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from rest_framework import serializers
+
+from .models import App, Deployment
+from .pipeline import DEPLOY_FROM_STATUSES, ship_app
+from .serializers import normalize_github_url
+
+logger = logging.getLogger(__name__)
+
+# A push redeploys apps that could be deployed by hand, except stopped ones
+PUSH_DEPLOY_STATUSES = tuple(status for status in DEPLOY_FROM_STATUSES if status != "stopped")
+# Pushes to apps in the middle of a manual action wait for it to finish
+BUSY_STATUSES = ("preparing", "deploying")
+
+
+def verify_signature(body, signature_header):
+    """Check a GitHub `X-Hub-Signature-256` header against the configured secret."""
+    secret = settings.KEYSTONE_WEBHOOK_SECRET
+    if not secret or not signature_header or not signature_header.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature_header[len("sha256="):])
+
+
+def parse_push(payload):
+    """
+    Extract (repo URLs, branch, commit SHA) from a push payload.
+    Returns None for pushes that shouldn't deploy (tags, branch deletions).
+    """
+    ref = payload.get("ref", "")
+    if not ref.startswith("refs/heads/") or payload.get("deleted"):
+        return None
+
+    repository = payload.get("repository") or {}
+    urls = set()
+    for key in ("clone_url", "html_url", "url"):
+        try:
+            urls.add(normalize_github_url(repository.get(key) or "").lower())
+        except serializers.ValidationError:
+            continue
+    return urls, ref[len("refs/heads/"):], payload.get("after", "")
+
+
+def accepts_push(app):
+    """Whether a push should (eventually) deploy the app."""
+    return app.status in PUSH_DEPLOY_STATUSES or app.status in BUSY_STATUSES
+
+
+def matching_apps(urls, branch):
+    """Apps whose git_url and branch match a push."""
+    return [
+        app for app in App.objects.filter(branch=branch)
+        if app.git_url.lower() in urls
+    ]
+
+
+class PushCoalescer:
+    """
+    Debounces pushes per app.
+
+    Each push (re)starts the app's timer; when it fires the latest pushed
+    commit is deployed. If the app is busy, the deploy is re-armed rather than
+    run concurrently. State is per process (see the module docstring).
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._lock = threading.Lock()
+        self._timers = {}
+        self._pending = {}
+        self._running = set()
+
+    def push(self, app_id, commit_sha):
+        with self._lock:
+            self._pending[app_id] = commit_sha
+            self._arm(app_id)
+
+    def _arm(self, app_id):
+        timer = self._timers.get(app_id)
+        if timer is not None:
+            timer.cancel()
+        timer = threading.Timer(self.window, self._fire, args=[app_id])
+        timer.daemon = True
+        self._timers[app_id] = timer
+        timer.start()
+
+    def _fire(self, app_id):
+        with self._lock:
+            self._timers.pop(app_id, None)
+            if app_id in self._running:
+                # Still deploying an earlier push - try again after another window
+                self._arm(app_id)
+                return
+            commit_sha = self._pending.pop(app_id, None)
+            if commit_sha is None:
+                return
+            self._running.add(app_id)
+
+        try:
+            run_push_deploy(app_id, commit_sha)
+        except Exception:
+            logger.exception("Webhook deploy failed for app %s", app_id)
+        finally:
+            with self._lock:
+                self._running.discard(app_id)
+            # Timer threads don't go through the request cycle - release the DB connection
+            connection.close()
+
+
+def run_push_deploy(app_id, commit_sha):
+    """Prepare and deploy an app for a push (runs in a background thread)."""
+    close_old_connections()
+    app = App.objects.get(pk=app_id)
+    if app.status in BUSY_STATUSES:
+        # A manual action is in progress - try again once it's done
+        coalescer.push(app_id, commit_sha)
+        return
+    if app.status not in PUSH_DEPLOY_STATUSES:
+        logger.info("Skipping webhook deploy of %s: app is %s", app.name, app.status)
+        return
+
+    logger.info("Webhook deploy of %s at %s", app.name, commit_sha[:12])
+    # Created before prepare so a failed clone still shows in the history, with the pushed commit
+    deployment = Deployment.objects.create(app=app, status="running", trigger="webhook", commit_sha=commit_sha[:40])
+    ship_app(app, deployment)
+
+
+coalescer = PushCoalescer(settings.KEYSTONE_WEBHOOK_DEBOUNCE_SECONDS)
@@ -0,0 +1,126 @@
+"""
+Benchmark compose rewriting on large compose files.
+
+Compares the old approach (pure Python safe_load + dump of the whole file on
+every prepare) with inject_traefik_config() cold (first render), warm
+(override already in the checkout) and cached (fresh clone of a file that was
+rendered before).
+
+Usage (from platform/backend):
+    python benchmarks/bench_compose.py [--services 50 500 2000] [--repeat 5]
+"""
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api import compose  # noqa: E402
+
+
+def make_compose(services):
+    """A compose file with anchors, comments and a mix of web/worker services."""
+    lines = [
+        "# Large generated compose file",
+        "x-common: &common",
+        "  restart: unless-stopped",
+        "  environment:",
+        "    LOG_LEVEL: info",
+        "services:",
+    ]
+    for index in range(services):
+        kind = ("web", "api", "worker", "cache")[index % 4]
+        lines += [
+            f"  {kind}{index}:",
+            "    <<: *common",
+            f"    # service {index}",
+            f"    build: ./svc{index}" if kind in ("web", "api") else "    image: redis:7",
+            f"    ports: [\"{10000 + index}:8000\"]" if kind != "worker" else "    expose: [\"9000\"]",
+            "    volumes:",
+            f"      - ./data/{index}:/data",
+            "      - named:/cache",
+            "    labels:",
+            f"      com.example.index: \"{index}\"",
+        ]
+    lines += ["volumes:", "  named: {}"]
+    return "\n".join(lines) + "\n"
+
+
+def legacy_rewrite(path):
+    """What prepare used to do: pure Python load and a full rewrite of the file."""
+    with open(path) as f:
+        data = yaml.safe_load(f)
+    with open(path, "w") as f:
+        yaml.dump(data, f, default_flow_style=False, sort_keys=False)
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best * 1000, 3)
+
+
+def run(services, repeat):
+    workdir = Path(tempfile.mkdtemp(prefix="keystone-bench-"))
+    compose.COMPOSE_CACHE_DIR = workdir / "cache"
+    repo = workdir / "repo"
+    repo.mkdir()
+    source = make_compose(services)
+    path = repo / "docker-compose.yml"
+
+    def reset():
+        path.write_text(source)
+        for stale in (repo / compose.OVERRIDE_FILE, repo / "docker-compose.yml.original"):
+            stale.unlink(missing_ok=True)
+
+    def legacy():
+        reset()
+        legacy_rewrite(path)
+
+    def cold():
+        reset()
+        shutil.rmtree(compose.COMPOSE_CACHE_DIR, ignore_errors=True)
+        compose.inject_traefik_config(path, "bench", "PathPrefix(`/bench`)")
+
+    def cached():
+        reset()
+        compose.inject_traefik_config(path, "bench", "PathPrefix(`/bench`)")
+
+    def warm():
+        compose.inject_traefik_config(path, "bench", "PathPrefix(`/bench`)")
+
+    try:
+        result = {
+            "services": services,
+            "bytes": len(source),
+            "libyaml": compose.SafeLoader is not yaml.SafeLoader,
+            "legacy_ms": timed(legacy, repeat),
+            "cold_ms": timed(cold, repeat),
+            "cached_ms": timed(cached, repeat),
+            "warm_ms": timed(warm, repeat),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--services", type=int, nargs="+", default=[50, 500, 2000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps([run(count, args.repeat) for count in args.services], indent=2))
+
+
+if __name__ == "__main__":
+    main()
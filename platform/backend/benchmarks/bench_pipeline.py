@@ -0,0 +1,207 @@
+"""
+Offline benchmark of Keystone's own overhead in the prepare/deploy pipeline.
+
+Puts the fake `git` and `docker` from benchmarks/fakebin first on PATH, so
+no network, repository or Docker daemon is needed. Then it drives the API
+through the Django test client against a throwaway SQLite database and
+runtime directory, for each app count:
+- list_apps / list_deployments: GET the list endpoints with N apps and
+  N * --deployments deployment rows
+- prepare / deploy / redeploy / logs: the AppViewSet actions on a sample
+  of apps (half docker-compose, half Dockerfile)
+
+Each scenario reports wall time, time per request, SQL query count,
+subprocess count (by program) and peak RSS as JSON, for comparing commits.
+
+Usage (from platform/backend):
+    python benchmarks/bench_pipeline.py [--apps 10 100 1000] [--sample 20]
+        [--latency-ms 0] [--output-lines 100] [--out results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+FAKEBIN_DIR = Path(__file__).resolve().parent / "fakebin"
+
+
+def git_revision():
+    """Commit being benchmarked (resolved before the fake git is on PATH)."""
+    try:
+        return subprocess.run(
+            ["git", "-C", str(BACKEND_DIR), "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+
+def configure(workdir, args):
+    """Point Keystone at a scratch runtime dir, database and the fake executables."""
+    runtime_dir = workdir / "runtime"
+    os.environ.update({
+        "KEYSTONE_RUNTIME_DIR": str(runtime_dir),
+        # Same path on "host" and in "container", no Docker-in-Docker mapping
+        "HOST_RUNTIME_PATH": str(runtime_dir),
+        "DATABASE_URL": f"sqlite:///{workdir / 'db.sqlite3'}",
+        "DJANGO_SETTINGS_MODULE": "keystone.settings",
+        "PATH": f"{FAKEBIN_DIR}{os.pathsep}{os.environ.get('PATH', '')}",
+        "KEYSTONE_BENCH_CALL_LOG": str(workdir / "calls.log"),
+        "KEYSTONE_BENCH_LATENCY_MS": str(args.latency_ms),
+        "KEYSTONE_BENCH_OUTPUT_LINES": str(args.output_lines),
+    })
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    import django
+    django.setup()
+    from django.core.management import call_command
+    call_command("migrate", verbosity=0)
+
+
+class Scenario:
+    """Measures one scenario: wall time, queries, subprocesses and peak RSS."""
+
+    def __init__(self, name, call_log):
+        self.name = name
+        self.call_log = Path(call_log)
+        self.requests = 0
+        self.statuses = Counter()
+        self.response_bytes = 0
+
+    def __enter__(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.call_log.write_text("")
+        self.queries = CaptureQueriesContext(connection)
+        self.queries.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.started
+        self.queries.__exit__(*exc)
+        return False
+
+    def request(self, client, method, path):
+        response = getattr(client, method)(path)
+        self.requests += 1
+        self.statuses[response.status_code] += 1
+        self.response_bytes += len(response.content)
+        return response
+
+    def result(self):
+        calls = [line.split(" ", 1)[0] for line in self.call_log.read_text().splitlines()]
+        return {
+            "scenario": self.name,
+            "requests": self.requests,
+            "statuses": dict(self.statuses),
+            "wall_ms": round(self.elapsed * 1000, 2),
+            "per_request_ms": round(self.elapsed * 1000 / max(1, self.requests), 2),
+            "queries": len(self.queries.captured_queries),
+            "subprocesses": len(calls),
+            "subprocesses_by_program": dict(Counter(calls)),
+            "response_bytes": self.response_bytes,
+            # ru_maxrss is in KiB on Linux; it only ever grows within a process
+            "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
+
+
+def seed(app_count, deployments_per_app):
+    from api.models import App, Deployment
+
+    App.objects.all().delete()
+    kinds = ("compose", "dockerfile")
+    apps = App.objects.bulk_create(
+        App(name=f"bench-{index}", git_url=f"https://github.com/bench/{kinds[index % 2]}-{index}")
+        for index in range(app_count)
+    )
+    Deployment.objects.bulk_create(
+        Deployment(app=app, status="success", logs="build output\n" * 50)
+        for app in apps
+        for _ in range(deployments_per_app)
+    )
+    return apps
+
+
+def run(app_count, args, call_log):
+    from django.contrib.auth.models import User
+    from django.test import Client
+
+    runtime_repos = Path(os.environ["KEYSTONE_RUNTIME_DIR"]) / "repos"
+    shutil.rmtree(runtime_repos, ignore_errors=True)
+    runtime_repos.mkdir(parents=True)
+
+    started = time.perf_counter()
+    apps = seed(app_count, args.deployments)
+    seed_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    user, _ = User.objects.get_or_create(username="bench", defaults={"is_superuser": True, "is_staff": True})
+    client = Client()
+    client.force_login(user)
+    sample = apps[:args.sample]
+
+    results = []
+    with Scenario("list_apps", call_log) as scenario:
+        scenario.request(client, "get", "/api/apps/")
+    results.append(scenario.result())
+
+    with Scenario("list_deployments", call_log) as scenario:
+        scenario.request(client, "get", "/api/deployments/")
+    results.append(scenario.result())
+
+    for name, method, action in (
+        ("prepare", "post", "prepare"),
+        ("deploy", "post", "deploy"),
+        # Nothing changed since the first deploy
+        ("redeploy", "post", "deploy"),
+        ("logs", "get", "logs"),
+    ):
+        with Scenario(name, call_log) as scenario:
+            for app in sample:
+                scenario.request(client, method, f"/api/apps/{app.pk}/{action}/")
+        results.append(scenario.result())
+
+    return {"apps": app_count, "deployments": app_count * args.deployments, "seed_ms": seed_ms, "scenarios": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--apps", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--deployments", type=int, default=5, help="deployment rows per app")
+    parser.add_argument("--sample", type=int, default=20, help="apps to prepare/deploy per size")
+    parser.add_argument("--latency-ms", type=float, default=0, help="latency of every fake git/docker call")
+    parser.add_argument("--output-lines", type=int, default=100, help="lines printed by fake build/logs")
+    parser.add_argument("--out", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "latency_ms": args.latency_ms,
+        "output_lines": args.output_lines,
+    }
+    workdir = Path(tempfile.mkdtemp(prefix="keystone-bench-"))
+    try:
+        configure(workdir, args)
+        report["runs"] = [run(count, args, workdir / "calls.log") for count in args.apps]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
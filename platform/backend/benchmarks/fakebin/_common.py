@@ -0,0 +1,25 @@
+"""
+Shared behaviour of the fake `git` and `docker` executables.
+
+Environment:
+- KEYSTONE_BENCH_CALL_LOG: file each invocation is appended to (one line per call)
+- KEYSTONE_BENCH_LATENCY_MS: time every invocation sleeps before answering
+- KEYSTONE_BENCH_OUTPUT_LINES: lines printed by build/logs style commands
+"""
+import os
+import time
+
+
+def record(program, args):
+    log = os.environ.get("KEYSTONE_BENCH_CALL_LOG")
+    if log:
+        with open(log, "a") as f:
+            f.write(f"{program} {' '.join(args)}\n")
+    latency = float(os.environ.get("KEYSTONE_BENCH_LATENCY_MS", "0"))
+    if latency:
+        time.sleep(latency / 1000)
+
+
+def print_output(prefix):
+    lines = int(os.environ.get("KEYSTONE_BENCH_OUTPUT_LINES", "100"))
+    print("\n".join(f"{prefix} line {index}: " + "x" * 60 for index in range(lines)))
@@ -0,0 +1,27 @@
+#!/bin/sh
+# Start the Keystone API server.
+#   KEYSTONE_SERVER_MODE=asgi      - gunicorn + uvicorn worker (default, see gunicorn.conf.py)
+#   KEYSTONE_SERVER_MODE=gunicorn  - gunicorn, WSGI threads
+#   KEYSTONE_SERVER_MODE=runserver - Django development server with autoreload
+# Migrations and the admin user are handled by the one-shot "migrate" service
+# in docker-compose.yml, not on every start.
+set -e
+
+# Deploys run inside this server: any still marked running were interrupted
+python manage.py recover_deployments
+
+case "${KEYSTONE_SERVER_MODE:-asgi}" in
+    runserver)
+        exec python manage.py runserver 0.0.0.0:8000
+        ;;
+    asgi)
+        exec gunicorn keystone.asgi:application
+        ;;
+    gunicorn)
+        exec gunicorn keystone.wsgi:application
+        ;;
+    *)
+        echo "Unknown KEYSTONE_SERVER_MODE: ${KEYSTONE_SERVER_MODE}" >&2
+        exit 1
+        ;;
+esac
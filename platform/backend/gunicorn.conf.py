@@ -0,0 +1,32 @@
+"""
+Gunicorn settings for Keystone.
+
+A single worker process: webhook debounce timers and image pull executors
+live in-process.
+- KEYSTONE_SERVER_MODE=asgi (default): uvicorn worker running keystone.asgi.
+  Async views (logs, health) wait on Docker in the event loop; sync views
+  such as deploy run in per-request threads.
+- KEYSTONE_SERVER_MODE=gunicorn: WSGI with a thread pool sized to the CPU
+  count; requests mostly wait on git/docker subprocesses, not the GIL.
+Deploy requests last as long as a build (up to 15 minutes), so the worker
+timeout is kept well above that.
+"""
+import os
+
+bind = os.getenv("KEYSTONE_BIND", "0.0.0.0:8000")
+if os.getenv("KEYSTONE_SERVER_MODE", "asgi") == "asgi":
+    worker_class = "uvicorn_worker.UvicornWorker"
+else:
+    worker_class = "gthread"
+# Keep at 1: webhook debouncing (api/webhooks.py) is per process
+workers = int(os.getenv("KEYSTONE_WEB_WORKERS", "1"))
+threads = int(os.getenv("KEYSTONE_WEB_THREADS") or max(4, (os.cpu_count() or 1) * 4))
+
+# Seconds before a silent worker is killed and restarted
+timeout = int(os.getenv("KEYSTONE_WEB_TIMEOUT", "1800"))
+# Seconds in-flight requests get to finish on restart/shutdown
+graceful_timeout = int(os.getenv("KEYSTONE_WEB_GRACEFUL_TIMEOUT", "120"))
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
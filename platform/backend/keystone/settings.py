@@ -1,11 +1,12 @@
 """Keystone Settings - Simple VPS Deployment Panel"""
 import os
+import sys
 from pathlib import Path
 import dj_database_url
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = os.getenv("DJANGO_SECRET_KEY", "dev-secret-key-change-me")
-DEBUG = os.getenv("DJANGO_DEBUG", "1") == "1"
+DEBUG = os.getenv("DJANGO_DEBUG", "0") == "1"
 ALLOWED_HOSTS = ["*"]
 
 INSTALLED_APPS = [
@@ -22,8 +23,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # No-op unless KEYSTONE_PROFILING=1
+    "api.profiling.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    # WhiteNoise, async-capable so the chain isn't adapted to sync under ASGI
+    "api.staticfiles.AsyncWhiteNoiseMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -34,6 +38,7 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = "keystone.urls"
 WSGI_APPLICATION = "keystone.wsgi.application"
+ASGI_APPLICATION = "keystone.asgi.application"
 
 TEMPLATES = [{
     "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -48,6 +53,39 @@ TEMPLATES = [{
 
 DATABASES = {"default": dj_database_url.config(default=os.getenv("DATABASE_URL", "sqlite:///db.sqlite3"))}
 
+# PostgreSQL profile:
+# - a psycopg connection pool per process (KEYSTONE_DB_POOL=1), so requests
+#   borrow an open connection instead of connecting to the database each time.
+#   Under ASGI every request runs in a new thread, which rules out persistent
+#   per-thread connections; without the pool, KEYSTONE_DB_CONN_MAX_AGE applies
+# - statement_timeout for API requests, and a longer one for management
+#   commands (migrate, archive_logs...) doing background work
+KEYSTONE_DB_WORKER = os.path.basename(sys.argv[0]) == "manage.py" and sys.argv[1:2] != ["runserver"]
+if DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql":
+    _db_options = DATABASES["default"].setdefault("OPTIONS", {})
+    _db_options.setdefault("connect_timeout", int(os.getenv("KEYSTONE_DB_CONNECT_TIMEOUT", "10")))
+    if KEYSTONE_DB_WORKER:
+        _statement_timeout = os.getenv("KEYSTONE_DB_WORKER_STATEMENT_TIMEOUT_MS", "600000")
+    else:
+        _statement_timeout = os.getenv("KEYSTONE_DB_STATEMENT_TIMEOUT_MS", "15000")
+    if int(_statement_timeout):
+        _db_options["options"] = f"-c statement_timeout={int(_statement_timeout)}"
+
+    if os.getenv("KEYSTONE_DB_POOL", "1") == "1":
+        from psycopg_pool import ConnectionPool
+
+        _db_options["pool"] = {
+            "min_size": int(os.getenv("KEYSTONE_DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.getenv("KEYSTONE_DB_POOL_MAX_SIZE", "20")),
+            # Seconds a request waits for a free connection
+            "timeout": float(os.getenv("KEYSTONE_DB_POOL_TIMEOUT", "10")),
+            # Drop connections the server closed (restart, idle timeout) before handing them out
+            "check": ConnectionPool.check_connection,
+        }
+    else:
+        DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("KEYSTONE_DB_CONN_MAX_AGE", "60"))
+        DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "UTC"
 USE_I18N = True
@@ -61,7 +99,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.SessionAuthentication",
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.IsAuthenticated"],
 }
@@ -71,3 +109,86 @@ CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
 
 AUTH_PASSWORD_VALIDATORS = []
+
+# Keystone - how deployed apps are routed by Traefik:
+# "labels" (container labels, docker provider) or "file" (dynamic file provider)
+KEYSTONE_TRAEFIK_PROVIDER = os.getenv("KEYSTONE_TRAEFIK_PROVIDER", "labels")
+
+# Git push webhooks - shared secret for X-Hub-Signature-256, and how long to wait
+# for more pushes before deploying (bursts collapse into one deploy)
+KEYSTONE_WEBHOOK_SECRET = os.getenv("KEYSTONE_WEBHOOK_SECRET", "")
+KEYSTONE_WEBHOOK_DEBOUNCE_SECONDS = float(os.getenv("KEYSTONE_WEBHOOK_DEBOUNCE_SECONDS", "30"))
+
+# Images pulled in parallel by the "ship" action before building
+KEYSTONE_PULL_CONCURRENCY = int(os.getenv("KEYSTONE_PULL_CONCURRENCY", "4"))
+
+# Container logs API: default and maximum lines per request, how long a
+# follow=true stream stays open, and how many of the newest lines paging back
+# with `until` (and no `since`) reads at most
+KEYSTONE_LOGS_TAIL = int(os.getenv("KEYSTONE_LOGS_TAIL", "100"))
+KEYSTONE_LOGS_MAX_TAIL = int(os.getenv("KEYSTONE_LOGS_MAX_TAIL", "5000"))
+KEYSTONE_LOGS_FOLLOW_SECONDS = int(os.getenv("KEYSTONE_LOGS_FOLLOW_SECONDS", "3600"))
+KEYSTONE_LOGS_MAX_SCAN = int(os.getenv("KEYSTONE_LOGS_MAX_SCAN", "50000"))
+
+# Container log archive (archive_logs command): rotate segments by size or
+# age, and keep this many segments per app
+KEYSTONE_LOG_SEGMENT_BYTES = int(os.getenv("KEYSTONE_LOG_SEGMENT_BYTES", str(8 * 1024 * 1024)))
+KEYSTONE_LOG_SEGMENT_SECONDS = int(os.getenv("KEYSTONE_LOG_SEGMENT_SECONDS", "86400"))
+KEYSTONE_LOG_MAX_SEGMENTS = int(os.getenv("KEYSTONE_LOG_MAX_SEGMENTS", "30"))
+
+# Caches: per-process by default; "shared" is file based under the runtime dir,
+# so all workers (and the archiver) on this host see the same entries
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "shared": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(os.getenv("KEYSTONE_RUNTIME_DIR", "/runtime"), "cache", "django"),
+    },
+}
+
+# API token authentication cache: how long a validated token skips the database
+# (0 disables), per-process LRU size, or a CACHES alias (e.g. "shared") so that
+# logout invalidates the token in every worker at once
+KEYSTONE_AUTH_CACHE_SECONDS = int(os.getenv("KEYSTONE_AUTH_CACHE_SECONDS", "60"))
+KEYSTONE_AUTH_CACHE_SIZE = int(os.getenv("KEYSTONE_AUTH_CACHE_SIZE", "1024"))
+KEYSTONE_AUTH_CACHE_BACKEND = os.getenv("KEYSTONE_AUTH_CACHE_BACKEND", "")
+
+# Apps processed in parallel by bulk prepare/deploy/stop operations
+KEYSTONE_BULK_CONCURRENCY = int(os.getenv("KEYSTONE_BULK_CONCURRENCY", "4"))
+
+# Build scheduler: image builds running at once on the host, and after how many
+# seconds a build slot whose process died is considered free again
+KEYSTONE_BUILD_CONCURRENCY = int(os.getenv("KEYSTONE_BUILD_CONCURRENCY", "2"))
+KEYSTONE_BUILD_SLOT_TIMEOUT = int(os.getenv("KEYSTONE_BUILD_SLOT_TIMEOUT", "1800"))
+
+# Request profiling: Server-Timing header on every response, and requests slower
+# than KEYSTONE_PROFILING_SLOW_MS kept (last N) for GET /api/admin/slow-requests/
+KEYSTONE_PROFILING = os.getenv("KEYSTONE_PROFILING", "0") == "1"
+KEYSTONE_PROFILING_SLOW_MS = float(os.getenv("KEYSTONE_PROFILING_SLOW_MS", "500"))
+KEYSTONE_PROFILING_SLOW_SAMPLES = int(os.getenv("KEYSTONE_PROFILING_SLOW_SAMPLES", "100"))
+
+# Traffic analytics (ingest_traffic command): Traefik's JSON access log, how
+# many days of per-minute buckets to keep, and the size at which the ingester
+# rotates the log to <log>.1 (0 leaves rotation to e.g. logrotate)
+KEYSTONE_TRAFFIC_LOG = os.getenv(
+    "KEYSTONE_TRAFFIC_LOG", os.path.join(os.getenv("KEYSTONE_RUNTIME_DIR", "/runtime"), "traefik-logs", "access.log")
+)
+KEYSTONE_TRAFFIC_RETENTION_DAYS = int(os.getenv("KEYSTONE_TRAFFIC_RETENTION_DAYS", "30"))
+KEYSTONE_TRAFFIC_LOG_MAX_MB = int(os.getenv("KEYSTONE_TRAFFIC_LOG_MAX_MB", "100"))
+
+# Deployment retention (prune_deployments command): per app, the most recent N
+# deployments and all from the last D days keep their logs in the database
+KEYSTONE_DEPLOYMENT_KEEP = int(os.getenv("KEYSTONE_DEPLOYMENT_KEEP", "20"))
+KEYSTONE_DEPLOYMENT_KEEP_DAYS = int(os.getenv("KEYSTONE_DEPLOYMENT_KEEP_DAYS", "30"))
+
+# Cache of serialized app payloads for the app list/detail endpoints (a CACHES
+# alias; entries are checked against App.updated_at, so per-process is fine)
+KEYSTONE_API_CACHE_BACKEND = os.getenv("KEYSTONE_API_CACHE_BACKEND", "default")
+
+# Base image warm-up (warm_images command): pulls at once, pause after each
+# pull, how often present images are refreshed, and the age after which
+# BuildKit cache is pruned (0 disables pruning)
+KEYSTONE_WARMUP_CONCURRENCY = int(os.getenv("KEYSTONE_WARMUP_CONCURRENCY", "1"))
+KEYSTONE_WARMUP_PAUSE_SECONDS = float(os.getenv("KEYSTONE_WARMUP_PAUSE_SECONDS", "5"))
+KEYSTONE_WARMUP_REFRESH_HOURS = float(os.getenv("KEYSTONE_WARMUP_REFRESH_HOURS", "24"))
+KEYSTONE_BUILDER_CACHE_MAX_AGE_HOURS = int(os.getenv("KEYSTONE_BUILDER_CACHE_MAX_AGE_HOURS", "168"))
@@ -67,8 +67,13 @@ sed -i 's|HOST_RUNTIME_PATH=.*|HOST_RUNTIME_PATH=/home/munaim/keystone/apps/keys
 echo -e "${GREEN}✓ Configuration verified${NC}"
 
 echo -e "${YELLOW}Step 6: Ensuring runtime directories exist...${NC}"
-mkdir -p runtime/repos runtime/logs
+mkdir -p runtime/repos runtime/logs runtime/traefik runtime/traefik-logs runtime/cache
 chmod -R 755 runtime/
+# Keystone's containers run as USER_ID (docker-compose.yml) and write here;
+# bind-mount sources docker creates itself would be owned by root
+USER_ID="${USER_ID:-1004}"
+GROUP_ID="${GROUP_ID:-1004}"
+chown -R "$USER_ID:$GROUP_ID" runtime/ 2>/dev/null || sudo chown -R "$USER_ID:$GROUP_ID" runtime/
 echo -e "${GREEN}✓ Runtime directories ready${NC}"
 
 echo -e "${YELLOW}Step 7: Stopping any existing containers...${NC}"